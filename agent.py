@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Агент без GUI: периодический сбор показателей и отдача по HTTP
+
+GET /metrics       — текстовый формат Prometheus
+GET /metrics.json  — последний снимок в JSON
+GET /overhead.json — собственные затраты агента по проверкам
+
+С --hub снимки после каждого сбора дополнительно отправляются на хаб
+(hub.py) по постоянному соединению. Отправка идет в отдельном потоке
+через ограниченную очередь: недоступный хаб не задерживает сбор, а при
+переполнении отбрасываются самые старые снимки.
+
+Ответы формируются заранее при каждом сборе, запрос к агенту не
+запускает сбор данных. Проверки SystemChecker выполняются в отдельном
+потоке: медленная проверка (таймаут интернета или ping) не задерживает
+сбор показателей.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from collectors import DashboardCollector
+from checks import SystemChecker
+from overhead import Overhead
+
+PREFIX = "mosmaster"
+# Снимков в очереди отправки на хаб
+HUB_QUEUE = 64
+
+
+class Agent:
+    """Сбор снимков по расписанию и хранение готовых ответов"""
+
+    def __init__(self, interval=5.0, checks_interval=60.0, disk_path="/", min_gb=5,
+                 internet=("8.8.8.8", 53), ping_host=None, archive=None, hub=None):
+        self.interval = interval
+        self.checks_interval = checks_interval
+        self.disk_path = disk_path
+        self.min_gb = min_gb
+        self.internet = internet
+        self.ping_host = ping_host
+        self.archive = archive
+        # HubClient; ошибки сети не прерывают сбор, переподключение при следующей отправке
+        self.hub = hub
+        self._hub_queue = deque(maxlen=HUB_QUEUE)
+        self._hub_ready = threading.Event()
+        self.collector = DashboardCollector(disk_path)
+        self.overhead = Overhead()
+        self.checker = SystemChecker(self.overhead)
+        self.checks = {}
+        self.snapshot = None
+        self._stopped = threading.Event()
+        self._publish_lock = threading.Lock()
+        # Пара (текст Prometheus, JSON) заменяется целиком одной операцией
+        self._responses = (b"", b"{}")
+
+    def responses(self):
+        return self._responses
+
+    def collect_once(self):
+        with self.overhead.measure("collect"):
+            snapshot = self.collector.sample()
+        if self.archive is not None:
+            self.archive.record_snapshot(snapshot)
+        if self.hub is not None:
+            self._hub_queue.append(snapshot)
+            self._hub_ready.set()
+        self.publish(snapshot=snapshot)
+        return snapshot
+
+    def publish(self, snapshot=None, checks=None):
+        """Новые ответы с последним снимком и последними результатами проверок"""
+        with self._publish_lock:
+            if snapshot is not None:
+                self.snapshot = snapshot
+            if checks is not None:
+                self.checks = checks
+            if self.snapshot is None:
+                return
+            self._responses = (
+                render_prometheus(self.snapshot, self.checks).encode(),
+                render_json(self.snapshot, self.checks).encode(),
+            )
+
+    def run_checks(self):
+        """Проверки SystemChecker: имя -> (успех, сообщение, длительность)"""
+        jobs = {
+            "disk": lambda: self.checker.check_disk(self.disk_path, self.min_gb),
+            "resources": self.checker.check_resources,
+        }
+        if self.internet:
+            jobs["internet"] = lambda: self.checker.check_internet(*self.internet)
+        if self.ping_host:
+            jobs["ping"] = lambda: self.checker.check_ping(self.ping_host)
+        results = {}
+        for name, job in jobs.items():
+            start = time.perf_counter()
+            success, msg = job()
+            results[name] = (success, msg, time.perf_counter() - start)
+        return results
+
+    def run(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            try:
+                self.collect_once()
+            except Exception as e:
+                print(f"Ошибка сбора данных: {e}", flush=True)
+            self._stopped.wait(max(self.interval - (time.monotonic() - started), 0))
+
+    def run_checks_loop(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            try:
+                self.publish(checks=self.run_checks())
+            except Exception as e:
+                print(f"Ошибка проверок: {e}", flush=True)
+            self._stopped.wait(max(self.checks_interval - (time.monotonic() - started), 0))
+
+    def run_hub_loop(self):
+        """Отправка накопленных снимков на хаб; при ошибке они отбрасываются"""
+        while True:
+            self._hub_ready.wait()
+            if self._stopped.is_set():
+                return
+            self._hub_ready.clear()
+            snapshots = []
+            while self._hub_queue:
+                snapshots.append((self.hub.name, self._hub_queue.popleft()))
+            if snapshots:
+                with self.overhead.measure("hub"):
+                    self.hub.send(snapshots)
+
+    def start(self):
+        threads = [threading.Thread(target=self.run, name="agent-collector", daemon=True),
+                   threading.Thread(target=self.run_checks_loop, name="agent-checks", daemon=True)]
+        if self.hub is not None:
+            threads.append(threading.Thread(target=self.run_hub_loop, name="agent-hub", daemon=True))
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def stop(self):
+        self._stopped.set()
+        self._hub_ready.set()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(snapshot, checks):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}")
+
+    metric("cpu_percent", "gauge", "CPU utilisation, percent", [({}, snapshot.cpu_percent)])
+    metric("cpu_core_percent", "gauge", "Per-core CPU utilisation, percent",
+           [({"core": core}, value) for core, value in enumerate(snapshot.per_cpu)])
+    metric("memory_percent", "gauge", "Memory utilisation, percent", [({}, snapshot.mem_percent)])
+    metric("memory_used_bytes", "gauge", "Used memory, bytes", [({}, snapshot.mem_used)])
+    metric("memory_total_bytes", "gauge", "Total memory, bytes", [({}, snapshot.mem_total)])
+    disk = {"path": snapshot.disk_path}
+    metric("disk_percent", "gauge", "Filesystem utilisation, percent", [(disk, snapshot.disk_percent)])
+    metric("disk_used_bytes", "gauge", "Used filesystem space, bytes", [(disk, snapshot.disk_used)])
+    metric("disk_total_bytes", "gauge", "Filesystem size, bytes", [(disk, snapshot.disk_total)])
+    metric("network_sent_bytes_total", "counter", "Bytes sent over all interfaces", [({}, snapshot.net_sent)])
+    metric("network_received_bytes_total", "counter", "Bytes received over all interfaces",
+           [({}, snapshot.net_recv)])
+    metric("boot_time_seconds", "gauge", "System boot time, unix seconds", [({}, snapshot.boot_time)])
+    metric("system_info", "gauge", "Platform information", [({
+        "os": snapshot.os_name, "release": snapshot.os_release, "processor": snapshot.processor,
+    }, 1)])
+    if checks:
+        metric("check_success", "gauge", "Result of SystemChecker checks",
+               [({"check": name}, int(success)) for name, (success, _, _) in checks.items()])
+        metric("check_duration_seconds", "gauge", "Duration of SystemChecker checks",
+               [({"check": name}, round(duration, 6)) for name, (_, _, duration) in checks.items()])
+    metric("last_collect_timestamp_seconds", "gauge", "Time of the last collection",
+           [({}, round(snapshot.timestamp, 3))])
+    return "\n".join(lines) + "\n"
+
+
+def render_json(snapshot, checks):
+    data = snapshot._asdict()
+    data["checks"] = {
+        name: {"success": success, "message": msg, "duration": round(duration, 6)}
+        for name, (success, msg, duration) in checks.items()
+    }
+    return json.dumps(data, ensure_ascii=False)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    agent = None
+
+    def do_GET(self):
+        text, data = self.agent.responses()
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            self.reply(200, "text/plain; version=0.0.4; charset=utf-8", text)
+        elif path == "/metrics.json":
+            self.reply(200, "application/json; charset=utf-8", data)
+        elif path == "/overhead.json":
+            self.reply(200, "application/json; charset=utf-8", self.agent.overhead.to_json().encode())
+        else:
+            self.reply(404, "text/plain; charset=utf-8", b"Not found\n")
+
+    def reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(agent, host="0.0.0.0", port=9105):
+    handler = type("Handler", (MetricsHandler,), {"agent": agent})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Агент мониторинга без GUI")
+    parser.add_argument("--listen", default="0.0.0.0:9105", help="адрес HTTP-сервера [0.0.0.0:9105]")
+    parser.add_argument("--interval", type=float, default=5.0, help="период сбора, секунды [5]")
+    parser.add_argument("--checks-interval", type=float, default=60.0, help="период проверок SystemChecker [60]")
+    parser.add_argument("--disk-path", default="/", help="путь для проверки диска [/]")
+    parser.add_argument("--min-gb", type=float, default=5, help="минимальный свободный объем, ГБ [5]")
+    parser.add_argument("--internet", default="8.8.8.8:53", help="хост:порт проверки интернета, пусто — отключить")
+    parser.add_argument("--ping-host", default=None, help="хост для ping")
+    parser.add_argument("--archive", default=None, help="каталог архива показателей")
+    parser.add_argument("--hub", default=None, help="хост:порт хаба для отправки снимков")
+    parser.add_argument("--name", default=None, help="имя хоста на хабе [имя машины]")
+    args = parser.parse_args()
+
+    internet = None
+    if args.internet:
+        host, _, port = args.internet.rpartition(":")
+        internet = (host, int(port))
+    archive = None
+    if args.archive:
+        from archive import MetricsArchive
+        archive = MetricsArchive(args.archive)
+
+    hub = None
+    if args.hub:
+        from hub import HubClient
+        hub = HubClient(args.hub, name=args.name)
+
+    agent = Agent(args.interval, args.checks_interval, args.disk_path, args.min_gb,
+                  internet, args.ping_host, archive, hub)
+    agent.collect_once()
+    agent.start()
+
+    host, _, port = args.listen.rpartition(":")
+    server = serve(agent, host or "0.0.0.0", int(port))
+    print(f"Агент слушает http://{host or '0.0.0.0'}:{port}/metrics", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.stop()
+        server.server_close()
+        if hub is not None:
+            hub.close()
+        if archive is not None:
+            archive.close()
+
+
+if __name__ == "__main__":
+    main()
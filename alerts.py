@@ -0,0 +1,222 @@
+import json
+import operator
+import os
+import re
+from collections import deque, namedtuple
+from fnmatch import fnmatchcase
+
+DEFAULT_RULES = os.environ.get("MOSMASTER_ALERTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "alerts.json"))
+
+# Уровни важности по возрастанию
+SEVERITIES = ("ok", "warning", "critical")
+
+AlertEvent = namedtuple("AlertEvent", ["timestamp", "rule", "series", "severity", "state", "value", "message"])
+
+_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+_UNITS = {"s": 1, "m": 60, "h": 3600}
+_EXPR_RE = re.compile(
+    r"^(?P<metric>\S+)\s+"
+    r"(?:(?P<agg>avg|min|max|last)\s+over\s+(?P<window>\d+(?:\.\d+)?)(?P<unit>[smh])\s+)?"
+    r"(?P<op>>=|<=|>|<)\s*(?P<threshold>-?\d+(?:\.\d+)?)"
+    r"(?:\s+for\s+(?P<for>\d+)(?:\s+evaluations?)?)?"
+    r"(?:\s+clear\s+(?P<clear>-?\d+(?:\.\d+)?))?$"
+)
+
+
+class Rule:
+    """Правило: агрегат метрики за окно сравнивается с порогом
+
+    Срабатывает после for_count подряд идущих нарушений и снимается,
+    только когда агрегат вернется за порог clear (гистерезис).
+    """
+
+    def __init__(self, name, metric, op, threshold, agg="last", window=0, for_count=1,
+                 clear=None, severity="warning", message=None):
+        if op not in _OPS:
+            raise ValueError(f"Неизвестный оператор: {op}")
+        if agg not in ("avg", "min", "max", "last"):
+            raise ValueError(f"Неизвестная агрегация: {agg}")
+        if severity not in SEVERITIES[1:]:
+            raise ValueError(f"Неизвестный уровень: {severity}")
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.threshold = float(threshold)
+        self.agg = agg
+        self.window = float(window)
+        self.for_count = int(for_count)
+        self.clear = self.threshold if clear is None else float(clear)
+        self.severity = severity
+        self.message = message or f"{metric} {agg} {op} {threshold}"
+        self._breach = _OPS[op]
+
+    def breached(self, value):
+        return self._breach(value, self.threshold)
+
+    def cleared(self, value):
+        return not self._breach(value, self.clear)
+
+    @classmethod
+    def parse(cls, expr, **options):
+        """Правило из строки вида 'cpu avg over 60s > 85 for 3 clear 75'"""
+        match = _EXPR_RE.match(expr.strip())
+        if match is None:
+            raise ValueError(f"Не удалось разобрать правило: {expr}")
+        window = float(match["window"] or 0) * _UNITS[match["unit"] or "s"]
+        options.setdefault("name", expr)
+        return cls(
+            metric=match["metric"],
+            op=match["op"],
+            threshold=match["threshold"],
+            agg=match["agg"] or "last",
+            window=window,
+            for_count=options.pop("for_count", match["for"] or 1),
+            clear=options.pop("clear", match["clear"]),
+            **options,
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        if "expr" in data:
+            expr = data.pop("expr")
+            if "for" in data:
+                data["for_count"] = data.pop("for")
+            return cls.parse(expr, **data)
+        data["for_count"] = data.pop("for", 1)
+        data.setdefault("name", data["metric"])
+        return cls(**data)
+
+
+class _Window:
+    """Скользящее окно с накопленной суммой и монотонными очередями для min/max"""
+
+    __slots__ = ("length", "points", "total", "mins", "maxs")
+
+    def __init__(self, length):
+        self.length = length
+        self.points = deque()
+        self.total = 0.0
+        self.mins = deque()
+        self.maxs = deque()
+
+    def push(self, timestamp, value):
+        self.points.append((timestamp, value))
+        self.total += value
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        self.mins.append((timestamp, value))
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.maxs.append((timestamp, value))
+
+        edge = timestamp - self.length
+        while self.points[0][0] < edge:
+            _, old = self.points.popleft()
+            self.total -= old
+        while self.mins[0][0] < edge:
+            self.mins.popleft()
+        while self.maxs[0][0] < edge:
+            self.maxs.popleft()
+
+    def value(self, agg):
+        if agg == "avg":
+            return self.total / len(self.points)
+        if agg == "min":
+            return self.mins[0][1]
+        if agg == "max":
+            return self.maxs[0][1]
+        return self.points[-1][1]
+
+
+class _State:
+    __slots__ = ("count", "active", "value")
+
+    def __init__(self):
+        self.count = 0
+        self.active = False
+        self.value = None
+
+
+class AlertEngine:
+    """Пакетная оценка правил по всем рядам каждого собранного снимка"""
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self._matches = {}
+        self._windows = {}
+        self._states = {}
+        self._severity = {}
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(Rule.from_dict(item) for item in data.get("rules", []))
+
+    def evaluate(self, timestamp, samples):
+        """Оценка правил для словаря {ряд: значение}; возвращает только изменения состояний"""
+        events = []
+        for series, value in samples.items():
+            if value is None:
+                continue
+            rules = self._matches.get(series)
+            if rules is None:
+                rules = self._matches[series] = self._match(series)
+            if not rules:
+                continue
+
+            # Одно окно на ряд и длину окна, общее для всех правил
+            windows = self._windows.setdefault(series, {})
+            for length in {rule.window for rule in rules}:
+                window = windows.get(length)
+                if window is None:
+                    window = windows[length] = _Window(length)
+                window.push(timestamp, value)
+
+            changed = False
+            for rule in rules:
+                current = windows[rule.window].value(rule.agg)
+                state = self._states.get((rule, series))
+                if state is None:
+                    state = self._states[(rule, series)] = _State()
+                state.value = current
+                if state.active:
+                    if rule.cleared(current):
+                        state.active = False
+                        state.count = 0
+                        changed = True
+                        events.append(AlertEvent(timestamp, rule.name, series, rule.severity,
+                                                 "resolved", current, rule.message))
+                elif rule.breached(current):
+                    state.count += 1
+                    if state.count >= rule.for_count:
+                        state.active = True
+                        changed = True
+                        events.append(AlertEvent(timestamp, rule.name, series, rule.severity,
+                                                 "firing", current, rule.message))
+                else:
+                    state.count = 0
+            if changed:
+                self._severity[series] = self._series_severity(series, rules)
+        return events
+
+    def severity(self, series):
+        """Наивысший уровень активных тревог ряда"""
+        return self._severity.get(series, "ok")
+
+    def active(self):
+        return [
+            (rule.name, series, rule.severity, state.value)
+            for (rule, series), state in self._states.items() if state.active
+        ]
+
+    def _match(self, series):
+        return [rule for rule in self.rules if fnmatchcase(series, rule.metric)]
+
+    def _series_severity(self, series, rules):
+        level = 0
+        for rule in rules:
+            if self._states[(rule, series)].active:
+                level = max(level, SEVERITIES.index(rule.severity))
+        return SEVERITIES[level]
@@ -0,0 +1,254 @@
+"""Доступные обновления пакетов по индексам dpkg и apt без запуска apt
+
+Установленные версии читаются из /var/lib/dpkg/status, доступные — из
+/var/lib/apt/lists/*_Packages (и *_Packages.gz). Файлы разбираются
+построчно, из абзацев берутся только нужные поля. Разобранные файлы
+кэшируются по mtime и размеру: повторная проверка перечитывает только
+изменившиеся индексы (после apt update или установки пакетов).
+
+Кандидат на обновление выбирается по приоритетам apt без закрепления
+(pinning): обычные источники — 500, установленная версия — 100. Источники
+с NotAutomatic в Release (experimental) — 1, с NotAutomatic и
+ButAutomaticUpgrades (backports) — 100: такие версии предлагаются только
+для пакетов, уже установленных из этого источника. Из версий новее
+установленной берется наибольший приоритет, при равенстве — наибольшая
+версия; установленная версия получает приоритет источника, где она есть.
+"""
+import functools
+import glob
+import gzip
+import os
+import threading
+from collections import namedtuple
+
+DPKG_STATUS = "/var/lib/dpkg/status"
+APT_LISTS = "/var/lib/apt/lists"
+
+Upgrade = namedtuple("Upgrade", ["name", "arch", "installed", "candidate", "origin"])
+
+_STATUS_FIELDS = frozenset({b"Package", b"Version", b"Architecture", b"Status"})
+_PACKAGES_FIELDS = frozenset({b"Package", b"Version", b"Architecture"})
+_RELEASE_FIELDS = frozenset({b"NotAutomatic", b"ButAutomaticUpgrades"})
+
+# Приоритеты apt по умолчанию
+PRIORITY_DEFAULT = 500
+PRIORITY_INSTALLED = 100
+PRIORITY_BUT_AUTOMATIC = 100
+PRIORITY_NOT_AUTOMATIC = 1
+
+
+def _order(char):
+    # Порядок символов dpkg: ~ раньше конца строки, буквы раньше прочих знаков
+    if char == "~":
+        return -1
+    if char.isalpha():
+        return ord(char)
+    return ord(char) + 256
+
+
+def _part_key(text):
+    """Ключ сравнения upstream-версии или ревизии по правилам dpkg"""
+    parts = []
+    pos, size = 0, len(text)
+    while pos < size:
+        start = pos
+        while pos < size and not text[pos].isdigit():
+            pos += 1
+        # Конец нечисловой части (0) сравнивается с символами так же, как в dpkg
+        letters = (*map(_order, text[start:pos]), 0)
+        start = pos
+        while pos < size and text[pos].isdigit():
+            pos += 1
+        parts.append((letters, int(text[start:pos] or 0)))
+    # Недостающие части равны пустым: хвостовые пустые части отбрасываются,
+    # а конец версии помечается пустой частью
+    while parts and parts[-1] == ((0,), 0):
+        parts.pop()
+    parts.append(((0,), 0))
+    return tuple(parts)
+
+
+@functools.lru_cache(maxsize=65536)
+def version_key(version):
+    """Ключ сортировки версии Debian [epoch:]upstream[-revision]"""
+    epoch, sep, rest = version.partition(":")
+    if not sep:
+        epoch, rest = "0", version
+    upstream, sep, revision = rest.rpartition("-")
+    if not sep:
+        upstream, revision = rest, ""
+    return int(epoch or 0), _part_key(upstream), _part_key(revision)
+
+
+def compare_versions(a, b):
+    """-1, 0 или 1, как dpkg --compare-versions"""
+    a, b = version_key(a), version_key(b)
+    return (a > b) - (a < b)
+
+
+def iter_paragraphs(path, fields):
+    """Абзацы файла формата deb822 как словари с полями из fields"""
+    opener = gzip.open if path.endswith(".gz") else open
+    record = {}
+    with opener(path, "rb") as f:
+        for line in f:
+            first = line[:1]
+            if first in (b" ", b"\t"):
+                # Продолжение многострочного поля (Description, Conffiles)
+                continue
+            if first in (b"\n", b"\r", b""):
+                if record:
+                    yield record
+                    record = {}
+                continue
+            name, sep, value = line.partition(b":")
+            if sep and name in fields:
+                record[name.decode()] = value.strip().decode("utf-8", "replace")
+    if record:
+        yield record
+
+
+def read_status(path=DPKG_STATUS):
+    """Установленные пакеты: {(имя, архитектура): версия}"""
+    installed = {}
+    for record in iter_paragraphs(path, _STATUS_FIELDS):
+        if record.get("Status", "").endswith(" installed") and "Version" in record:
+            installed[record["Package"], record.get("Architecture", "all")] = record["Version"]
+    return installed
+
+
+def read_packages(path):
+    """Наибольшие доступные версии из индекса: {(имя, архитектура): версия}"""
+    available = {}
+    for record in iter_paragraphs(path, _PACKAGES_FIELDS):
+        if "Package" not in record or "Version" not in record:
+            continue
+        key = record["Package"], record.get("Architecture", "all")
+        version = record["Version"]
+        current = available.get(key)
+        if current is None or version_key(version) > version_key(current):
+            available[key] = version
+    return available
+
+
+def list_origin(path):
+    """Источник по имени индекса: ..._dists_bookworm-security_main_... -> bookworm-security"""
+    name = os.path.basename(path)
+    if "_dists_" in name:
+        return name.split("_dists_", 1)[1].split("_", 1)[0]
+    return name.rsplit("_Packages", 1)[0]
+
+
+def read_release(path):
+    """Приоритет источника по полям NotAutomatic и ButAutomaticUpgrades файла (In)Release"""
+    fields = {}
+    # Подпись InRelease не мешает: ее строки не содержат нужных полей
+    for record in iter_paragraphs(path, _RELEASE_FIELDS):
+        fields.update(record)
+    if fields.get("NotAutomatic", "").lower() != "yes":
+        return PRIORITY_DEFAULT
+    if fields.get("ButAutomaticUpgrades", "").lower() == "yes":
+        return PRIORITY_BUT_AUTOMATIC
+    return PRIORITY_NOT_AUTOMATIC
+
+
+def release_file(path):
+    """Файл InRelease или Release источника индекса Packages; None, если его нет"""
+    name = os.path.basename(path)
+    if "_dists_" in name:
+        prefix, rest = name.split("_dists_", 1)
+        base = f"{prefix}_dists_{rest.split('_', 1)[0]}"
+    else:
+        base = name.rsplit("_Packages", 1)[0]
+    for suffix in ("_InRelease", "_Release"):
+        release = os.path.join(os.path.dirname(path), base + suffix)
+        if os.path.exists(release):
+            return release
+    return None
+
+
+class AptIndex:
+    """Индексы dpkg и apt с кэшем разобранных файлов по mtime"""
+
+    def __init__(self, status=DPKG_STATUS, lists=APT_LISTS):
+        self.status = status
+        self.lists = lists
+        # путь -> ((mtime, размер), разобранные данные)
+        self._files = {}
+        self._lock = threading.Lock()
+        # Число файлов, разобранных при последней проверке
+        self.parsed = 0
+
+    def list_files(self):
+        return sorted(glob.glob(os.path.join(self.lists, "*_Packages"))
+                      + glob.glob(os.path.join(self.lists, "*_Packages.gz")))
+
+    def _load(self, path, reader):
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        data = reader(path)
+        self._files[path] = (stamp, data)
+        self.parsed += 1
+        return data
+
+    def upgradable(self):
+        """Пакеты, для которых в индексах есть версия новее установленной"""
+        with self._lock:
+            self.parsed = 0
+            installed = self._load(self.status, read_status)
+            paths = self.list_files()
+            indexes = []
+            releases = set()
+            for path in paths:
+                release = release_file(path)
+                priority = PRIORITY_DEFAULT
+                if release is not None:
+                    releases.add(release)
+                    priority = self._load(release, read_release)
+                indexes.append((list_origin(path), priority, self._load(path, read_packages)))
+            # Удаленные индексы больше не держат память
+            for path in set(self._files) - set(paths) - releases - {self.status}:
+                del self._files[path]
+
+        upgrades = []
+        for key, version in installed.items():
+            installed_key = version_key(version)
+            # Установленная версия получает приоритет источника, в котором она есть
+            floor = max([PRIORITY_INSTALLED] + [priority for _, priority, available in indexes
+                                                if available.get(key) == version])
+            best = None
+            for origin, priority, available in indexes:
+                candidate = available.get(key)
+                if candidate is None or priority < floor:
+                    continue
+                rank = priority, version_key(candidate)
+                if rank[1] > installed_key and (best is None or rank > best[0]):
+                    best = rank, candidate, origin
+            if best is not None:
+                upgrades.append(Upgrade(key[0], key[1], version, best[1], best[2]))
+        upgrades.sort()
+        return upgrades
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_index():
+    """Общий индекс процесса: кэш разобранных файлов живет между проверками"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = AptIndex()
+        return _default
+
+
+def format_upgrades(upgrades):
+    """Текст в духе apt list --upgradable"""
+    if not upgrades:
+        return "Обновлений нет"
+    return "\n".join(f"{row.name}/{row.origin} {row.candidate} {row.arch} [обновление с: {row.installed}]"
+                     for row in upgrades)
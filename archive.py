@@ -0,0 +1,236 @@
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left, bisect_right
+
+from collectors import snapshot_metrics
+
+# Заголовок сегмента: сигнатура, версия, резерв, число записей
+HEADER = struct.Struct("<4sHHQ")
+MAGIC = b"MMAR"
+VERSION = 1
+# Запись фиксированной ширины: время (секунды epoch) и значение
+RECORD = struct.Struct("<dd")
+
+DEFAULT_ROOT = os.environ.get("MOSMASTER_ARCHIVE", os.path.expanduser("~/.local/share/mosmaster/archive"))
+
+
+class Segment:
+    """Файл сегмента, отображенный в память"""
+
+    def __init__(self, path, capacity=None, writable=False):
+        self.path = path
+        if capacity is not None:
+            # Новый сегмент создается сразу нужного размера
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+                f.truncate(HEADER.size + capacity * RECORD.size)
+        with open(path, "r+b" if writable else "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, _, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Неизвестный формат сегмента: {path}")
+        self.capacity = (len(self.mm) - HEADER.size) // RECORD.size
+        self.start = _start_of(path)
+
+    def append(self, timestamp, value):
+        RECORD.pack_into(self.mm, HEADER.size + self.count * RECORD.size, timestamp, value)
+        # Счетчик обновляется после записи: недописанная запись не будет видна
+        self.count += 1
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, 0, self.count)
+
+    def last_time(self):
+        if not self.count:
+            return None
+        return RECORD.unpack_from(self.mm, HEADER.size + (self.count - 1) * RECORD.size)[0]
+
+    def view(self, start=None, end=None):
+        """Пара (времена, значения) — представления memoryview без копирования"""
+        count = HEADER.unpack_from(self.mm, 0)[3]
+        data = memoryview(self.mm)[HEADER.size:HEADER.size + count * RECORD.size].cast("d")
+        times = data[0::2]
+        lo = 0 if start is None else bisect_left(times, start)
+        hi = count if end is None else bisect_right(times, end)
+        return data[2 * lo:2 * hi:2], data[2 * lo + 1:2 * hi:2]
+
+    def flush(self):
+        self.mm.flush()
+
+    def close(self):
+        try:
+            self.mm.close()
+        except BufferError:
+            # Еще живы представления RangeView: отображение закроется вместе с ними
+            pass
+
+
+class RangeView:
+    """Результат запроса: последовательность сегментных представлений"""
+
+    def __init__(self, parts):
+        self.parts = [(times, values) for times, values in parts if len(times)]
+
+    def __len__(self):
+        return sum(len(times) for times, _ in self.parts)
+
+    def __iter__(self):
+        for times, values in self.parts:
+            yield from zip(times, values)
+
+    def times(self):
+        for times, _ in self.parts:
+            yield from times
+
+    def values(self):
+        for _, values in self.parts:
+            yield from values
+
+    def decimate(self, points):
+        """Прореживание до ~points точек шагом по представлениям, без копирования данных"""
+        step = max(len(self) // max(points, 1), 1)
+        return RangeView((times[::step], values[::step]) for times, values in self.parts)
+
+    def arrays(self):
+        """Список пар массивов NumPy по сегментам (требует numpy)"""
+        import numpy as np
+        return [(np.asarray(times), np.asarray(values)) for times, values in self.parts]
+
+
+class MetricsArchive:
+    """Дисковый архив метрик: сегменты только на дозапись с ротацией по размеру и возрасту"""
+
+    def __init__(self, root=DEFAULT_ROOT, segment_records=65536, segment_seconds=6 * 3600,
+                 retention_seconds=14 * 24 * 3600, max_segments=None):
+        self.root = root
+        self.segment_records = segment_records
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self.max_segments = max_segments
+        self._active = {}
+        # Сегменты, открытые для чтения: метрика -> {путь: Segment}
+        self._readers = {}
+        self._prev = None
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def metrics(self):
+        return sorted(_unescape(name) for name in os.listdir(self.root))
+
+    def append(self, metric, timestamp, value):
+        """Дозапись точки; точки старше последней записанной отбрасываются"""
+        with self._lock:
+            segment = self._writer(metric, timestamp)
+            last = segment.last_time()
+            if last is not None and timestamp < last:
+                return False
+            segment.append(timestamp, value)
+            return True
+
+    def record_snapshot(self, snapshot):
+        """Запись снимка DashboardSnapshot"""
+        for name, value in snapshot_metrics(snapshot, self._prev).items():
+            self.append(name, snapshot.timestamp, value)
+        self._prev = snapshot
+
+    def query(self, metric, start=None, end=None):
+        """Точки метрики за интервал [start, end] в виде RangeView
+
+        Сегменты для чтения отображаются один раз и используются повторно;
+        сегменты, не попавшие в запрос, закрываются.
+        """
+        with self._lock:
+            active = self._active.get(metric)
+            readers = self._readers.get(metric, {})
+            used = {}
+            parts = []
+            paths = self._segments(metric)
+            for i, path in enumerate(paths):
+                # Сегмент заканчивается там, где начинается следующий
+                if end is not None and _start_of(path) > end:
+                    break
+                if start is not None and i + 1 < len(paths) and _start_of(paths[i + 1]) < start:
+                    continue
+                if active is not None and active.path == path:
+                    segment = active
+                else:
+                    segment = used[path] = readers.get(path) or Segment(path)
+                parts.append(segment.view(start, end))
+            for path, segment in readers.items():
+                if path not in used:
+                    segment.close()
+            self._readers[metric] = used
+            return RangeView(parts)
+
+    def flush(self):
+        with self._lock:
+            for segment in self._active.values():
+                segment.flush()
+
+    def close(self):
+        with self._lock:
+            for segment in self._active.values():
+                segment.flush()
+                segment.close()
+            self._active.clear()
+            for readers in self._readers.values():
+                for segment in readers.values():
+                    segment.close()
+            self._readers.clear()
+
+    def _writer(self, metric, timestamp):
+        segment = self._active.get(metric)
+        if segment is None:
+            paths = self._segments(metric)
+            if paths:
+                segment = Segment(paths[-1], writable=True)
+        if segment is not None and (segment.count >= segment.capacity
+                                    or timestamp - segment.start >= self.segment_seconds):
+            segment.flush()
+            segment.close()
+            segment = None
+        if segment is None:
+            directory = os.path.join(self.root, _escape(metric))
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{int(timestamp * 1000):015d}.seg")
+            segment = Segment(path, capacity=self.segment_records, writable=True)
+            self._expire(metric, timestamp)
+        self._active[metric] = segment
+        return segment
+
+    def _segments(self, metric):
+        directory = os.path.join(self.root, _escape(metric))
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(directory, name) for name in names]
+
+    def _expire(self, metric, now):
+        """Удаление сегментов старше срока хранения или сверх лимита"""
+        paths = self._segments(metric)
+        drop = 0
+        if self.max_segments is not None:
+            drop = max(len(paths) - self.max_segments, 0)
+        if self.retention_seconds is not None:
+            # Сегмент устарел, если следующий за ним начался раньше границы хранения
+            while drop + 1 < len(paths) and _start_of(paths[drop + 1]) < now - self.retention_seconds:
+                drop += 1
+        readers = self._readers.get(metric, {})
+        for path in paths[:drop]:
+            reader = readers.pop(path, None)
+            if reader is not None:
+                reader.close()
+            os.remove(path)
+
+
+def _start_of(path):
+    return int(os.path.basename(path).split(".")[0]) / 1000
+
+
+def _escape(metric):
+    return metric.replace("%", "%25").replace("/", "%2F")
+
+
+def _unescape(name):
+    return name.replace("%2F", "/").replace("%25", "%")
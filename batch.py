@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Пакетный расчет формулы main.py по большому входному файлу
+
+Каждая строка входа — пять чисел A1..A5 через пробелы, запятые или точки
+с запятой; текст после # — комментарий, пустые строки пропускаются,
+нечисловая первая строка считается заголовком. На выход пишется по
+строке на строку данных в формате main.py ({:.2f}); строки, на которых
+main.py завершился бы ошибкой (логарифм неположительного числа, деление
+на ноль и т. п.), дают nan.
+
+Вход читается блоками, блоки считаются в пуле процессов, результаты
+пишутся по порядку по мере готовности.
+
+С --formula вместо формулы main.py считается формула из JSON-описания
+(см. formula.py); число чисел в строке равно числу ее входов.
+
+    python batch.py params.txt -o results.txt --workers 8
+    python batch.py params.txt --formula task3.json
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from formula import SCALAR_ERRORS, VectorRounder, load_formula
+from main import evaluate
+
+
+def evaluate_array(a):
+    """Формула main.py по строкам массива (n, 5); возвращает (результаты, число ошибок)"""
+    a1, a2, a3, a4, a5 = (np.ascontiguousarray(column) for column in a.T)
+    rounder = VectorRounder(np, len(a), 5)
+    r5 = rounder.round
+    with np.errstate(all="ignore"):
+        # B1 = A1*A5 если A4<5.7 иначе A3
+        low = a4 < 5.7
+        b1 = a3.copy()
+        b1[low] = r5(a1[low] * a5[low], low)
+
+        num = r5(np.power(a5, a1))                    # A5^A1
+        # B2 = A5^A1 если B1>=15 иначе √A5
+        high = b1 >= 15
+        b2 = np.empty_like(b1)
+        b2[high] = num[high]
+        b2[~high] = r5(np.sqrt(a5[~high]), ~high)
+
+        den = r5(np.sqrt(b2))                         # √B2
+        frac = r5(num / den)                          # A5^A1 / √B2
+        a2r = r5(np.radians(a2))                      # A2: градусы -> радианы
+        cs = r5(np.cos(a2r))                          # cos(A2)
+        term = r5(frac * cs)                          # * cos(A2)
+        lg = r5(np.log(b1))                           # ln(B1)
+        res = r5(term + lg)
+
+    errors = 0
+    for row in np.flatnonzero(rounder.suspect):
+        try:
+            res[row] = evaluate(*a[row].tolist())
+        except SCALAR_ERRORS:
+            res[row] = math.nan
+            errors += 1
+    return res, errors
+
+
+def parse_lines(lines, skip_header=False, width=5):
+    """Массив (n, width) и маска строк с ошибкой разбора"""
+    text = "".join(lines)
+    if "," in text or ";" in text:
+        text = text.replace(",", " ").replace(";", " ")
+    rows = text.splitlines()
+    if "#" in text:
+        rows = [row.partition("#")[0] for row in rows]
+    fields = [row for row in map(str.split, rows) if row]
+    if skip_header and fields:
+        try:
+            float(fields[0][0])
+        except ValueError:
+            fields = fields[1:]
+    if set(map(len, fields)) <= {width}:
+        try:
+            return np.array(fields, dtype=float).reshape(-1, width), np.zeros(len(fields), dtype=bool)
+        except ValueError:
+            pass
+
+    # Медленный путь: построчно, с пометкой некорректных строк
+    values = np.zeros((len(fields), width))
+    invalid = np.zeros(len(fields), dtype=bool)
+    for i, row in enumerate(fields):
+        try:
+            values[i] = [float(token) for token in row]
+        except ValueError:
+            invalid[i] = True
+    return values, invalid
+
+
+def process_chunk(lines, skip_header=False, formula=None):
+    """Текст результатов блока и число строк с ошибкой
+
+    formula — путь к JSON-описанию формулы (см. formula.py) вместо
+    встроенной формулы main.py; в процессе пула она компилируется один раз.
+    """
+    if formula is None:
+        values, invalid = parse_lines(lines, skip_header)
+        evaluate_rows = evaluate_array
+    else:
+        compiled = load_formula(formula)
+        values, invalid = parse_lines(lines, skip_header, len(compiled.inputs))
+        evaluate_rows = compiled.evaluate_array
+    errors = int(invalid.sum())
+    if errors:
+        # Нераспознанные строки не считаются: иначе их нули дали бы вторую ошибку
+        res = np.full(len(values), math.nan)
+        res[~invalid], formula_errors = evaluate_rows(values[~invalid])
+    else:
+        res, formula_errors = evaluate_rows(values)
+    errors += formula_errors
+    text = "\n".join(map("{:.2f}".format, res.tolist()))
+    return (text + "\n") if text else "", errors
+
+
+def read_chunks(f, chunk_size):
+    chunk = []
+    for line in f:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(source, target, chunk_size=100000, workers=None, formula=None):
+    """Расчет блоками с потоковой записью; возвращает (строк, ошибок)"""
+    workers = workers or os.cpu_count() or 1
+    rows = errors = 0
+    chunks = enumerate(read_chunks(source, chunk_size))
+    if workers == 1:
+        for index, chunk in chunks:
+            text, chunk_errors = process_chunk(chunk, index == 0, formula)
+            target.write(text)
+            rows += text.count("\n")
+            errors += chunk_errors
+        return rows, errors
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Ограниченное число блоков в работе: память не растет с размером входа
+        pending = []
+        for index, chunk in chunks:
+            pending.append(pool.submit(process_chunk, chunk, index == 0, formula))
+            if len(pending) >= workers * 2:
+                text, chunk_errors = pending.pop(0).result()
+                target.write(text)
+                rows += text.count("\n")
+                errors += chunk_errors
+        for future in pending:
+            text, chunk_errors = future.result()
+            target.write(text)
+            rows += text.count("\n")
+            errors += chunk_errors
+    return rows, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный расчет формулы main.py")
+    parser.add_argument("input", help="входной файл, - для stdin")
+    parser.add_argument("-o", "--output", default="-", help="файл результатов [stdout]")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="строк в блоке [100000]")
+    parser.add_argument("--workers", type=int, default=None, help="процессов [число ядер]")
+    parser.add_argument("--formula", help="JSON-описание другой формулы (см. formula.py)")
+    args = parser.parse_args()
+    if args.formula:
+        # Ошибки описания видны сразу, а не в процессах пула
+        load_formula(args.formula)
+
+    start = time.perf_counter()
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        rows, errors = run(source, target, args.chunk_size, args.workers, args.formula)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    print(f"Строк: {rows}, ошибок: {errors}, {time.perf_counter() - start:.2f} с", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""Воспроизводимые замеры сборщиков и отрисовки на имитации системы
+
+Вместо psutil и /proc используется детерминированная имитация заданного
+размера (процессы, сокеты, точки монтирования, интерфейсы), поэтому
+результаты не зависят от нагрузки машины разработчика. Внешние команды
+имитируются медленными процессами python. Отрисовка замеряется в Qt
+с платформой offscreen.
+
+При сравнении с базовой линией берется минимум повторов, приведенный к
+скорости машины по эталонной нагрузке: повторы идут кругами по всем
+случаям, и замедление машины на время замеров не выглядит регрессией.
+
+    python bench.py --save bench.json        # сохранить базовую линию
+    python bench.py --compare bench.json     # сравнить, код 1 при регрессии
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager, nullcontext
+from types import SimpleNamespace
+from unittest import mock
+
+import psutil
+
+import collectors
+import disks
+import network
+import processes
+from alerts import AlertEngine
+from collectors import DashboardCollector, snapshot_metrics
+from disks import DiskScanner
+from network import NetworkCollector
+from overhead import Overhead
+from processes import ProcessSampler
+from runner import CommandRunner
+
+# Поля в порядке psutil для Linux
+scputimes = namedtuple("scputimes", ["user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal"])
+svmem = namedtuple("svmem", ["total", "available", "percent", "used", "free"])
+sdiskusage = namedtuple("sdiskusage", ["total", "used", "free", "percent"])
+sdiskpart = namedtuple("sdiskpart", ["device", "mountpoint", "fstype", "opts"])
+sdiskio = namedtuple("sdiskio", ["read_count", "write_count", "read_bytes", "write_bytes",
+                                 "read_time", "write_time", "busy_time"])
+snetio = namedtuple("snetio", ["bytes_sent", "bytes_recv", "packets_sent", "packets_recv",
+                               "errin", "errout", "dropin", "dropout"])
+snicstats = namedtuple("snicstats", ["isup", "duplex", "speed", "mtu"])
+snicaddr = namedtuple("snicaddr", ["family", "address", "netmask", "broadcast", "ptp"])
+pcputimes = namedtuple("pcputimes", ["user", "system"])
+pmem = namedtuple("pmem", ["rss", "vms"])
+statvfs_result = namedtuple("statvfs_result", ["f_blocks", "f_bfree", "f_bavail", "f_frsize"])
+
+GB = 1024**3
+BASELINE_VERSION = 2
+# Случай с эталонной нагрузкой: по нему оценивается скорость машины во время замеров
+CALIBRATION = "calibration"
+
+
+class FakeProcess:
+    def __init__(self, system, pid):
+        if pid not in system.procs:
+            raise psutil.NoSuchProcess(pid)
+        self.system = system
+        self.pid = pid
+        self._create_time = system.procs[pid][0]
+
+    def oneshot(self):
+        return nullcontext()
+
+    def _state(self):
+        state = self.system.procs.get(self.pid)
+        if state is None or state[0] != self._create_time:
+            raise psutil.NoSuchProcess(self.pid)
+        return state
+
+    def create_time(self):
+        return self._create_time
+
+    def name(self):
+        return self._state()[1]
+
+    def cpu_times(self):
+        cpu = self._state()[2]
+        return pcputimes(cpu * 0.7, cpu * 0.3)
+
+    def memory_info(self):
+        rss = self._state()[3]
+        return pmem(rss, rss * 2)
+
+    def is_running(self):
+        state = self.system.procs.get(self.pid)
+        return state is not None and state[0] == self._create_time
+
+
+class FakeSystem:
+    """Детерминированная имитация psutil; состояние меняется только в tick()"""
+
+    NoSuchProcess = psutil.NoSuchProcess
+    ZombieProcess = psutil.ZombieProcess
+    AccessDenied = psutil.AccessDenied
+
+    def __init__(self, processes=10000, mounts=200, interfaces=32, cores=64, churn=0.01, seed=1):
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.clock = 1_700_000_000.0
+        self.next_pid = 100
+        self.procs = {}
+        for _ in range(processes):
+            self._spawn()
+        self.cores = [[0.0] * len(scputimes._fields) for _ in range(cores)]
+        self.mounts = [
+            sdiskpart(f"/dev/fake{i}", "/" if i == 0 else f"/mnt/fake{i}", "ext4", "rw")
+            for i in range(mounts)
+        ]
+        self.blocks = {part.mountpoint: [2**24, self.rng.randrange(2**20, 2**24)] for part in self.mounts}
+        self.io = {f"fake{i}": [0] * len(sdiskio._fields) for i in range(mounts)}
+        self.nics = {f"eth{i}": [0] * len(snetio._fields) for i in range(interfaces)}
+
+    def _spawn(self):
+        pid = self.next_pid
+        self.next_pid += 1
+        self.procs[pid] = [self.clock, f"proc-{pid % 997}", 0.0, self.rng.randrange(1, 512) * 1024**2]
+
+    def tick(self, seconds=1.0):
+        """Шаг имитации: время CPU, счетчики, завершение и запуск процессов"""
+        rng = self.rng
+        self.clock += seconds
+        for state in self.procs.values():
+            state[2] += rng.random() * 0.05
+        for pid in rng.sample(list(self.procs), int(len(self.procs) * self.churn)):
+            del self.procs[pid]
+            self._spawn()
+        for times in self.cores:
+            busy = rng.random() * seconds
+            times[0] += busy
+            times[3] += seconds - busy
+        for counters in self.io.values():
+            for i in range(len(counters)):
+                counters[i] += rng.randrange(1000)
+        for counters in self.nics.values():
+            for i in range(len(counters)):
+                counters[i] += rng.randrange(100000)
+
+    # psutil
+
+    def pids(self):
+        return list(self.procs)
+
+    def Process(self, pid):
+        return FakeProcess(self, pid)
+
+    def boot_time(self):
+        return 1_600_000_000.0
+
+    def cpu_times(self, percpu=False):
+        cores = [scputimes(*times) for times in self.cores]
+        if percpu:
+            return cores
+        return scputimes(*(sum(column) for column in zip(*cores)))
+
+    def virtual_memory(self):
+        total = 256 * GB
+        used = sum(state[3] for state in self.procs.values()) % total
+        return svmem(total, total - used, round(used / total * 100, 1), used, total - used)
+
+    def disk_usage(self, path):
+        total, free = self.blocks.get(path, self.blocks["/"])
+        used = total - free
+        return sdiskusage(total * 4096, used * 4096, free * 4096, round(used / total * 100, 1))
+
+    def disk_partitions(self, all=False):
+        return list(self.mounts)
+
+    def disk_io_counters(self, perdisk=False):
+        return {name: sdiskio(*counters) for name, counters in self.io.items()}
+
+    def net_io_counters(self, pernic=False):
+        counters = {name: snetio(*values) for name, values in self.nics.items()}
+        if pernic:
+            return counters
+        return snetio(*(sum(column) for column in zip(*counters.values())))
+
+    def net_if_stats(self):
+        return {name: snicstats(True, 2, 10000, 1500) for name in self.nics}
+
+    def net_if_addrs(self):
+        return {name: [snicaddr(2, f"10.0.{i}.1", "255.255.255.0", None, None)]
+                for i, name in enumerate(self.nics)}
+
+    # os
+
+    def statvfs(self, path):
+        total, free = self.blocks[path]
+        return statvfs_result(total, free, free, 4096)
+
+
+def build_proc(root, sockets=50000, owners=5000, seed=1):
+    """Имитация /proc: net/tcp с установленными соединениями и fd процессов-владельцев"""
+    rng = random.Random(seed)
+    os.makedirs(f"{root}/net")
+    lines = ["  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode"]
+    for i in range(sockets):
+        inode = 100000 + i
+        local = f"0100007F:{rng.randrange(1024, 65535):04X}"
+        remote = f"{rng.randrange(2**32):08X}:{rng.randrange(1, 65535):04X}"
+        lines.append(f"{i:4}: {local} {remote} 01 00000000:00000000 00:00000000 00000000  1000        0 {inode}")
+        pid = 100 + i % owners
+        fd_dir = f"{root}/{pid}/fd"
+        if not os.path.isdir(fd_dir):
+            os.makedirs(fd_dir)
+            os.symlink("/dev/null", f"{fd_dir}/0")
+        os.symlink(f"socket:[{inode}]", f"{fd_dir}/{3 + i // owners}")
+    with open(f"{root}/net/tcp", "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return (f"{root}/net/tcp",)
+
+
+@contextmanager
+def fake_backends(system):
+    """Подмена psutil и os.statvfs в модулях сборщиков"""
+    with ExitStack() as stack:
+        for module in (collectors, disks, network, processes):
+            stack.enter_context(mock.patch.object(module, "psutil", system))
+        stack.enter_context(mock.patch.object(disks, "os", SimpleNamespace(statvfs=system.statvfs)))
+        yield
+
+
+class Case:
+    """Замеряемый шаг; setup выполняется вне замера перед каждым повтором
+
+    gate — показатель для сравнения с базовой линией: wall (время) или
+    cpu (время CPU потока, для отрисовки, где время зависит от загрузки
+    машины и планировщика X/Qt).
+    """
+
+    def __init__(self, name, fn, setup=None, repeat=None, gate="wall"):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+        self.repeat = repeat
+        self.gate = gate
+
+
+def collector_cases(system, tcp_tables, proc_root, commands=16, command_delay=0.2):
+    sampler = ProcessSampler(top=15)
+    sampler.sample()
+    net = NetworkCollector(tcp_tables=tcp_tables, proc_root=proc_root)
+    net.interfaces()
+    net.connections()
+    scanner = DiskScanner(timeout=2.0)
+    scanner.io()
+    dashboard = DashboardCollector()
+    alerts = AlertEngine.from_file()
+    snapshot = dashboard.sample()
+    mount_metrics = {f"mount.percent:{part.mountpoint}": 50.0 for part in system.mounts}
+
+    runner = CommandRunner(ttl=0)
+    script = f"import sys, time; time.sleep({command_delay}); sys.stdout.write('x' * 65536)"
+
+    def run_commands():
+        futures = [runner.submit([sys.executable, "-c", script, str(i)], timeout=30) for i in range(commands)]
+        for future in futures:
+            future.result()
+
+    return [
+        Case("processes.sample", sampler.sample, system.tick),
+        Case("network.interfaces", net.interfaces, system.tick),
+        Case("network.connections", net.connections),
+        Case("network.connections.cold",
+             lambda: NetworkCollector(tcp_tables=tcp_tables, proc_root=proc_root).connections(), repeat=3),
+        Case("disks.scan", scanner.scan),
+        Case("disks.io", scanner.io, system.tick),
+        Case("dashboard.sample", dashboard.sample, system.tick),
+        Case("alerts.evaluate",
+             lambda: alerts.evaluate(time.time(), {**snapshot_metrics(snapshot), **mount_metrics})),
+        Case("commands.slow", run_commands, repeat=3),
+    ], runner.shutdown
+
+
+def render_cases(system, archive_root):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["MOSMASTER_ARCHIVE"] = archive_root
+    from PyQt5.QtWidgets import QApplication
+    import mainmain
+
+    app = QApplication.instance() or QApplication([])
+    window = mainmain.SystemCheckApp()
+    # Сбор идет из замеров, фоновый поток окна не нужен
+    window.collector.stop()
+    window.resize(1024, 768)
+    window.show()
+    app.processEvents()
+
+    dashboard = DashboardCollector()
+    sampler = ProcessSampler(top=15)
+    sampler.sample()
+    state = {}
+
+    def dashboard_setup():
+        system.tick()
+        window.tabs.setCurrentIndex(0)
+        state["snapshot"] = dashboard.sample()
+
+    def render_dashboard():
+        window.apply_snapshot(state["snapshot"])
+        window.grab()
+
+    def processes_setup():
+        system.tick()
+        window.tabs.setCurrentWidget(window.detailed_tabs.parentWidget())
+        window.detailed_tabs.setCurrentIndex(3)
+        state["sample"] = sampler.sample()
+
+    def render_processes():
+        window.apply_processes(state["sample"])
+        window.grab()
+
+    def close():
+        window.close()
+        app.processEvents()
+
+    return [
+        Case("render.dashboard", render_dashboard, dashboard_setup, gate="cpu"),
+        Case("render.processes", render_processes, processes_setup, gate="cpu"),
+    ], close
+
+
+def calibrate():
+    """Эталонная нагрузка того же рода, что у сборщиков: интерпретатор и выделение памяти"""
+    data = {i: f"proc-{i}" for i in range(100000)}
+    sorted(data.values(), reverse=True)
+
+
+def _measure(case, timing):
+    if case.setup:
+        case.setup()
+    # Сборка мусора, накопленного setup и прошлыми повторами, не попадает в замер
+    gc.collect()
+    gc.disable()
+    try:
+        with timing.measure(case.name) as sample:
+            case.fn()
+    finally:
+        gc.enable()
+    return sample
+
+
+def run_cases(cases, repeat, warmup=1):
+    """Замеры случаев: {имя: показатели}
+
+    Повторы идут кругами по всем случаям, а не подряд: замедление машины
+    на несколько секунд (соседние виртуальные машины, частота CPU)
+    задевает лишь часть повторов каждого случая, и минимум остается
+    устойчивым.
+    """
+    for case in cases:
+        for _ in range(warmup):
+            if case.setup:
+                case.setup()
+            case.fn()
+
+    timing = Overhead()
+    samples = {case.name: [] for case in cases}
+    for round_index in range(max((case.repeat or repeat for case in cases), default=0)):
+        for case in cases:
+            if round_index < (case.repeat or repeat):
+                samples[case.name].append(_measure(case, timing))
+
+    results = {}
+    for case in cases:
+        # Память замеряется отдельно: tracemalloc искажает время
+        memory = Overhead()
+        tracemalloc.start()
+        try:
+            if case.setup:
+                case.setup()
+            with memory.measure(case.name):
+                case.fn()
+        finally:
+            tracemalloc.stop()
+
+        wall = timing.summary()[case.name]["wall"]
+        cpu = timing.summary()[case.name]["cpu"]
+        results[case.name] = {
+            "runs": wall["count"],
+            "wall_p50": wall["p50"],
+            "wall_p95": wall["p95"],
+            "cpu_p50": cpu["p50"],
+            # Минимум повторов меньше всего зависит от фоновой нагрузки и используется при сравнении
+            "wall_min": min(sample.wall for sample in samples[case.name]),
+            "cpu_min": min(sample.cpu for sample in samples[case.name]),
+            "gate": case.gate,
+            "peak_alloc": memory.summary()[case.name]["peak_alloc"].get("max", 0),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Регрессии относительно базовой линии: (случай, показатель, было, стало)
+
+    Время сравнивается по минимуму повторов (wall_min или cpu_min по gate
+    случая), приведенному к скорости машины базовой линии по случаю
+    calibration; регрессия — ухудшение больше доли tolerance и больше
+    min_delta.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or name == CALIBRATION:
+            continue
+        gate = current["gate"] + "_min"
+        for field, floor in ((gate, min_delta), ("peak_alloc", 64 * 1024)):
+            old, new = base.get(field), current.get(field)
+            if old is None or new is None:
+                continue
+            if field == gate:
+                new /= machine_speed(results, baseline, field)
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append((name, field, old, new))
+    return regressions
+
+
+def machine_speed(results, baseline, field):
+    """Во сколько раз эталонная нагрузка шла медленнее, чем при записи базовой линии"""
+    current, base = results.get(CALIBRATION), baseline.get(CALIBRATION)
+    if not current or not base or not base.get(field):
+        return 1.0
+    return current[field] / base[field]
+
+
+def print_results(results, baseline=None):
+    print(f"{'случай':<28}{'запусков':>9}{'p50, мс':>11}{'p95, мс':>11}{'CPU, мс':>11}{'мин, мс':>13}"
+          f"{'память, КБ':>12}{'к базе':>9}")
+    for name, r in results.items():
+        # Минимум и сравнение с базой — по показателю gate случая
+        gate = r["gate"] + "_min"
+        ratio = ""
+        base = (baseline or {}).get(name)
+        if base and base.get(gate):
+            ratio = f"{r[gate] / base[gate]:.2f}x"
+        print(f"{name:<28}{r['runs']:>9}{r['wall_p50'] * 1000:>11.2f}{r['wall_p95'] * 1000:>11.2f}"
+              f"{r['cpu_p50'] * 1000:>11.2f}{r[gate] * 1000:>9.2f} {r['gate']:<3}"
+              f"{r['peak_alloc'] / 1024:>12.1f}{ratio:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры сборщиков и отрисовки на имитации системы")
+    parser.add_argument("--processes", type=int, default=10000, help="число процессов [10000]")
+    parser.add_argument("--sockets", type=int, default=50000, help="число TCP-соединений [50000]")
+    parser.add_argument("--mounts", type=int, default=200, help="число точек монтирования [200]")
+    parser.add_argument("--interfaces", type=int, default=32, help="число сетевых интерфейсов [32]")
+    parser.add_argument("--commands", type=int, default=16, help="число медленных внешних команд [16]")
+    parser.add_argument("--command-delay", type=float, default=0.2, help="длительность внешней команды, с [0.2]")
+    parser.add_argument("--repeat", type=int, default=20, help="повторов на случай [20]")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", default=None, help="только случаи с этим префиксом")
+    parser.add_argument("--no-gui", action="store_true", help="без замеров отрисовки Qt")
+    parser.add_argument("--save", default=None, help="сохранить результаты как базовую линию")
+    parser.add_argument("--compare", default=None, help="сравнить с базовой линией")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="допустимое ухудшение минимума, доля [0.5]")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="порог шума по времени, с [0.002]")
+    args = parser.parse_args()
+
+    params = {name: getattr(args, name) for name in
+              ("processes", "sockets", "mounts", "interfaces", "commands", "command_delay", "seed")}
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            data = json.load(f)
+        baseline = data["cases"]
+        if data.get("version") != BASELINE_VERSION:
+            print(f"Внимание: версия базовой линии {data.get('version')}, нужна {BASELINE_VERSION}; "
+                  "сохраните ее заново", file=sys.stderr)
+        if data.get("params") != params:
+            print(f"Внимание: параметры базовой линии отличаются: {data.get('params')}", file=sys.stderr)
+
+    system = FakeSystem(args.processes, args.mounts, args.interfaces, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="mosmaster-bench-") as tmp, fake_backends(system):
+        tcp_tables = build_proc(f"{tmp}/proc", args.sockets, seed=args.seed)
+        cases, cleanup = collector_cases(system, tcp_tables, f"{tmp}/proc", args.commands, args.command_delay)
+        cleanups = [cleanup]
+        if not args.no_gui:
+            try:
+                gui_cases, gui_cleanup = render_cases(system, f"{tmp}/archive")
+            except ImportError as e:
+                print(f"Замеры отрисовки пропущены: {e}", file=sys.stderr)
+            else:
+                cases += gui_cases
+                cleanups.append(gui_cleanup)
+        try:
+            cases = [Case(CALIBRATION, calibrate)] + [
+                case for case in cases if not args.only or case.name.startswith(args.only)]
+            results = run_cases(cases, args.repeat)
+        finally:
+            for cleanup in cleanups:
+                cleanup()
+
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"version": BASELINE_VERSION, "params": params, "cases": results}, f, indent=2)
+    if baseline is not None:
+        speed = machine_speed(results, baseline, "wall_min")
+        print(f"Эталонная нагрузка: {speed:.2f}x к базовой линии, время приведено к ней")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for name, field, old, new in regressions:
+            print(f"РЕГРЕССИЯ {name}: {field} {old:.6g} -> {new:.6g}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Проверки SystemChecker без лишних зависимостей
+
+Модуль используется агентом без GUI и пакетным режимом n.py; тяжелые
+модули (probe, asyncio) загружаются только проверкой hosts.
+"""
+import os
+import socket
+import subprocess
+
+from disks import disk_usage
+from overhead import measured
+
+
+class SystemChecker:
+    def __init__(self, overhead=None):
+        # Учет затрат каждой проверки, если передан overhead.Overhead
+        self.overhead = overhead
+
+    @measured
+    def check_internet(self, host="8.8.8.8", port=53):
+        """Проверка доступности интернета"""
+        try:
+            with socket.create_connection((host, int(port)), timeout=3):
+                pass
+            return True, f"Соединение с {host}:{port} установлено"
+        except Exception as e:
+            return False, f"Ошибка: {str(e)}"
+
+    @measured
+    def check_ping(self, host="google.com"):
+        """Проверка доступности хоста через ping"""
+        try:
+            result = subprocess.run(
+                ["ping", "-c", "1", "-W", "3", host],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=5
+            )
+            if result.returncode == 0:
+                return True, f"Успешный ping до {host}"
+            return False, f"Не удалось выполнить ping до {host}"
+        except Exception as e:
+            return False, f"Ошибка: {str(e)}"
+
+    @measured
+    def check_hosts(self, targets, ping=False, concurrency=100, timeout=3):
+        """Параллельная проверка списка хостов host:port"""
+        try:
+            # asyncio загружается только для этой проверки
+            from probe import ProbeEngine
+            engine = ProbeEngine(concurrency=concurrency, timeout=timeout)
+            results = engine.run(targets, ping=ping)
+            failed = sum(1 for r in results if not r.ok)
+            return failed == 0, results
+        except Exception as e:
+            return False, f"Ошибка: {str(e)}"
+
+    @measured
+    def check_disk(self, path="/", min_gb=5, timeout=5):
+        """Проверка свободного места на диске"""
+        try:
+            usage = disk_usage(path, timeout)
+            free_gb = usage.free / (1024**3)
+            total_gb = usage.total / (1024**3)
+            status = free_gb >= min_gb
+            msg = f"Свободно {free_gb:.1f}ГБ из {total_gb:.1f}ГБ"
+            return status, msg
+        except Exception as e:
+            return False, f"Ошибка: {str(e)}"
+
+    @measured
+    def check_resources(self):
+        """Проверка загрузки системы"""
+        try:
+            load = os.getloadavg()
+            mem = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024**3)
+            return True, f"Загрузка CPU: {load[0]:.2f}, Всего памяти: {mem:.1f}ГБ"
+        except Exception as e:
+            return False, f"Ошибка: {str(e)}"
@@ -0,0 +1,104 @@
+import time
+import platform
+from collections import namedtuple
+
+import psutil
+
+# Сведения о платформе не меняются за время работы и собираются один раз
+SystemInfo = namedtuple("SystemInfo", ["os_name", "os_release", "os_version", "processor", "boot_time"])
+
+# Неизменяемый снимок основных показателей системы
+DashboardSnapshot = namedtuple("DashboardSnapshot", [
+    "timestamp",
+    "cpu_percent", "per_cpu",
+    "mem_percent", "mem_used", "mem_total",
+    "disk_path", "disk_percent", "disk_used", "disk_total",
+    "net_sent", "net_recv",
+    "os_name", "os_release", "os_version", "processor", "boot_time",
+])
+
+
+def cpu_busy_percent(prev, cur):
+    """Загрузка CPU (%) по разнице двух замеров cpu_times"""
+    prev_total = sum(prev)
+    cur_total = sum(cur)
+    prev_idle = prev.idle + getattr(prev, "iowait", 0.0)
+    cur_idle = cur.idle + getattr(cur, "iowait", 0.0)
+    total = cur_total - prev_total
+    if total <= 0:
+        return 0.0
+    busy = total - (cur_idle - prev_idle)
+    return round(min(max(busy / total * 100, 0.0), 100.0), 1)
+
+
+def system_info():
+    return SystemInfo(
+        os_name=platform.system(),
+        os_release=platform.release(),
+        os_version=platform.version(),
+        processor=platform.processor(),
+        boot_time=psutil.boot_time(),
+    )
+
+
+class DashboardCollector:
+    """Сбор показателей для дашборда без блокирующих замеров"""
+
+    def __init__(self, disk_path="/"):
+        self.disk_path = disk_path
+        # platform.processor() может запускать uname, поэтому сведения собираются при первом замере
+        self.info = None
+        # Первый замер служит базой для расчета загрузки CPU
+        self._prev_cpu = psutil.cpu_times(percpu=True)
+
+    def sample(self):
+        """Снимок CPU, памяти, диска, сети и сведений о платформе"""
+        if self.info is None:
+            self.info = system_info()
+        cur_cpu = psutil.cpu_times(percpu=True)
+        per_cpu = tuple(cpu_busy_percent(p, c) for p, c in zip(self._prev_cpu, cur_cpu))
+        total = cpu_busy_percent(_sum_times(self._prev_cpu), _sum_times(cur_cpu))
+        self._prev_cpu = cur_cpu
+
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        net = psutil.net_io_counters()
+
+        return DashboardSnapshot(
+            timestamp=time.time(),
+            cpu_percent=total,
+            per_cpu=per_cpu,
+            mem_percent=mem.percent,
+            mem_used=mem.used,
+            mem_total=mem.total,
+            disk_path=self.disk_path,
+            disk_percent=disk.percent,
+            disk_used=disk.used,
+            disk_total=disk.total,
+            net_sent=net.bytes_sent if net else 0,
+            net_recv=net.bytes_recv if net else 0,
+            **self.info._asdict(),
+        )
+
+
+def _sum_times(per_cpu):
+    """Суммарные cpu_times по всем ядрам"""
+    fields = per_cpu[0]._fields
+    totals = [sum(getattr(t, name) for t in per_cpu) for name in fields]
+    return type(per_cpu[0])(*totals)
+
+
+def snapshot_metrics(snapshot, prev=None):
+    """Плоский словарь метрик снимка; скорости сети считаются по предыдущему снимку"""
+    metrics = {
+        "cpu": snapshot.cpu_percent,
+        "mem": snapshot.mem_percent,
+        "disk": snapshot.disk_percent,
+    }
+    for core, value in enumerate(snapshot.per_cpu):
+        metrics[f"cpu.core{core}"] = value
+    if prev is not None and snapshot.timestamp > prev.timestamp:
+        elapsed = snapshot.timestamp - prev.timestamp
+        metrics["net.sent"] = max(snapshot.net_sent - prev.net_sent, 0) / elapsed
+        metrics["net.recv"] = max(snapshot.net_recv - prev.net_recv, 0) / elapsed
+    return metrics
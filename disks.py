@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+import psutil
+
+# Псевдофайловые системы без пользовательских данных
+PSEUDO_FS = frozenset({
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs", "devpts",
+    "devtmpfs", "efivarfs", "fusectl", "hugetlbfs", "mqueue", "nsfs", "proc", "pstore",
+    "ramfs", "rpc_pipefs", "securityfs", "selinuxfs", "squashfs", "sysfs", "tmpfs", "tracefs",
+})
+
+DiskUsage = namedtuple("DiskUsage", ["total", "used", "free", "percent"])
+DiskRow = namedtuple("DiskRow", ["device", "mountpoint", "fstype", "total", "used", "free", "percent", "status"])
+DiskIORow = namedtuple("DiskIORow", ["device", "read_rate", "write_rate", "read_iops", "write_iops", "util"])
+
+STATUS_OK = "OK"
+STATUS_UNRESPONSIVE = "не отвечает"
+
+# Незавершенные statvfs по пути: повторный опрос зависшей точки ждет тот же поток
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+class _StatJob:
+    """statvfs в отдельном потоке: зависший вызов не блокирует вызывающего"""
+
+    def __init__(self, path):
+        self.path = path
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        threading.Thread(target=self._run, name=f"statvfs {path}", daemon=True).start()
+
+    def _run(self):
+        try:
+            self.result = os.statvfs(self.path)
+        except OSError as e:
+            self.error = e
+        finally:
+            with _pending_lock:
+                if _pending.get(self.path) is self:
+                    del _pending[self.path]
+            self.done.set()
+
+
+def _stat_job(path):
+    """Незавершенный statvfs для пути или новый; зависшие вызовы не накапливаются"""
+    with _pending_lock:
+        job = _pending.get(path)
+        if job is None:
+            job = _pending[path] = _StatJob(path)
+        return job
+
+
+def _usage(st):
+    total = st.f_blocks * st.f_frsize
+    free = st.f_bavail * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    percent = round(used / (used + free) * 100, 1) if used + free else 0.0
+    return DiskUsage(total, used, free, percent)
+
+
+def disk_usage(path, timeout=5.0):
+    """Занятость файловой системы; TimeoutError, если точка монтирования не отвечает"""
+    job = _stat_job(path)
+    if not job.done.wait(timeout):
+        raise TimeoutError(f"{path}: {STATUS_UNRESPONSIVE} ({timeout} с)")
+    if job.error is not None:
+        raise job.error
+    return _usage(job.result)
+
+
+class DiskScanner:
+    """Параллельный опрос точек монтирования и скорости ввода-вывода по устройствам"""
+
+    def __init__(self, timeout=2.0, pseudo_fs=PSEUDO_FS):
+        self.timeout = timeout
+        self.pseudo_fs = pseudo_fs
+        self._prev_io = None
+        self._prev_time = None
+        # Только для счетчиков io: scan, ждущий зависшую точку, не задерживает замер скоростей
+        self._io_lock = threading.Lock()
+
+    def partitions(self):
+        parts = []
+        seen = set()
+        for part in psutil.disk_partitions(all=True):
+            if part.fstype in self.pseudo_fs or part.mountpoint in seen:
+                continue
+            seen.add(part.mountpoint)
+            parts.append(part)
+        return parts
+
+    def scan(self):
+        """Занятость всех точек монтирования; не дольше self.timeout"""
+        # Пока предыдущий вызов для точки не завершился, новый не запускаем
+        jobs = [(part, _stat_job(part.mountpoint)) for part in self.partitions()]
+
+        deadline = time.monotonic() + self.timeout
+        rows = []
+        for part, job in jobs:
+            if job.done.wait(max(deadline - time.monotonic(), 0)):
+                if job.error is not None:
+                    rows.append(DiskRow(part.device, part.mountpoint, part.fstype,
+                                        None, None, None, None, f"ошибка: {job.error}"))
+                    continue
+                usage = _usage(job.result)
+                rows.append(DiskRow(part.device, part.mountpoint, part.fstype, *usage, STATUS_OK))
+            else:
+                rows.append(DiskRow(part.device, part.mountpoint, part.fstype,
+                                    None, None, None, None, STATUS_UNRESPONSIVE))
+        return rows
+
+    def io(self):
+        """Чтение/запись в байтах/с, IOPS и загрузка устройств по разнице счетчиков"""
+        with self._io_lock:
+            now = time.monotonic()
+            counters = psutil.disk_io_counters(perdisk=True) or {}
+            prev, prev_time = self._prev_io, self._prev_time
+            self._prev_io, self._prev_time = counters, now
+            if prev is None:
+                return []
+            elapsed = now - prev_time
+            rows = []
+            for device, cur in counters.items():
+                old = prev.get(device)
+                if old is None or elapsed <= 0:
+                    continue
+                busy = getattr(cur, "busy_time", 0) - getattr(old, "busy_time", 0)
+                rows.append(DiskIORow(
+                    device=device,
+                    read_rate=max(cur.read_bytes - old.read_bytes, 0) / elapsed,
+                    write_rate=max(cur.write_bytes - old.write_bytes, 0) / elapsed,
+                    read_iops=max(cur.read_count - old.read_count, 0) / elapsed,
+                    write_iops=max(cur.write_count - old.write_count, 0) / elapsed,
+                    util=round(min(max(busy, 0) / (elapsed * 1000) * 100, 100.0), 1),
+                ))
+            return rows
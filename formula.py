@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""Вычисление формул вида main.py по описанию из конфигурации
+
+Формула задается входами, шагами (промежуточными переменными) и
+политикой округления:
+
+    {
+        "inputs": ["A1", "A2", "A3", "A4", "A5"],
+        "steps": {
+            "B1": "A1*A5 if A4 < 5.7 else A3",
+            "B2": "A5^A1 if B1 >= 15 else sqrt(A5)",
+            "result": "A5^A1 / sqrt(B2) * cos(radians(A2)) + log(B1)"
+        },
+        "digits": 5,
+        "rounding": "each"
+    }
+
+Выражения записываются на Python (^ означает степень), условия — через
+x if cond else y. Округление до digits знаков:
+    each   — результат каждой операции, как в main.py
+    steps  — значение каждого шага
+    output — только результат
+    none   — без округления
+
+Описание разбирается один раз: одинаковые подвыражения (A5^A1 в B2 и в
+результате) считаются однократно, по описанию генерируются скалярная
+функция и векторное ядро numpy. Скомпилированные формулы кэшируются.
+
+    python formula.py task3.json --source
+    python formula.py task3.json 2 30 3 4 1.5
+"""
+import argparse
+import ast
+import functools
+import json
+import keyword
+import math
+import os
+
+ROUNDING = ("each", "steps", "output", "none")
+
+# Имя функции в выражении: (скалярная функция, функция numpy, число аргументов)
+FUNCTIONS = {
+    "sqrt": (math.sqrt, "sqrt", 1),
+    "exp": (math.exp, "exp", 1),
+    "log": (math.log, "log", 1),
+    "log10": (math.log10, "log10", 1),
+    "log2": (math.log2, "log2", 1),
+    "sin": (math.sin, "sin", 1),
+    "cos": (math.cos, "cos", 1),
+    "tan": (math.tan, "tan", 1),
+    "asin": (math.asin, "arcsin", 1),
+    "acos": (math.acos, "arccos", 1),
+    "atan": (math.atan, "arctan", 1),
+    "radians": (math.radians, "radians", 1),
+    "degrees": (math.degrees, "degrees", 1),
+    "abs": (abs, "absolute", 1),
+    "min": (min, "minimum", 2),
+    "max": (max, "maximum", 2),
+}
+
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+# Имена, которые использует сгенерированный код; входы и шаги не могут их перекрывать
+RESERVED = frozenset({"round", "formula"})
+
+# Ошибки, с которыми скалярная формула не дает результата (log(0), x/0, переполнение степени)
+SCALAR_ERRORS = (ValueError, TypeError, OverflowError, ZeroDivisionError)
+
+_BINARY = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/", ast.Pow: "**"}
+_COMPARE = {ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=", ast.Eq: "==", ast.NotEq: "!="}
+# Операции, результат которых не зависит от порядка операндов
+_COMMUTATIVE = ("+", "*")
+
+# Запас до границы округления в единицах последнего знака: абсолютный и относительный.
+# Относительный покрывает расхождение в несколько ulp между numpy и libm (pow, log).
+ABS_MARGIN = 1e-7
+REL_MARGIN = 2.0 ** -40
+# Выше этой величины x * 10^digits теряет дробную часть, и rint перестает совпадать с round
+SCALED_LIMIT = 2.0 ** 52
+
+
+class _Parser:
+    """Выражения шагов -> канонические кортежи (одинаковые подвыражения равны)"""
+
+    def __init__(self, inputs):
+        self.known = {name: ("in", name) for name in inputs}
+
+    def step(self, name, expr):
+        try:
+            tree = ast.parse(expr.replace("^", "**"), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"{name}: ошибка в выражении: {e.msg}")
+        key = self.node(name, tree.body)
+        self.known[name] = ("var", name)
+        return key
+
+    def node(self, step, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            return ("const", float(node.value))
+        if isinstance(node, ast.Name):
+            if node.id in self.known:
+                return self.known[node.id]
+            if node.id in CONSTANTS:
+                return ("const", CONSTANTS[node.id])
+            raise ValueError(f"{step}: неизвестное имя {node.id}")
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            op = _BINARY[type(node.op)]
+            left, right = self.node(step, node.left), self.node(step, node.right)
+            if op in _COMMUTATIVE:
+                left, right = sorted((left, right), key=repr)
+            return ("bin", op, left, right)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = self.node(step, node.operand)
+            return ("const", -operand[1]) if operand[0] == "const" else ("neg", operand)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            return self.node(step, node.operand)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ("not", self.node(step, node.operand))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            spec = FUNCTIONS.get(node.func.id)
+            if spec is None:
+                raise ValueError(f"{step}: неизвестная функция {node.func.id}")
+            if len(node.args) != spec[2]:
+                raise ValueError(f"{step}: {node.func.id} ожидает аргументов: {spec[2]}")
+            return ("call", node.func.id, *(self.node(step, arg) for arg in node.args))
+        if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+            operands = [self.node(step, node.left), *(self.node(step, item) for item in node.comparators)]
+            pairs = [("cmp", _COMPARE[type(op)], left, right)
+                     for op, left, right in zip(node.ops, operands, operands[1:])]
+            return pairs[0] if len(pairs) == 1 else ("and", *pairs)
+        if isinstance(node, ast.BoolOp):
+            kind = "and" if isinstance(node.op, ast.And) else "or"
+            return (kind, *(self.node(step, value) for value in node.values))
+        if isinstance(node, ast.IfExp):
+            return ("if", self.node(step, node.test), self.node(step, node.body), self.node(step, node.orelse))
+        raise ValueError(f"{step}: неподдерживаемая конструкция {type(node).__name__}")
+
+
+def _children(key):
+    if key[0] in ("const", "in", "var"):
+        return ()
+    # У bin, cmp и call на втором месте операция или имя функции
+    return key[2:] if key[0] in ("bin", "cmp", "call") else key[1:]
+
+
+def _unconditional(keys):
+    """Подвыражения, которые вычисляются при любых значениях входов"""
+    found = set()
+
+    def visit(key):
+        if key in found:
+            return
+        found.add(key)
+        if key[0] == "if":
+            visit(key[1])
+        else:
+            for child in _children(key):
+                visit(child)
+
+    for key in keys:
+        visit(key)
+    return found
+
+
+class _Emitter:
+    """Генерация кода с общими подвыражениями
+
+    Скалярный код сохраняет ветвления: подвыражение из ветки считается
+    только при выборе этой ветки, а если оно нужно и вне ветвлений,
+    выносится до условия и считается один раз. В векторном коде
+    ветвлений нет: обе ветки считаются целиком и выбираются через where.
+    """
+
+    def __init__(self, digits, round_ops, vector, hoist):
+        self.digits = digits
+        self.round_ops = round_ops
+        self.vector = vector
+        self.hoist = hoist
+        self.top = []
+        self.root = [{}]
+        self.count = 0
+
+    def emit(self, key, block, scopes):
+        """Имя переменной или литерал со значением key; код дописывается в block"""
+        if key[0] == "const":
+            return repr(key[1])
+        if key[0] in ("in", "var"):
+            return key[1]
+        for scope in scopes:
+            if key in scope:
+                return scope[key]
+        if self.vector or key in self.hoist:
+            block, scopes = self.top, self.root
+        self.count += 1
+        name = f"_t{self.count}"
+        if key[0] == "if":
+            test = self.emit(key[1], block, scopes)
+            if self.vector:
+                body, orelse = self.emit(key[2], block, scopes), self.emit(key[3], block, scopes)
+                block.append(f"{name} = _where({test}, {body}, {orelse})")
+            else:
+                branches = []
+                for branch in key[2:]:
+                    lines = []
+                    lines.append(f"{name} = {self.emit(branch, lines, [*scopes, {}])}")
+                    branches.append(lines)
+                block.append((test, *branches))
+        else:
+            block.append(f"{name} = {self.expression(key, block, scopes)}")
+        scopes[-1][key] = name
+        return name
+
+    def expression(self, key, block, scopes):
+        kind = key[0]
+        args = [self.emit(child, block, scopes) for child in _children(key)]
+        if kind == "cmp":
+            return f"{args[0]} {key[1]} {args[1]}"
+        if kind == "not":
+            return f"_not({args[0]})" if self.vector else f"not {args[0]}"
+        if kind in ("and", "or"):
+            if not self.vector:
+                return f" {kind} ".join(args)
+            text = args[0]
+            for arg in args[1:]:
+                text = f"_{kind}({text}, {arg})"
+            return text
+        if kind == "bin":
+            text = f"{args[0]} {key[1]} {args[1]}"
+        elif kind == "neg":
+            text = f"-{args[0]}"
+        else:
+            text = f"_{key[1]}({', '.join(args)})"
+        if self.round_ops:
+            return self.rounded(text)
+        return f"_check({text})" if self.vector else text
+
+    def rounded(self, text):
+        return f"_round({text})" if self.vector else f"round({text}, {self.digits})"
+
+    def assign(self, name, value, rounded):
+        self.top.append(f"{name} = {self.rounded(value) if rounded else value}")
+
+
+def _render(block, indent=1):
+    lines = []
+    pad = "    " * indent
+    for item in block:
+        if isinstance(item, str):
+            lines.append(pad + item)
+            continue
+        test, body, orelse = item
+        lines.append(f"{pad}if {test}:")
+        lines.extend(_render(body, indent + 1))
+        lines.append(f"{pad}else:")
+        lines.extend(_render(orelse, indent + 1))
+    return lines
+
+
+class VectorRounder:
+    """Векторное round(x, digits) с пометкой строк, где результат может отличаться от скалярного
+
+    rint(x * 10^digits) / 10^digits совпадает с round(x, digits), если
+    x * 10^digits не лежит рядом с серединой между целыми. Такие строки и
+    строки с inf/nan помечаются в suspect и пересчитываются скалярно.
+    """
+
+    def __init__(self, np, size, digits):
+        self.np = np
+        self.scale = 10.0 ** digits
+        self.suspect = np.zeros(size, dtype=bool)
+
+    def round(self, x, rows=None):
+        """Округление x; rows — маска строк, если x посчитан только для них"""
+        np = self.np
+        scaled = x * self.scale
+        magnitude = np.abs(scaled)
+        bad = (~np.isfinite(scaled) | (magnitude >= SCALED_LIMIT)
+               | (np.abs(scaled - np.floor(scaled) - 0.5) <= ABS_MARGIN + REL_MARGIN * magnitude))
+        if rows is None:
+            self.suspect |= bad
+        else:
+            self.suspect[rows] |= bad
+        return np.rint(scaled) / self.scale
+
+    def check(self, x):
+        # Вне округления скалярный расчет мог бы завершиться ошибкой только там, где numpy дал inf/nan
+        self.suspect |= ~self.np.isfinite(x)
+        return x
+
+
+class Formula:
+    """Скомпилированная формула: скалярная функция и векторное ядро"""
+
+    def __init__(self, inputs, steps, output=None, digits=5, rounding="each"):
+        if rounding not in ROUNDING:
+            raise ValueError(f"Неизвестная политика округления: {rounding}")
+        steps = list(steps.items() if isinstance(steps, dict) else steps)
+        if not steps:
+            raise ValueError("В формуле нет шагов")
+        names = [*inputs, *(name for name, _ in steps)]
+        for name in names:
+            if (not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_")
+                    or name in FUNCTIONS or name in CONSTANTS or name in RESERVED):
+                raise ValueError(f"Недопустимое имя: {name}")
+        if len(set(names)) != len(names):
+            raise ValueError("Имена входов и шагов повторяются")
+        self.inputs = tuple(inputs)
+        self.output = output or steps[-1][0]
+        if self.output not in dict(steps):
+            raise ValueError(f"Нет шага {self.output}")
+        self.digits = digits
+        self.rounding = "none" if digits is None else rounding
+
+        parser = _Parser(self.inputs)
+        self._steps = [(name, parser.step(name, expr)) for name, expr in steps]
+        self.source = self._generate(vector=False)
+        self.scalar = self._compile(self.source, {f"_{name}": spec[0] for name, spec in FUNCTIONS.items()})
+        self._kernel = None
+
+    def __call__(self, *args):
+        return self.scalar(*args)
+
+    @classmethod
+    def from_dict(cls, data):
+        return compile_formula(tuple(data["inputs"]), tuple(data["steps"].items()), data.get("output"),
+                               data.get("digits", 5), data.get("rounding", "each"))
+
+    @property
+    def kernel_source(self):
+        return self._generate(vector=True)
+
+    def _generate(self, vector):
+        keys = [key for _, key in self._steps]
+        emitter = _Emitter(self.digits, self.rounding == "each", vector, _unconditional(keys))
+        for name, key in self._steps:
+            value = emitter.emit(key, emitter.top, emitter.root)
+            rounded = self.rounding == "steps" or (self.rounding == "output" and name == self.output)
+            emitter.assign(name, value, rounded)
+        # Векторному ядру функции округления передаются при вызове: у каждого расчета своя маска
+        params = [*self.inputs, "_round", "_check"] if vector else self.inputs
+        head = f"def formula({', '.join(params)}):"
+        return "\n".join([head, *_render(emitter.top), f"    return {self.output}", ""])
+
+    def _compile(self, source, namespace):
+        namespace = dict(namespace)
+        exec(compile(source, f"<formula {self.output}>", "exec"), namespace)
+        return namespace["formula"]
+
+    def _build_kernel(self):
+        # numpy нужен только для векторного расчета
+        import numpy as np
+        namespace = {f"_{name}": getattr(np, spec[1]) for name, spec in FUNCTIONS.items()}
+        namespace.update(_where=np.where, _and=np.logical_and, _or=np.logical_or, _not=np.logical_not)
+        return self._compile(self.kernel_source, namespace)
+
+    @property
+    def vectorized(self):
+        """Векторное ядро дает тот же результат, что и скалярная функция
+
+        Только при округлении каждой операции: расхождение numpy и libm в
+        последних битах тогда либо снимается округлением, либо попадает в
+        запас у границы и пересчитывается скалярно. Без округления
+        промежуточных значений оно доходит до результата и до условий.
+        """
+        return self.rounding == "each"
+
+    def evaluate_array(self, a):
+        """Формула по строкам массива (n, число входов); возвращает (результаты, число ошибок)
+
+        Результат совпадает со скалярным: строки, где векторное округление
+        или inf/nan могут дать расхождение, пересчитываются скалярно, а
+        строки, на которых скалярная формула завершается ошибкой, дают nan.
+        Формулы без векторного ядра (см. vectorized) считаются построчно.
+        """
+        import numpy as np
+        a = np.asarray(a, dtype=float).reshape(-1, len(self.inputs))
+        if self.vectorized:
+            if self._kernel is None:
+                self._kernel = self._build_kernel()
+            rounder = VectorRounder(np, len(a), self.digits)
+            columns = (np.ascontiguousarray(column) for column in a.T)
+            with np.errstate(all="ignore"):
+                res = self._kernel(*columns, rounder.round, rounder.check)
+            res = np.array(np.broadcast_to(res, len(a)), dtype=float)
+            rows = np.flatnonzero(rounder.suspect)
+        else:
+            res = np.empty(len(a))
+            rows = range(len(a))
+        errors = 0
+        for row in rows:
+            try:
+                res[row] = self.scalar(*a[row].tolist())
+            except SCALAR_ERRORS:
+                res[row] = math.nan
+                errors += 1
+        return res, errors
+
+
+@functools.lru_cache(maxsize=64)
+def compile_formula(inputs, steps, output=None, digits=5, rounding="each"):
+    """Формула по описанию; одинаковые описания компилируются один раз"""
+    return Formula(inputs, dict(steps), output, digits, rounding)
+
+
+_files = {}
+
+
+def load_formula(path):
+    """Формула из JSON-файла; перечитывается только при изменении файла"""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _files.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data.get("steps"), dict) or not isinstance(data.get("inputs"), list):
+        raise ValueError(f"{path}: нужны inputs и steps")
+    formula = Formula.from_dict(data)
+    _files[path] = (mtime, formula)
+    return formula
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вычисление формулы по описанию")
+    parser.add_argument("config", help="JSON-описание формулы")
+    parser.add_argument("values", nargs="*", type=float, help="значения входов")
+    parser.add_argument("--source", action="store_true", help="показать сгенерированный код")
+    args = parser.parse_args()
+
+    formula = load_formula(args.config)
+    if args.source or not args.values:
+        print(formula.source)
+        print(formula.kernel_source)
+        return
+    if len(args.values) != len(formula.inputs):
+        parser.error(f"нужно значений: {len(formula.inputs)} ({', '.join(formula.inputs)})")
+    print(f"{formula(*args.values):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+from array import array
+from bisect import bisect_left
+
+from collectors import snapshot_metrics
+
+# Уровни прореживания: (длительность интервала в секундах, емкость)
+TIERS = ((60, 24 * 60), (600, 7 * 24 * 6))
+
+
+class RingBuffer:
+    """Кольцевой буфер фиксированной емкости на массивах array('d')"""
+
+    def __init__(self, capacity, fields=("value",)):
+        self.capacity = capacity
+        self.fields = fields
+        self.times = array("d", bytes(8 * capacity))
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in fields}
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, *values):
+        pos = self._head
+        self.times[pos] = timestamp
+        for field, value in zip(self.fields, values):
+            self.columns[field][pos] = value
+        self._head = (pos + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def last(self, field="value"):
+        if not self._size:
+            return None
+        pos = (self._head - 1) % self.capacity
+        return self.times[pos], self.columns[field][pos]
+
+    def series(self, field="value", since=None):
+        """Точки в хронологическом порядке: (времена, значения)"""
+        start = (self._head - self._size) % self.capacity
+        times = _unroll(self.times, start, self._size)
+        values = _unroll(self.columns[field], start, self._size)
+        if since is not None:
+            skip = bisect_left(times, since)
+            times, values = times[skip:], values[skip:]
+        return times, values
+
+
+def _unroll(data, start, size):
+    end = start + size
+    if end <= len(data):
+        return data[start:end]
+    return data[start:] + data[:end - len(data)]
+
+
+class MetricHistory:
+    """История одной метрики: сырые точки и прореженные min/avg/max"""
+
+    def __init__(self, raw_capacity=600):
+        self.raw = RingBuffer(raw_capacity)
+        self.tiers = {step: RingBuffer(capacity, ("min", "avg", "max")) for step, capacity in TIERS}
+        self._buckets = {step: None for step, _ in TIERS}
+
+    def append(self, timestamp, value):
+        self.raw.append(timestamp, value)
+        for step, tier in self.tiers.items():
+            start = timestamp - timestamp % step
+            bucket = self._buckets[step]
+            if bucket is not None and bucket[0] != start:
+                tier.append(bucket[0], bucket[2], bucket[3] / bucket[1], bucket[4])
+                bucket = None
+            if bucket is None:
+                # [начало интервала, число точек, min, сумма, max]
+                self._buckets[step] = [start, 1, value, value, value]
+            else:
+                bucket[1] += 1
+                bucket[2] = min(bucket[2], value)
+                bucket[3] += value
+                bucket[4] = max(bucket[4], value)
+
+    def series(self, step=None, field="avg", since=None):
+        """Сырые точки (step=None) или значения field прореженного уровня"""
+        if step is None:
+            return self.raw.series(since=since)
+        times, values = self.tiers[step].series(field, since)
+        bucket = self._buckets[step]
+        if bucket is not None:
+            # Незавершенный интервал тоже показываем
+            current = {"min": bucket[2], "avg": bucket[3] / bucket[1], "max": bucket[4]}[field]
+            times.append(bucket[0])
+            values.append(current)
+        return times, values
+
+
+class HistoryStore:
+    """Истории метрик дашборда; объем памяти не зависит от времени работы"""
+
+    def __init__(self, raw_capacity=600):
+        self.raw_capacity = raw_capacity
+        self.metrics = {}
+        self._prev = None
+
+    def append(self, name, timestamp, value):
+        history = self.metrics.get(name)
+        if history is None:
+            history = self.metrics[name] = MetricHistory(self.raw_capacity)
+        history.append(timestamp, value)
+
+    def get(self, name):
+        return self.metrics.get(name)
+
+    def names(self):
+        return sorted(self.metrics)
+
+    def record_snapshot(self, snapshot):
+        """Запись снимка DashboardSnapshot"""
+        self.record(snapshot.timestamp, snapshot_metrics(snapshot, self._prev))
+        self._prev = snapshot
+
+    def record(self, timestamp, metrics):
+        """Запись словаря {метрика: значение} с общей отметкой времени"""
+        for name, value in metrics.items():
+            self.append(name, timestamp, value)
@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""Хаб: снимки показателей многих хостов в одном месте
+
+Агенты держат постоянное TCP-соединение с хабом и отправляют снимки
+пачками в компактном двоичном виде; хаб хранит последний снимок каждого
+хоста в памяти. GUI и другие клиенты запрашивают у хаба список хостов и
+снимок выбранного хоста по тому же протоколу.
+
+Кадр: [длина данных u32][тип u8][данные], порядок байтов сетевой.
+    HELLO  — версия протокола, роль (агент/просмотр), имя клиента
+    DEFINE — номер хоста в соединении и его неизменные сведения
+             (имя, ОС, процессор, объемы памяти и диска); отправляется
+             один раз и повторно при изменении сведений
+    BATCH  — пачка записей: номер хоста, время, загрузка CPU по ядрам,
+             память, диск, счетчики сети; проценты — десятые доли в u16
+    QUERY  — запрос просмотра: имя хоста или пустая строка для списка
+    HOSTS  — ответ на запрос списка: имена хостов и возраст снимков
+
+    python hub.py serve --listen 0.0.0.0:9200
+    python hub.py simulate --hub 127.0.0.1:9200 --hosts 2000 --connections 4
+    python hub.py hosts --hub 127.0.0.1:9200
+    python agent.py --hub 127.0.0.1:9200
+"""
+import argparse
+import asyncio
+import random
+import socket
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from collectors import DashboardSnapshot
+
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 9200
+# Защита от мусора в потоке: кадр больше этого размера закрывает соединение
+MAX_FRAME = 16 * 1024 * 1024
+# Записей в одном кадре BATCH
+BATCH_LIMIT = 1000
+
+HELLO, DEFINE, BATCH, QUERY, HOSTS = range(1, 6)
+ROLE_AGENT, ROLE_VIEWER = 1, 2
+
+_HEADER = struct.Struct("!IB")
+_HELLO = struct.Struct("!BB")
+_DEFINE = struct.Struct("!IdQQ")
+_RECORD = struct.Struct("!IdHHHQQQQH")
+_COUNT = struct.Struct("!H")
+_HOSTS_COUNT = struct.Struct("!I")
+_AGE = struct.Struct("!d")
+_STRING = struct.Struct("!H")
+
+# Неизменные сведения хоста, которые передаются в DEFINE
+_STATIC_FIELDS = ("disk_path", "os_name", "os_release", "os_version", "processor")
+
+HostEntry = namedtuple("HostEntry", ["host", "snapshot", "received", "peer"])
+HubStats = namedtuple("HubStats", ["hosts", "connections", "frames", "records", "bytes"])
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def _pack_string(text):
+    data = text.encode("utf-8")[:0xFFFF]
+    return _STRING.pack(len(data)) + data
+
+
+def _unpack_string(payload, offset):
+    (size,) = _STRING.unpack_from(payload, offset)
+    offset += _STRING.size
+    if offset + size > len(payload):
+        raise ProtocolError("Обрезанная строка в кадре")
+    return bytes(payload[offset:offset + size]).decode("utf-8", "replace"), offset + size
+
+
+def _percent(value):
+    return min(max(int(round(value * 10)), 0), 0xFFFF)
+
+
+def frame(kind, payload=b""):
+    return _HEADER.pack(len(payload), kind) + payload
+
+
+def encode_hello(role, name):
+    return frame(HELLO, _HELLO.pack(PROTOCOL_VERSION, role) + _pack_string(name))
+
+
+def decode_hello(payload):
+    version, role = _HELLO.unpack_from(payload)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Неподдерживаемая версия протокола: {version}")
+    name, _ = _unpack_string(payload, _HELLO.size)
+    return role, name
+
+
+def static_info(snapshot):
+    """Сведения снимка, которые передаются в DEFINE, а не в каждой записи"""
+    return (snapshot.boot_time, snapshot.mem_total, snapshot.disk_total,
+            *(getattr(snapshot, field) for field in _STATIC_FIELDS))
+
+
+def encode_define(host_id, host, info):
+    boot_time, mem_total, disk_total, *strings = info
+    payload = _DEFINE.pack(host_id, boot_time, mem_total, disk_total) + _pack_string(host)
+    return frame(DEFINE, payload + b"".join(_pack_string(text) for text in strings))
+
+
+def decode_define(payload):
+    """(номер, имя хоста, неизменные сведения)"""
+    host_id, boot_time, mem_total, disk_total = _DEFINE.unpack_from(payload)
+    host, offset = _unpack_string(payload, _DEFINE.size)
+    strings = []
+    for _ in _STATIC_FIELDS:
+        text, offset = _unpack_string(payload, offset)
+        strings.append(text)
+    return host_id, host, (boot_time, mem_total, disk_total, *strings)
+
+
+def encode_batch(records):
+    """Кадр BATCH из пар (номер хоста, снимок)"""
+    parts = [_COUNT.pack(len(records))]
+    for host_id, snapshot in records:
+        cores = snapshot.per_cpu
+        parts.append(_RECORD.pack(
+            host_id, snapshot.timestamp,
+            _percent(snapshot.cpu_percent), _percent(snapshot.mem_percent), _percent(snapshot.disk_percent),
+            snapshot.mem_used, snapshot.disk_used, snapshot.net_sent, snapshot.net_recv, len(cores)))
+        parts.append(struct.pack(f"!{len(cores)}H", *map(_percent, cores)))
+    return frame(BATCH, b"".join(parts))
+
+
+def decode_batch(payload, defines):
+    """Снимки из кадра BATCH: [(имя хоста, снимок)]; defines — {номер: (имя, сведения)}"""
+    (count,) = _COUNT.unpack_from(payload)
+    offset = _COUNT.size
+    result = []
+    for _ in range(count):
+        (host_id, timestamp, cpu, mem, disk, mem_used, disk_used,
+         net_sent, net_recv, ncores) = _RECORD.unpack_from(payload, offset)
+        offset += _RECORD.size
+        cores = struct.unpack_from(f"!{ncores}H", payload, offset)
+        offset += 2 * ncores
+        defined = defines.get(host_id)
+        if defined is None:
+            raise ProtocolError(f"Запись для неопределенного хоста {host_id}")
+        host, (boot_time, mem_total, disk_total, disk_path, os_name, os_release, os_version,
+               processor) = defined
+        result.append((host, DashboardSnapshot(
+            timestamp=timestamp,
+            cpu_percent=cpu / 10,
+            per_cpu=tuple(value / 10 for value in cores),
+            mem_percent=mem / 10,
+            mem_used=mem_used,
+            mem_total=mem_total,
+            disk_path=disk_path,
+            disk_percent=disk / 10,
+            disk_used=disk_used,
+            disk_total=disk_total,
+            net_sent=net_sent,
+            net_recv=net_recv,
+            os_name=os_name,
+            os_release=os_release,
+            os_version=os_version,
+            processor=processor,
+            boot_time=boot_time,
+        )))
+    return result
+
+
+def encode_query(host=""):
+    return frame(QUERY, _pack_string(host))
+
+
+def encode_hosts(hosts):
+    parts = [_HOSTS_COUNT.pack(len(hosts))]
+    for host, age in hosts:
+        parts.append(_pack_string(host) + _AGE.pack(age))
+    return frame(HOSTS, b"".join(parts))
+
+
+def decode_hosts(payload):
+    (count,) = _HOSTS_COUNT.unpack_from(payload)
+    offset = _HOSTS_COUNT.size
+    hosts = []
+    for _ in range(count):
+        host, offset = _unpack_string(payload, offset)
+        (age,) = _AGE.unpack_from(payload, offset)
+        offset += _AGE.size
+        hosts.append((host, age))
+    return hosts
+
+
+class HostIndex:
+    """Последний снимок каждого хоста"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def update(self, snapshots, peer=None):
+        """Пачка пар (имя хоста, снимок) под одной блокировкой"""
+        received = self.clock()
+        with self._lock:
+            for host, snapshot in snapshots:
+                self._hosts[host] = HostEntry(host, snapshot, received, peer)
+
+    def get(self, host):
+        with self._lock:
+            return self._hosts.get(host)
+
+    def hosts(self):
+        """[(имя хоста, секунд с последнего снимка)] по имени"""
+        now = self.clock()
+        with self._lock:
+            entries = list(self._hosts.values())
+        return sorted((entry.host, now - entry.received) for entry in entries)
+
+    def expire(self, max_age):
+        """Удаление хостов без снимков дольше max_age секунд"""
+        limit = self.clock() - max_age
+        with self._lock:
+            stale = [host for host, entry in self._hosts.items() if entry.received < limit]
+            for host in stale:
+                del self._hosts[host]
+        return stale
+
+
+class Hub:
+    """Асинхронный TCP-сервер, принимающий снимки агентов в HostIndex"""
+
+    def __init__(self, host="0.0.0.0", port=DEFAULT_PORT, index=None, expire=3600.0):
+        self.host = host
+        self.port = port
+        self.index = index or HostIndex()
+        self.expire = expire
+        self.connections = 0
+        self.frames = 0
+        self.records = 0
+        self.bytes = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._handlers = set()
+
+    def stats(self):
+        return HubStats(len(self.index), self.connections, self.frames, self.records, self.bytes)
+
+    async def serve(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # При порте 0 система выбирает свободный порт
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def _handle(self, reader, writer):
+        peer = "%s:%s" % writer.get_extra_info("peername")[:2]
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connections += 1
+        handler = (asyncio.current_task(), writer)
+        self._handlers.add(handler)
+        defines = {}
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                size, kind = _HEADER.unpack(header)
+                if size > MAX_FRAME:
+                    raise ProtocolError(f"Слишком большой кадр: {size}")
+                payload = await reader.readexactly(size)
+                self.frames += 1
+                self.bytes += _HEADER.size + size
+                if kind == BATCH:
+                    snapshots = decode_batch(payload, defines)
+                    self.index.update(snapshots, peer)
+                    self.records += len(snapshots)
+                elif kind == DEFINE:
+                    host_id, host, info = decode_define(payload)
+                    defines[host_id] = (host, info)
+                elif kind == QUERY:
+                    writer.write(self._answer(_unpack_string(payload, 0)[0]))
+                    await writer.drain()
+                elif kind == HELLO:
+                    decode_hello(payload)
+                else:
+                    raise ProtocolError(f"Неизвестный тип кадра: {kind}")
+        except (ProtocolError, struct.error, asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Соединение {peer} закрыто: {e}", flush=True)
+        finally:
+            self.connections -= 1
+            self._handlers.discard(handler)
+            writer.close()
+
+    def _answer(self, host):
+        if not host:
+            return encode_hosts(self.index.hosts())
+        entry = self.index.get(host)
+        if entry is None:
+            return encode_batch([])
+        return encode_define(0, host, static_info(entry.snapshot)) + encode_batch([(0, entry.snapshot)])
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(min(self.expire, 60.0))
+            self.index.expire(self.expire)
+
+    def start(self):
+        """Запуск в отдельном потоке; возвращает после открытия порта"""
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.serve())
+            except OSError as e:
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            expiring = self._loop.create_task(self._expire_loop())
+            self._loop.run_forever()
+            # Остановка: сокеты агентов закрываются, обработчики завершаются по концу потока
+            expiring.cancel()
+            self._server.close()
+            handlers = list(self._handlers)
+            for task, writer in handlers:
+                writer.close()
+            self._loop.run_until_complete(asyncio.gather(
+                expiring, *(task for task, _ in handlers), return_exceptions=True))
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="hub", daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        return self._thread
+
+    def stop(self):
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+
+def parse_address(address, default_port=DEFAULT_PORT):
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        return address, default_port
+    return host or "127.0.0.1", int(port)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Хаб закрыл соединение")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(sock):
+    size, kind = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_FRAME:
+        raise ProtocolError(f"Слишком большой кадр: {size}")
+    return kind, _recv_exact(sock, size)
+
+
+class _Connection:
+    """Блокирующее соединение с хабом с переподключением не чаще раза в retry секунд"""
+
+    def __init__(self, address, role, name=None, timeout=5.0, retry=5.0):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.role = role
+        self.name = name or socket.gethostname()
+        self.timeout = timeout
+        self.retry = retry
+        self.error = None
+        self._sock = None
+        self._next_attempt = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._sock is not None:
+            return self._sock
+        if time.monotonic() < self._next_attempt:
+            raise ConnectionError(self.error or "Нет соединения с хабом")
+        try:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.sendall(encode_hello(self.role, self.name))
+        except OSError as e:
+            self._fail(e)
+            raise
+        self._sock = sock
+        self.error = None
+        self.connected()
+        return sock
+
+    def connected(self):
+        pass
+
+    def _fail(self, error):
+        self.error = str(error)
+        self._next_attempt = time.monotonic() + self.retry
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+
+class HubClient(_Connection):
+    """Отправка снимков хостов на хаб
+
+    Каждому хосту выдается номер в соединении; сведения хоста (DEFINE)
+    отправляются при первом снимке, после переподключения и при их
+    изменении. Ошибки сети не прерывают сбор: send возвращает False, а
+    переподключение выполняется при следующей отправке.
+    """
+
+    def __init__(self, address, name=None, timeout=5.0, retry=5.0):
+        super().__init__(address, ROLE_AGENT, name, timeout, retry)
+        self._ids = {}
+        self._defined = {}
+
+    def connected(self):
+        self._defined = {}
+
+    def send(self, snapshots):
+        """Отправка пар (имя хоста, снимок) пачками по BATCH_LIMIT"""
+        with self._lock:
+            try:
+                sock = self._connect()
+            except OSError:
+                return False
+            parts = []
+            records = []
+            for host, snapshot in snapshots:
+                host_id = self._ids.setdefault(host, len(self._ids) + 1)
+                info = static_info(snapshot)
+                if self._defined.get(host_id) != info:
+                    parts.append(encode_define(host_id, host, info))
+                    self._defined[host_id] = info
+                records.append((host_id, snapshot))
+            for start in range(0, len(records), BATCH_LIMIT):
+                parts.append(encode_batch(records[start:start + BATCH_LIMIT]))
+            try:
+                sock.sendall(b"".join(parts))
+            except OSError as e:
+                self._fail(e)
+                return False
+            return True
+
+
+class HubReader(_Connection):
+    """Запросы просмотра к хабу: список хостов и снимок хоста"""
+
+    def __init__(self, address, name=None, timeout=5.0, retry=5.0):
+        super().__init__(address, ROLE_VIEWER, name, timeout, retry)
+
+    def _request(self, host):
+        with self._lock:
+            sock = self._connect()
+            try:
+                sock.sendall(encode_query(host))
+                kind, payload = _recv_frame(sock)
+                if kind == HOSTS:
+                    return kind, payload, None
+                defines = {}
+                if kind == DEFINE:
+                    host_id, name, info = decode_define(payload)
+                    defines[host_id] = (name, info)
+                    kind, payload = _recv_frame(sock)
+                return kind, payload, defines
+            except (OSError, ProtocolError) as e:
+                self._fail(e)
+                raise
+
+    def hosts(self):
+        kind, payload, _ = self._request("")
+        return decode_hosts(payload)
+
+    def snapshot(self, host):
+        """Последний снимок хоста или None, если хаб его не знает"""
+        kind, payload, defines = self._request(host)
+        records = decode_batch(payload, defines)
+        return records[0][1] if records else None
+
+
+class SimulatedHost:
+    """Синтетический хост: показатели случайно блуждают в допустимых пределах"""
+
+    def __init__(self, name, rng):
+        self.name = name
+        self.rng = rng
+        self.cores = rng.choice((2, 4, 8, 16))
+        self.per_cpu = [rng.uniform(0, 60) for _ in range(self.cores)]
+        self.mem_total = rng.choice((4, 8, 16, 64)) * 1024 ** 3
+        self.mem_percent = rng.uniform(20, 80)
+        self.disk_total = rng.choice((50, 200, 1000)) * 1024 ** 3
+        self.disk_percent = rng.uniform(10, 90)
+        self.net_sent = self.net_recv = 0
+        self.boot_time = time.time() - rng.uniform(0, 30 * 86400)
+
+    def _walk(self, value, step):
+        return min(max(value + self.rng.uniform(-step, step), 0.0), 100.0)
+
+    def sample(self):
+        self.per_cpu = [self._walk(value, 10) for value in self.per_cpu]
+        self.mem_percent = self._walk(self.mem_percent, 2)
+        self.disk_percent = self._walk(self.disk_percent, 0.1)
+        self.net_sent += int(self.rng.expovariate(1 / 200000))
+        self.net_recv += int(self.rng.expovariate(1 / 500000))
+        return DashboardSnapshot(
+            timestamp=time.time(),
+            cpu_percent=round(sum(self.per_cpu) / self.cores, 1),
+            per_cpu=tuple(round(value, 1) for value in self.per_cpu),
+            mem_percent=round(self.mem_percent, 1),
+            mem_used=int(self.mem_total * self.mem_percent / 100),
+            mem_total=self.mem_total,
+            disk_path="/",
+            disk_percent=round(self.disk_percent, 1),
+            disk_used=int(self.disk_total * self.disk_percent / 100),
+            disk_total=self.disk_total,
+            net_sent=self.net_sent,
+            net_recv=self.net_recv,
+            os_name="Linux",
+            os_release="6.1.0-sim",
+            os_version="#1 SMP",
+            processor="x86_64",
+            boot_time=self.boot_time,
+        )
+
+
+def simulate(address, hosts=100, connections=1, interval=1.0, duration=None, prefix="sim", seed=None):
+    """Имитация агентов: hosts хостов через connections соединений, снимок раз в interval секунд"""
+    rng = random.Random(seed)
+    fleet = [SimulatedHost(f"{prefix}-{i:05d}", rng) for i in range(hosts)]
+    stop = threading.Event()
+    sent = [0] * connections
+
+    def worker(index):
+        client = HubClient(address, name=f"{prefix}-simulator-{index}")
+        group = fleet[index::connections]
+        next_due = time.monotonic()
+        while not stop.is_set():
+            if client.send([(host.name, host.sample()) for host in group]):
+                sent[index] += len(group)
+            next_due += interval
+            stop.wait(max(next_due - time.monotonic(), 0))
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    try:
+        stop.wait(duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(sent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хаб снимков показателей многих хостов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="запуск хаба")
+    serve_parser.add_argument("--listen", default=f"0.0.0.0:{DEFAULT_PORT}",
+                              help=f"адрес приема [0.0.0.0:{DEFAULT_PORT}]")
+    serve_parser.add_argument("--expire", type=float, default=3600.0,
+                              help="забывать хосты без снимков дольше, секунд [3600]")
+    serve_parser.add_argument("--stats", type=float, default=10.0, help="период вывода статистики, секунд [10]")
+
+    simulate_parser = commands.add_parser("simulate", help="имитация агентов")
+    simulate_parser.add_argument("--hub", default=f"127.0.0.1:{DEFAULT_PORT}", help="адрес хаба")
+    simulate_parser.add_argument("--hosts", type=int, default=100, help="число хостов [100]")
+    simulate_parser.add_argument("--connections", type=int, default=1, help="число соединений [1]")
+    simulate_parser.add_argument("--interval", type=float, default=1.0, help="период снимков, секунд [1]")
+    simulate_parser.add_argument("--duration", type=float, default=None, help="длительность, секунд")
+    simulate_parser.add_argument("--prefix", default="sim", help="префикс имен хостов [sim]")
+
+    hosts_parser = commands.add_parser("hosts", help="список хостов на хабе")
+    hosts_parser.add_argument("--hub", default=f"127.0.0.1:{DEFAULT_PORT}", help="адрес хаба")
+    args = parser.parse_args()
+
+    if args.command == "hosts":
+        reader = HubReader(args.hub)
+        for host, age in reader.hosts():
+            print(f"{host}\t{age:.1f} с назад")
+        return
+
+    if args.command == "simulate":
+        start = time.monotonic()
+        sent = simulate(args.hub, args.hosts, args.connections, args.interval, args.duration, args.prefix)
+        elapsed = time.monotonic() - start
+        print(f"Отправлено снимков: {sent} за {elapsed:.1f} с ({sent / max(elapsed, 1e-9):.0f}/с)")
+        return
+
+    host, port = parse_address(args.listen)
+    hub = Hub(host, port, expire=args.expire)
+    hub.start()
+    print(f"Хаб слушает {host}:{hub.port}", flush=True)
+    previous = hub.stats()
+    try:
+        while True:
+            time.sleep(args.stats)
+            current = hub.stats()
+            records = (current.records - previous.records) / args.stats
+            rate = (current.bytes - previous.bytes) / args.stats / 1024
+            print(f"Хостов: {current.hosts}, соединений: {current.connections}, "
+                  f"снимков/с: {records:.0f}, КБ/с: {rate:.1f}", flush=True)
+            previous = current
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.stop()
+
+
+if __name__ == "__main__":
+    main()
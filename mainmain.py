@@ -1,13 +1,49 @@
+import time
+
+# Отсчет времени запуска начинается до загрузки Qt
+STARTED = time.perf_counter()
+
+import os
 import sys
-import subprocess
-import psutil
-import platform
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QTextEdit, QTabWidget, QLabel, QProgressBar,
-                             QMessageBox, QFileDialog)
+                             QMessageBox, QFileDialog, QSplitter, QGridLayout, QComboBox, QCheckBox)
 from PyQt5.QtGui import QColor, QTextCursor
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QEvent, QTimer
+
+from alerts import AlertEngine
+from archive import MetricsArchive
+from collectors import DashboardCollector, snapshot_metrics, system_info
+from history import HistoryStore
+from models import Column, SnapshotTableModel, TableView
+from overhead import Overhead
+from scheduler import Scheduler
+from widgets import Sparkline
+from workers import CollectorThread, CommandBridge, TaskRunner
+
+# Время жизни кэша результатов внешних команд, секунды
+COMMAND_CACHE_TTL = 60
+# Цвета индикаторов по уровню тревоги
+SEVERITY_COLORS = {"ok": "#4CAF50", "warning": "#ffbb33", "critical": "#ff4444"}
+
+# Допустимая собственная загрузка CPU монитора, % одного ядра
+MONITOR_CPU_BUDGET = 5.0
+
+# Целевое время от загрузки модуля до первой отрисовки окна, секунды
+STARTUP_TARGET = 1.0
+
+# Глубина просмотра архива на дашборде, секунды
+ARCHIVE_VIEW_SECONDS = 7 * 24 * 3600
+# Период обновления рядов архива на дашборде, секунды
+ARCHIVE_VIEW_INTERVAL = 30.0
+
+# Адрес хаба (hub.py) для просмотра других хостов на дашборде
+HUB_ADDRESS = os.environ.get("MOSMASTER_HUB")
+
+
+MB = 1024**2
+GB = 1024**3
 
 class SystemCheckApp(QMainWindow):
     def __init__(self):
@@ -15,9 +51,53 @@ class SystemCheckApp(QMainWindow):
         self.setWindowTitle("Комплексный мониторинг ОС РОСА")
         self.setGeometry(100, 100, 1024, 768)
         
+        # История показателей дашборда
+        self.history = HistoryStore(raw_capacity=600)
+        self.last_snapshot = None
+
+        # Хост дашборда: None — этот компьютер, иначе имя хоста на хабе
+        self.dashboard_host = None
+        self.hub_reader = None
+        self.remote_history = HistoryStore(raw_capacity=600)
+        self.remote_snapshot = None
+
+        # Правила тревог из конфигурационного файла
+        try:
+            self.alerts = AlertEngine.from_file()
+        except (OSError, ValueError) as e:
+            self.alerts = AlertEngine()
+            self.statusBar().showMessage(f"Правила тревог не загружены: {e}")
+        self.progress_colors = {}
+
+        # Архив показателей на диске
+        try:
+            self.archive = MetricsArchive()
+        except OSError as e:
+            self.archive = None
+            self.statusBar().showMessage(f"Архив показателей недоступен: {e}")
+        # Прореженные ряды архива по метрикам и число точек для каждой
+        self.archive_series = {}
+        self.archive_points = {}
+
+        # Внешние команды выполняются асинхронно; мост создается при первой команде
+        self.commands = None
+        # Отчеты формируются в фоне; пул создается вместе с вкладкой отчетов
+        self.tasks = None
+
+        # Собственные затраты монитора по проверкам и сборщикам
+        self.overhead = Overhead()
+        self.capture_pending = set()
+        self.startup_reported = False
+
+        # Вкладки, содержимое и сборщики которых создаются при первом открытии
+        self.lazy_tabs = {}
+        # Сборщики, работающие только пока их вкладка видна
+        self.tab_jobs = {}
+        self.collected_handlers = {}
+
         # Инициализация UI
         self.init_ui()
-        self.init_timer()
+        self.init_collectors()
         
         # Стили
         self.setStyleSheet("""
@@ -46,8 +126,9 @@ class SystemCheckApp(QMainWindow):
         self.mem_label = QLabel("MEM: ")
         self.disk_label = QLabel("DISK: ")
         self.net_label = QLabel("NET: ")
+        self.alerts_label = QLabel("Тревоги: 0")
         
-        for widget in [self.cpu_label, self.mem_label, self.disk_label, self.net_label]:
+        for widget in [self.cpu_label, self.mem_label, self.disk_label, self.net_label, self.alerts_label]:
             self.status_bar.addWidget(widget)
         
         layout.addLayout(self.status_bar)
@@ -59,7 +140,30 @@ class SystemCheckApp(QMainWindow):
         # Создание вкладок
         self.create_dashboard_tab()
         self.create_detailed_checks_tab()
-        self.create_report_tab()
+        self.add_lazy_tab(self.tabs, "Отчеты", self.create_report_tab)
+        self.add_lazy_tab(self.tabs, "Нагрузка монитора", self.create_overhead_tab)
+
+    def add_lazy_tab(self, tabs, title, builder):
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        tabs.addTab(container, title)
+        self.lazy_tabs[container] = builder
+
+    def build_visible_tabs(self):
+        for container, builder in list(self.lazy_tabs.items()):
+            if container.isVisible():
+                del self.lazy_tabs[container]
+                start = time.perf_counter()
+                widget, jobs = builder()
+                container.layout().addWidget(widget)
+                self.tab_jobs[container] = jobs
+                self.overhead.record(f"build_tab: {builder.__name__}", time.perf_counter() - start)
+
+    def add_job(self, name, fn, interval, handler):
+        # Сборщик вкладки включается, когда вкладка видна
+        self.scheduler.add(name, fn, interval=interval, active=False)
+        self.collected_handlers[name] = handler
 
     def create_dashboard_tab(self):
         tab = QWidget()
@@ -74,14 +178,49 @@ class SystemCheckApp(QMainWindow):
         self.mem_progress = QProgressBar()
         self.disk_progress = QProgressBar()
 
+        # История показателей
+        self.history_range = QComboBox()
+        for title, step in [("10 минут", None), ("Сутки, по минутам", 60), ("Неделя, по 10 минут", 600),
+                            ("Архив, 7 дней", "archive")]:
+            self.history_range.addItem(title, step)
+        self.history_range.currentIndexChanged.connect(self.update_sparklines)
+        self.history_range.currentIndexChanged.connect(self.update_archive_view)
+        net_fmt = lambda v: f"{v / 1024:.1f} КБ/с"
+        self.sparklines = {
+            "cpu": Sparkline("CPU", max_value=100),
+            "mem": Sparkline("Память", max_value=100),
+            "disk": Sparkline("Диск /", max_value=100),
+            "net.recv": Sparkline("Сеть, прием", fmt=net_fmt),
+            "net.sent": Sparkline("Сеть, передача", fmt=net_fmt),
+        }
+        sparkline_grid = QGridLayout()
+        for i, sparkline in enumerate(self.sparklines.values()):
+            sparkline_grid.addWidget(sparkline, i // 2, i % 2)
+
         # Кнопки
         self.btn_refresh = QPushButton("Обновить данные")
         self.btn_refresh.clicked.connect(self.update_dashboard)
         
+        if HUB_ADDRESS:
+            # Хосты с хаба добавляются в список по мере появления
+            self.host_selector = QComboBox()
+            self.host_selector.addItem("Этот компьютер", None)
+            self.host_selector.currentIndexChanged.connect(self.select_host)
+            host_header = QHBoxLayout()
+            host_header.addWidget(QLabel("Хост:"))
+            host_header.addWidget(self.host_selector)
+            host_header.addStretch()
+            layout.addLayout(host_header)
         layout.addWidget(QLabel("Основные показатели:"))
         layout.addWidget(self.cpu_progress)
         layout.addWidget(self.mem_progress)
         layout.addWidget(self.disk_progress)
+        history_header = QHBoxLayout()
+        history_header.addWidget(QLabel("История:"))
+        history_header.addWidget(self.history_range)
+        history_header.addStretch()
+        layout.addLayout(history_header)
+        layout.addLayout(sparkline_grid)
         layout.addWidget(QLabel("Системная информация:"))
         layout.addWidget(self.sys_info)
         layout.addWidget(self.btn_refresh)
@@ -97,191 +236,585 @@ class SystemCheckApp(QMainWindow):
         self.detailed_tabs = QTabWidget()
         
         # Создание подвкладок
-        self.create_network_subtab()
-        self.create_disk_subtab()
-        self.create_services_subtab()
-        self.create_processes_subtab()
-        self.create_security_subtab()
+        self.add_lazy_tab(self.detailed_tabs, "Сеть", self.create_network_subtab)
+        self.add_lazy_tab(self.detailed_tabs, "Диски", self.create_disk_subtab)
+        self.add_lazy_tab(self.detailed_tabs, "Сервисы", self.create_services_subtab)
+        self.add_lazy_tab(self.detailed_tabs, "Процессы", self.create_processes_subtab)
+        self.add_lazy_tab(self.detailed_tabs, "Безопасность", self.create_security_subtab)
         
         layout.addWidget(self.detailed_tabs)
         tab.setLayout(layout)
         self.tabs.addTab(tab, "Детальные проверки")
 
     def create_network_subtab(self):
+        from network import NetworkCollector
+        # Счетчики интерфейсов и владельцы сокетов сохраняются между обновлениями
+        self.network_collector = NetworkCollector()
+        self.add_job("network", self.collect_network, 2.0, self.apply_network)
+
         subtab = QWidget()
         layout = QVBoxLayout()
         
-        self.network_info = QTextEdit()
-        self.network_info.setReadOnly(True)
+        rate = lambda v: f"{v:.1f}"
+        self.interfaces_table = TableView(SnapshotTableModel([
+            Column("Интерфейс", "name"),
+            Column("Статус", "isup", lambda up: "UP" if up else "DOWN"),
+            Column("Передача, КБ/с", "sent_rate", lambda v: f"{v / 1024:.1f}"),
+            Column("Прием, КБ/с", "recv_rate", lambda v: f"{v / 1024:.1f}"),
+            Column("Пакетов/с, передача", "packets_sent_rate", rate),
+            Column("Пакетов/с, прием", "packets_recv_rate", rate),
+            Column("Ошибок/с", "error_rate", rate),
+            Column("Потерь/с", "drop_rate", rate),
+            Column("Отправлено, MB", "bytes_sent", lambda v: f"{v / MB:.2f}"),
+            Column("Получено, MB", "bytes_recv", lambda v: f"{v / MB:.2f}"),
+            Column("Адреса", "addresses"),
+        ], color=lambda row: "#008000" if row.isup else "#ff0000"))
+        self.connections_table = TableView(SnapshotTableModel([
+            Column("Локальный адрес", "laddr"),
+            Column("Удаленный адрес", "raddr"),
+            Column("PID", "pid"),
+        ], key=lambda row: row.inode))
         btn_network = QPushButton("Проверить сеть")
         btn_network.clicked.connect(self.check_network)
-        
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.interfaces_table)
+        splitter.addWidget(self.connections_table)
+
         layout.addWidget(btn_network)
-        layout.addWidget(self.network_info)
+        layout.addWidget(splitter)
         subtab.setLayout(layout)
-        self.detailed_tabs.addTab(subtab, "Сеть")
+        return subtab, ("network",)
 
     def create_disk_subtab(self):
+        from disks import DiskScanner, STATUS_OK
+        # Точки монтирования опрашиваются параллельно с ограничением по времени
+        self.disk_scanner = DiskScanner(timeout=2.0)
+        self.add_job("disks", self.disk_scanner.scan, 30.0, self.apply_disks)
+        self.add_job("disk_io", self.disk_scanner.io, 2.0, self.apply_disk_io)
+
         subtab = QWidget()
         layout = QVBoxLayout()
         
         self.disk_info = QTextEdit()
         self.disk_info.setReadOnly(True)
+        self.partitions_table = TableView(SnapshotTableModel([
+            Column("Устройство", "device"),
+            Column("Точка монтирования", "mountpoint"),
+            Column("Файловая система", "fstype"),
+            Column("Всего, GB", "total", lambda v: f"{v / GB:.2f}"),
+            Column("Свободно, GB", "free", lambda v: f"{v / GB:.2f}"),
+            Column("Использовано, %", "percent"),
+            Column("Состояние", "status"),
+        ], key=lambda row: row.mountpoint,
+           color=lambda row: "#ff0000" if row.status != STATUS_OK
+                 or self.alerts.severity(f"mount.percent:{row.mountpoint}") != "ok" else None))
+        rate = lambda v: f"{v:.1f}"
+        self.disk_io_table = TableView(SnapshotTableModel([
+            Column("Устройство", "device"),
+            Column("Чтение, КБ/с", "read_rate", lambda v: f"{v / 1024:.1f}"),
+            Column("Запись, КБ/с", "write_rate", lambda v: f"{v / 1024:.1f}"),
+            Column("IOPS чтения", "read_iops", rate),
+            Column("IOPS записи", "write_iops", rate),
+            Column("Загрузка, %", "util"),
+        ]), sort_column=5)
         btn_disk = QPushButton("Проверить диски")
         btn_disk.clicked.connect(self.check_disks)
-        
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.partitions_table)
+        splitter.addWidget(self.disk_io_table)
+        splitter.addWidget(self.disk_info)
+
         layout.addWidget(btn_disk)
-        layout.addWidget(self.disk_info)
+        layout.addWidget(splitter)
         subtab.setLayout(layout)
-        self.detailed_tabs.addTab(subtab, "Диски")
+        return subtab, ("disks", "disk_io")
 
     def create_services_subtab(self):
+        from services import ServiceCollector
+        # Один запрос systemctl show на все юниты; в таблицу и тревоги уходят только изменения
+        self.service_collector = ServiceCollector()
+        self.add_job("services", self.service_collector.refresh, 10.0, self.apply_services)
+
         subtab = QWidget()
         layout = QVBoxLayout()
         
         self.services_info = QTextEdit()
         self.services_info.setReadOnly(True)
+        self.append_colored_text(self.services_info, "=== Изменения сервисов ===", "#000080")
+        self.services_label = QLabel()
+        self.services_table = TableView(SnapshotTableModel([
+            Column("Юнит", "unit"),
+            Column("Загрузка", "load"),
+            Column("Состояние", "active"),
+            Column("Подсостояние", "sub"),
+            Column("Автозагрузка", "enabled"),
+            Column("Описание", "description"),
+        ], key=lambda row: row.unit,
+           color=lambda row: "#ff0000" if row.active == "failed" else None))
         btn_services = QPushButton("Проверить сервисы")
         btn_services.clicked.connect(self.check_services)
-        
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.services_table)
+        splitter.addWidget(self.services_info)
+
         layout.addWidget(btn_services)
-        layout.addWidget(self.services_info)
+        layout.addWidget(self.services_label)
+        layout.addWidget(splitter)
         subtab.setLayout(layout)
-        self.detailed_tabs.addTab(subtab, "Сервисы")
+        return subtab, ("services",)
 
     def create_processes_subtab(self):
+        from processes import ProcessSampler
+        # Кэш процессов сохраняется между обновлениями; сам монитор в списки не попадает
+        self.process_sampler = ProcessSampler(top=15, exclude_pids={os.getpid()})
+        self.add_job("processes", self.process_sampler.sample, 3.0, self.apply_processes)
+
         subtab = QWidget()
         layout = QVBoxLayout()
         
-        self.processes_info = QTextEdit()
-        self.processes_info.setReadOnly(True)
+        process_columns = [
+            Column("PID", "pid"),
+            Column("Имя", "name"),
+            Column("CPU, %", "cpu_percent"),
+            Column("MEM, %", "mem_percent"),
+            Column("RSS, MB", "rss", lambda v: f"{v / MB:.1f}"),
+        ]
+        self.processes_label = QLabel()
+        self.top_cpu_table = TableView(SnapshotTableModel(process_columns), sort_column=2)
+        self.top_mem_table = TableView(SnapshotTableModel(process_columns), sort_column=4)
         btn_processes = QPushButton("Проверить процессы")
         btn_processes.clicked.connect(self.check_processes)
-        
+
+        splitter = QSplitter(Qt.Vertical)
+        for title, table in [("Топ процессов по CPU:", self.top_cpu_table),
+                             ("Топ процессов по памяти:", self.top_mem_table)]:
+            box = QWidget()
+            box_layout = QVBoxLayout(box)
+            box_layout.setContentsMargins(0, 0, 0, 0)
+            box_layout.addWidget(QLabel(title))
+            box_layout.addWidget(table)
+            splitter.addWidget(box)
+
         layout.addWidget(btn_processes)
-        layout.addWidget(self.processes_info)
+        layout.addWidget(self.processes_label)
+        layout.addWidget(splitter)
         subtab.setLayout(layout)
-        self.detailed_tabs.addTab(subtab, "Процессы")
+        return subtab, ("processes",)
 
     def create_security_subtab(self):
+        from aptindex import default_index
+        # Обновления считаются по индексам dpkg и apt; неизменившиеся файлы не перечитываются
+        self.add_job("updates", default_index().upgradable, 600.0, self.apply_updates)
+
         subtab = QWidget()
         layout = QVBoxLayout()
         
         self.security_info = QTextEdit()
         self.security_info.setReadOnly(True)
+        self.updates_label = QLabel()
+        self.updates_table = TableView(SnapshotTableModel([
+            Column("Пакет", "name"),
+            Column("Архитектура", "arch"),
+            Column("Установлена", "installed"),
+            Column("Доступна", "candidate"),
+            Column("Источник", "origin"),
+        ], key=lambda row: (row.name, row.arch)))
         btn_security = QPushButton("Проверить безопасность")
         btn_security.clicked.connect(self.check_security)
-        
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.updates_table)
+        splitter.addWidget(self.security_info)
+
         layout.addWidget(btn_security)
-        layout.addWidget(self.security_info)
+        layout.addWidget(self.updates_label)
+        layout.addWidget(splitter)
         subtab.setLayout(layout)
-        self.detailed_tabs.addTab(subtab, "Безопасность")
+        return subtab, ("updates",)
 
     def create_report_tab(self):
+        from report import SECTIONS, SECTION_TITLES
+        self.tasks = TaskRunner(max_workers=1, parent=self)
+        self.tasks.finished.connect(self.on_report_finished)
+
         tab = QWidget()
         layout = QVBoxLayout()
         
+        # Разделы отчета
+        self.report_sections = {}
+        sections_grid = QGridLayout()
+        for i, section in enumerate(SECTIONS):
+            checkbox = QCheckBox(SECTION_TITLES[section])
+            checkbox.setChecked(True)
+            self.report_sections[section] = checkbox
+            sections_grid.addWidget(checkbox, i // 3, i % 3)
+
         self.report_info = QTextEdit()
         self.report_info.setReadOnly(True)
-        btn_save = QPushButton("Сохранить отчет")
-        btn_save.clicked.connect(self.save_report)
+        self.btn_save_report = QPushButton("Сохранить отчет")
+        self.btn_save_report.clicked.connect(self.save_report)
         
-        layout.addWidget(btn_save)
+        layout.addLayout(sections_grid)
+        layout.addWidget(self.btn_save_report)
         layout.addWidget(self.report_info)
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "Отчеты")
+        return tab, ()
 
-    def init_timer(self):
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_dashboard)
-        self.timer.start(5000)  # Обновление каждые 5 секунд
+    def create_overhead_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout()
 
-    def update_dashboard(self):
+        ms = lambda v: f"{v * 1000:.2f}"
+        mean = lambda v: f"{v:.1f}"
+        self.overhead_table = TableView(SnapshotTableModel([
+            Column("Проверка", "name"),
+            Column("Запусков", "count"),
+            Column("Время p50, мс", "wall_p50", ms),
+            Column("Время p95, мс", "wall_p95", ms),
+            Column("Время p99, мс", "wall_p99", ms),
+            Column("CPU p50, мс", "cpu_p50", ms),
+            Column("CPU p95, мс", "cpu_p95", ms),
+            Column("CPU p99, мс", "cpu_p99", ms),
+            Column("Процессов", "subprocesses", mean),
+            Column("Вызовов ввода-вывода", "io_syscalls", mean),
+            Column("Пик памяти, КБ", "peak_alloc", lambda v: f"{v / 1024:.1f}"),
+        ]), sort_column=3)
+        self.add_job("overhead", self.overhead.rows, 2.0, self.overhead_table.model.set_rows)
+        self.capture_info = QTextEdit()
+        self.capture_info.setReadOnly(True)
+        btn_capture = QPushButton("Профилировать цикл обновления")
+        btn_capture.clicked.connect(self.profile_cycle)
+        btn_dump = QPushButton("Сохранить JSON")
+        btn_dump.clicked.connect(self.save_overhead)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(btn_capture)
+        buttons.addWidget(btn_dump)
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.overhead_table)
+        splitter.addWidget(self.capture_info)
+
+        layout.addLayout(buttons)
+        layout.addWidget(splitter)
+        tab.setLayout(layout)
+        return tab, ("overhead",)
+
+    def init_collectors(self):
+        # Каждый сборщик со своим периодом; сбор идет в отдельных потоках, GUI только отображает результаты
+        self.dashboard_collector = DashboardCollector()
+        self.scheduler = Scheduler(cpu_budget=MONITOR_CPU_BUDGET, overhead=self.overhead)
+        self.scheduler.add("system", system_info, interval=0, static=True, keep_alive=True)
+        self.scheduler.add("dashboard", self.collect_dashboard, interval=1.0, keep_alive=True)
+        self.collected_handlers["system"] = self.apply_system_info
+        self.collected_handlers["dashboard"] = self.apply_snapshot
+        if self.archive is not None:
+            # Архив читается в потоке сборщиков, только пока он выбран на дашборде
+            self.scheduler.add("archive_view", self.collect_archive_view, interval=ARCHIVE_VIEW_INTERVAL,
+                               active=False)
+            self.collected_handlers["archive_view"] = self.apply_archive_view
+        if HUB_ADDRESS:
+            from hub import HubReader
+            self.hub_reader = HubReader(HUB_ADDRESS, timeout=2.0)
+            self.scheduler.add("hub_hosts", self.hub_reader.hosts, interval=5.0)
+            # Снимки удаленного хоста запрашиваются, только пока он выбран
+            self.scheduler.add("hub_dashboard", self.collect_remote, interval=1.0, active=False)
+            self.collected_handlers["hub_hosts"] = self.apply_hub_hosts
+            self.collected_handlers["hub_dashboard"] = self.apply_remote_snapshot
+
+        self.collector = CollectorThread(self.scheduler)
+        self.collector.result_ready.connect(self.on_collected)
+        self.collector.failed.connect(self.on_collector_failed)
+        self.tabs.currentChanged.connect(self.update_active_collectors)
+        self.detailed_tabs.currentChanged.connect(self.update_active_collectors)
+        self.collector.start()
+
+    def collect_dashboard(self):
+        snapshot = self.dashboard_collector.sample()
+        # Запись на диск тоже выполняется вне потока GUI
+        if self.archive is not None:
+            self.archive.record_snapshot(snapshot)
+        return snapshot
+
+    def collect_archive_view(self):
+        start = time.time() - ARCHIVE_VIEW_SECONDS
+        series = {}
+        for name, points in self.archive_points.items():
+            # Точки прореживаются до ширины виджета, копируются только выбранные
+            view = self.archive.query(name, start).decimate(points)
+            series[name] = list(view.times()), list(view.values())
+        return series
+
+    def collect_remote(self):
+        host = self.dashboard_host
+        if host is None:
+            return None
+        return host, self.hub_reader.snapshot(host)
+
+    def collect_network(self):
+        return self.network_collector.interfaces(), self.network_collector.connections()
+
+    def run_collector(self, *names):
+        # Только запрос запуска: затраты сборщика учитывает планировщик под именем задания
+        for name in names:
+            self.scheduler.trigger(name)
+        self.collector.wake()
+
+    def update_active_collectors(self):
+        hidden = not self.isVisible() or self.isMinimized()
+        self.scheduler.set_paused(hidden)
+        if not hidden:
+            self.build_visible_tabs()
+        for tab, names in self.tab_jobs.items():
+            for name in names:
+                self.scheduler.set_active(name, tab.isVisible() and not hidden)
+        self.collector.wake()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.startup_reported:
+            self.startup_reported = True
+            # Срабатывает после первой отрисовки окна
+            QTimer.singleShot(0, self.report_startup)
+        self.update_active_collectors()
+
+    def report_startup(self):
+        elapsed = time.perf_counter() - STARTED
+        self.overhead.record("startup", elapsed)
+        message = f"Запуск за {elapsed:.2f} с"
+        if elapsed > STARTUP_TARGET:
+            message += f" (цель {STARTUP_TARGET:.1f} с)"
+        self.statusBar().showMessage(message, 10000)
+        if "--startup-time" in QApplication.arguments():
+            print(f"{elapsed:.3f}", flush=True)
+            QApplication.quit()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_active_collectors()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.update_active_collectors()
+
+    def on_collected(self, name, result):
+        try:
+            self.collected_handlers[name](result)
+        except Exception as e:
+            self.statusBar().showMessage(f"Ошибка отображения данных: {e}", 5000)
+        self.finish_capture(name)
+
+    def profile_cycle(self):
+        # Все включенные сборщики запускаются один раз под cProfile и tracemalloc
+        if self.overhead.capturing:
+            return
+        self.overhead.start_capture()
+        self.capture_pending = set(self.scheduler.trigger_enabled())
+        self.capture_info.setPlainText("Профилирование: " + ", ".join(sorted(self.capture_pending)))
+        self.collector.wake()
+
+    def finish_capture(self, name):
+        if name not in self.capture_pending:
+            return
+        self.capture_pending.discard(name)
+        if self.capture_pending:
+            return
+        capture = self.overhead.stop_capture()
+        self.capture_info.setPlainText(
+            "=== cProfile ===\n" + capture.profile + "\n=== tracemalloc ===\n" + capture.allocations)
+
+    def save_overhead(self):
         try:
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
-            self.cpu_progress.setValue(int(cpu_percent))
-            self.cpu_progress.setFormat(f"Загрузка CPU: {cpu_percent}%")
-            self.set_progress_color(self.cpu_progress, cpu_percent)
-
-            # Memory
-            mem = psutil.virtual_memory()
-            self.mem_progress.setValue(mem.percent)
-            self.mem_progress.setFormat(f"Использование памяти: {mem.percent}%")
-            self.set_progress_color(self.mem_progress, mem.percent)
-
-            # Disk
-            disk = psutil.disk_usage('/')
-            self.disk_progress.setValue(disk.percent)
-            self.disk_progress.setFormat(f"Использование корневого раздела: {disk.percent}%")
-            self.set_progress_color(self.disk_progress, disk.percent)
-
-            # System Info
-            sys_info = f"""
+            filename, _ = QFileDialog.getSaveFileName(self, "Сохранить затраты монитора", "", "JSON (*.json)")
+            if filename:
+                self.overhead.dump(filename)
+                QMessageBox.information(self, "Успешно", "Затраты монитора сохранены")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", str(e))
+
+    def update_dashboard(self):
+        self.run_collector("dashboard" if self.dashboard_host is None else "hub_dashboard")
+
+    def apply_system_info(self, info):
+        self.sys_info.setPlainText(f"""
             Системная информация:
-            ОС: {platform.system()} {platform.release()}
-            Версия: {platform.version()}
-            Процессор: {platform.processor()}
-            Время работы: {datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")}
-            """
-            self.sys_info.setPlainText(sys_info)
+            ОС: {info.os_name} {info.os_release}
+            Версия: {info.os_version}
+            Процессор: {info.processor}
+            Время работы: {datetime.fromtimestamp(info.boot_time).strftime("%Y-%m-%d %H:%M:%S")}
+            """)
+
+    def apply_snapshot(self, snapshot):
+        try:
+            metrics = snapshot_metrics(snapshot, self.last_snapshot)
+            self.last_snapshot = snapshot
+            self.evaluate_alerts(metrics, snapshot.timestamp)
+            self.history.record(snapshot.timestamp, metrics)
+            if self.isMinimized() or self.dashboard_host is not None:
+                # Свернутое окно не перерисовывается, история и тревоги ведутся
+                return
+            self.show_snapshot(snapshot, self.alerts.severity)
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
-    def set_progress_color(self, progress, value):
-        if value > 90:
-            color = "#ff4444"
-        elif value > 70:
-            color = "#ffbb33"
-        else:
-            color = "#4CAF50"
-        
+    def show_snapshot(self, snapshot, severity):
+        # CPU
+        self.cpu_progress.setValue(int(snapshot.cpu_percent))
+        self.cpu_progress.setFormat(f"Загрузка CPU: {snapshot.cpu_percent}%")
+        self.set_progress_color(self.cpu_progress, severity("cpu"))
+
+        # Memory
+        self.mem_progress.setValue(int(snapshot.mem_percent))
+        self.mem_progress.setFormat(f"Использование памяти: {snapshot.mem_percent}%")
+        self.set_progress_color(self.mem_progress, severity("mem"))
+
+        # Disk
+        self.disk_progress.setValue(int(snapshot.disk_percent))
+        self.disk_progress.setFormat(f"Использование корневого раздела: {snapshot.disk_percent}%")
+        self.set_progress_color(self.disk_progress, severity("disk"))
+
+        # Панель быстрого статуса
+        self.cpu_label.setText(f"CPU: {snapshot.cpu_percent}%")
+        self.mem_label.setText(f"MEM: {snapshot.mem_percent}%")
+        self.disk_label.setText(f"DISK: {snapshot.disk_percent}%")
+        self.net_label.setText(f"NET: ↑{snapshot.net_sent / 1024**2:.1f} MB ↓{snapshot.net_recv / 1024**2:.1f} MB")
+
+        # История
+        self.update_sparklines()
+
+    def apply_remote_snapshot(self, result):
+        # Ответ мог прийти для хоста, выбранного до переключения
+        if result is None or result[0] != self.dashboard_host or result[1] is None:
+            return
+        snapshot = result[1]
+        first = self.remote_snapshot is None
+        metrics = snapshot_metrics(snapshot, self.remote_snapshot)
+        self.remote_snapshot = snapshot
+        self.remote_history.record(snapshot.timestamp, metrics)
+        if first:
+            self.apply_system_info(snapshot)
+        if not self.isMinimized():
+            # Тревоги ведутся только для этого компьютера
+            self.show_snapshot(snapshot, lambda series: "ok")
+
+    def apply_hub_hosts(self, hosts):
+        items = [(host if age < 10 else f"{host} (нет данных {age:.0f} с)", host) for host, age in hosts]
+        current = [(self.host_selector.itemText(i), self.host_selector.itemData(i))
+                   for i in range(1, self.host_selector.count())]
+        if items == current:
+            return
+        # Список перестраивается без сигнала смены хоста
+        self.host_selector.blockSignals(True)
+        while self.host_selector.count() > 1:
+            self.host_selector.removeItem(1)
+        for text, host in items:
+            self.host_selector.addItem(text, host)
+        index = self.host_selector.findData(self.dashboard_host)
+        if index < 0:
+            self.host_selector.addItem(f"{self.dashboard_host} (нет на хабе)", self.dashboard_host)
+            index = self.host_selector.count() - 1
+        self.host_selector.setCurrentIndex(index)
+        self.host_selector.blockSignals(False)
+
+    def select_host(self, index):
+        host = self.host_selector.itemData(index)
+        self.dashboard_host = host
+        self.remote_history = HistoryStore(raw_capacity=600)
+        self.remote_snapshot = None
+        self.scheduler.set_active("hub_dashboard", host is not None)
+        self.update_archive_view()
+        if host is not None:
+            self.run_collector("hub_dashboard")
+            return
+        # Возврат к этому компьютеру: последние локальные данные показываются сразу
+        self.run_collector("system")
+        if self.last_snapshot is not None:
+            self.show_snapshot(self.last_snapshot, self.alerts.severity)
+
+    def update_sparklines(self):
+        step = self.history_range.currentData()
+        history = self.history
+        if self.dashboard_host is not None:
+            # Для удаленного хоста есть только история с момента его выбора
+            history = self.remote_history
+            step = None if step == "archive" else step
+        elif step == "archive":
+            for name, series in self.archive_series.items():
+                self.sparklines[name].set_series(*series)
+            return
+        for name, sparkline in self.sparklines.items():
+            metric = history.get(name)
+            if metric is not None:
+                sparkline.set_series(*metric.series(step))
+
+    def update_archive_view(self):
+        if self.archive is None:
+            return
+        active = self.dashboard_host is None and self.history_range.currentData() == "archive"
+        if active:
+            self.archive_points = {name: max(sparkline.width(), 100) for name, sparkline in self.sparklines.items()}
+        self.scheduler.set_active("archive_view", active)
+        self.collector.wake()
+
+    def apply_archive_view(self, series):
+        self.archive_series = series
+        self.update_sparklines()
+
+    def on_collector_failed(self, name, message):
+        self.statusBar().showMessage(f"Ошибка сбора данных ({name}): {message}", 5000)
+        self.finish_capture(name)
+
+    def closeEvent(self, event):
+        self.collector.stop()
+        if self.commands is not None:
+            self.commands.shutdown()
+        if self.tasks is not None:
+            self.tasks.shutdown()
+        if self.hub_reader is not None:
+            self.hub_reader.close()
+        if self.archive is not None:
+            self.archive.close()
+        super().closeEvent(event)
+
+    def evaluate_alerts(self, metrics, timestamp=None):
+        events = self.alerts.evaluate(timestamp or time.time(), metrics)
+        if not events:
+            return
+        active = self.alerts.active()
+        self.alerts_label.setText(f"Тревоги: {len(active)}")
+        self.alerts_label.setToolTip("\n".join(f"{series}: {name} ({value:.1f})" for name, series, _, value in active))
+        self.alerts_label.setStyleSheet("color: #ff0000;" if active else "")
+        for event in events:
+            state = "сработала" if event.state == "firing" else "снята"
+            self.statusBar().showMessage(f"Тревога {state}: {event.message} [{event.series} = {event.value:.1f}]", 10000)
+
+    def set_progress_color(self, progress, severity):
+        color = SEVERITY_COLORS[severity]
+        # Таблица стилей пересчитывается только при смене цвета
+        if self.progress_colors.get(progress) == color:
+            return
+        self.progress_colors[progress] = color
         progress.setStyleSheet(f"""
             QProgressBar::chunk {{ background-color: {color}; }}
         """)
 
     def check_network(self):
-        try:
-            self.network_info.clear()
-            self.append_colored_text(self.network_info, "=== Расширенная проверка сети ===", "#000080")
-            
-            # Основные интерфейсы
-            interfaces = psutil.net_if_addrs()
-            stats = psutil.net_if_stats()
-            io_counters = psutil.net_io_counters(pernic=True)
-            
-            for interface in interfaces:
-                self.append_colored_text(self.network_info, f"\nИнтерфейс: {interface}", "#006600")
-                
-                # Адреса
-                for addr in interfaces[interface]:
-                    self.network_info.append(f"  {addr.family.name}: {addr.address}")
-                
-                # Статус
-                if stats[interface].isup:
-                    status = "UP"
-                    color = "#008000"
-                else:
-                    status = "DOWN"
-                    color = "#ff0000"
-                self.append_colored_text(self.network_info, f"  Статус: {status}", color)
-                
-                # Статистика
-                io = io_counters.get(interface)
-                if io:
-                    self.network_info.append(f"  Отправлено: {io.bytes_sent / 1024**2:.2f} MB")
-                    self.network_info.append(f"  Получено: {io.bytes_recv / 1024**2:.2f} MB")
-                    
-            # Соединения
-            self.append_colored_text(self.network_info, "\nАктивные соединения:", "#000080")
-            connections = psutil.net_connections()
-            for conn in connections:
-                if conn.status == 'ESTABLISHED':
-                    self.network_info.append(f"{conn.laddr.ip}:{conn.laddr.port} -> {conn.raddr.ip}:{conn.raddr.port} [{conn.pid}]")
-
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.run_collector("network")
+
+    def apply_network(self, result):
+        interfaces, connections = result
+        self.interfaces_table.set_rows(interfaces)
+        self.connections_table.set_rows(connections)
+        if self.network_collector.primed:
+            metrics = {}
+            for row in interfaces:
+                metrics[f"iface.error_rate:{row.name}"] = row.error_rate
+                metrics[f"iface.drop_rate:{row.name}"] = row.drop_rate
+            self.evaluate_alerts(metrics)
 
     def check_disks(self):
         try:
@@ -289,109 +822,137 @@ class SystemCheckApp(QMainWindow):
             self.append_colored_text(self.disk_info, "=== Расширенная проверка дисков ===", "#000080")
             
             # SMART-данные (требует прав)
-            try:
-                smart = subprocess.check_output(["smartctl", "--scan"], stderr=subprocess.STDOUT)
-                self.disk_info.append("\nSMST-устройства:\n" + smart.decode())
-            except Exception as e:
-                self.append_colored_text(self.disk_info, "\nОшибка получения SMART-данных: " + str(e), "#ff0000")
+            self.run_commands(self.disk_info, [
+                (["smartctl", "--scan"], 10, "SMART-устройства", "Ошибка получения SMART-данных"),
+            ])
             
             # RAID-статус
             try:
-                mdstat = subprocess.check_output(["cat", "/proc/mdstat"])
-                self.disk_info.append("\nRAID-статус:\n" + mdstat.decode())
+                with open("/proc/mdstat") as f:
+                    self.disk_info.append("\nRAID-статус:\n" + f.read())
             except Exception as e:
                 self.append_colored_text(self.disk_info, "\nОшибка проверки RAID: " + str(e), "#ff0000")
             
-            # Основная информация
-            partitions = psutil.disk_partitions()
-            for part in partitions:
-                usage = psutil.disk_usage(part.mountpoint)
-                self.disk_info.append(f"\nУстройство: {part.device}")
-                self.disk_info.append(f"Точка монтирования: {part.mountpoint}")
-                self.disk_info.append(f"Файловая система: {part.fstype}")
-                self.disk_info.append(f"Всего: {usage.total / 1024**3:.2f} GB")
-                self.disk_info.append(f"Использовано: {usage.percent}%")
-                
-                if usage.percent > 90:
-                    self.append_colored_text(self.disk_info, "ВНИМАНИЕ: Мало свободного места!", "#ff0000")
+            # Основная информация и ввод-вывод собираются в фоне
+            self.run_collector("disks", "disk_io")
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
     def check_services(self):
-        try:
-            self.services_info.clear()
-            self.append_colored_text(self.services_info, "=== Расширенная проверка сервисов ===", "#000080")
-            
-            # Неудачные сервисы
-            try:
-                failed = subprocess.check_output(["systemctl", "list-units", "--state=failed"])
-                self.services_info.append("\nНеудачные сервисы:\n" + failed.decode())
-            except Exception as e:
-                self.append_colored_text(self.services_info, "\nОшибка проверки сервисов: " + str(e), "#ff0000")
-            
-            # Сервисы с автозагрузкой
-            try:
-                enabled = subprocess.check_output(["systemctl", "list-unit-files", "--state=enabled"])
-                self.services_info.append("\nСервисы с автозагрузкой:\n" + enabled.decode())
-            except Exception as e:
-                self.append_colored_text(self.services_info, "\nОшибка проверки автозагрузки: " + str(e), "#ff0000")
-
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.run_collector("services")
 
     def check_processes(self):
-        try:
-            self.processes_info.clear()
-            self.append_colored_text(self.processes_info, "=== Анализ процессов ===", "#000080")
-            
-            # Топ процессов по CPU
-            self.processes_info.append("\nТоп процессов по CPU:")
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-                if proc.info['cpu_percent'] > 5.0:
-                    self.processes_info.append(f"PID: {proc.info['pid']} | Имя: {proc.info['name']} | CPU: {proc.info['cpu_percent']}%")
-
-            # Топ процессов по памяти
-            self.processes_info.append("\nТоп процессов по памяти:")
-            for proc in psutil.process_iter(['pid', 'name', 'memory_percent']):
-                if proc.info['memory_percent'] > 1.0:
-                    self.processes_info.append(f"PID: {proc.info['pid']} | Имя: {proc.info['name']} | MEM: {proc.info['memory_percent']}%")
+        self.run_collector("processes")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+    def apply_processes(self, sample):
+        self.processes_label.setText(f"Всего процессов: {sample.count}")
+        self.top_cpu_table.set_rows(sample.top_cpu)
+        self.top_mem_table.set_rows(sample.top_mem)
 
     def check_security(self):
         try:
             self.security_info.clear()
             self.append_colored_text(self.security_info, "=== Проверка безопасности ===", "#000080")
             
-            # Проверка обновлений
-            try:
-                updates = subprocess.check_output(["apt", "list", "--upgradable"])
-                self.security_info.append("\nДоступные обновления:\n" + updates.decode())
-            except Exception as e:
-                self.append_colored_text(self.security_info, "\nОшибка проверки обновлений: " + str(e), "#ff0000")
-            
-            # Проверка брандмауэра
-            try:
-                firewall = subprocess.check_output(["ufw", "status"])
-                self.security_info.append("\nСтатус брандмауэра:\n" + firewall.decode())
-            except Exception as e:
-                self.append_colored_text(self.security_info, "\nОшибка проверки брандмауэра: " + str(e), "#ff0000")
+            # Доступные обновления
+            self.run_collector("updates")
+            self.run_commands(self.security_info, [
+                # Проверка брандмауэра
+                (["ufw", "status"], 10,
+                 "Статус брандмауэра", "Ошибка проверки брандмауэра"),
+            ])
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
+    def apply_services(self, changes):
+        from services import EVENT_TITLES
+        self.services_label.setText(f"Юнитов: {changes.total}, с ошибкой: {changes.failed}")
+        self.services_table.model.update_rows(changes.changed, changes.removed)
+        stamp = datetime.fromtimestamp(changes.timestamp).strftime("%H:%M:%S")
+        for event in changes.events:
+            color = "#ff0000" if event.event == "failed" else "#000000"
+            self.append_colored_text(self.services_info, f"{stamp} {event.unit}: {EVENT_TITLES[event.event]} "
+                                                         f"({event.old or '-'} -> {event.new or '-'})", color)
+        metrics = {f"service.failed:{unit.unit}": float(unit.active == "failed") for unit in changes.changed}
+        metrics.update((f"service.failed:{name}", 0.0) for name in changes.removed)
+        self.evaluate_alerts(metrics, changes.timestamp)
+
+    def apply_updates(self, rows):
+        self.updates_label.setText(f"Доступные обновления: {len(rows)}")
+        self.updates_table.set_rows(rows)
+
+    def apply_disks(self, rows):
+        from disks import STATUS_OK
+        metrics = {}
+        for row in rows:
+            if row.status == STATUS_OK:
+                metrics[f"mount.percent:{row.mountpoint}"] = row.percent
+                metrics[f"mount.free_gb:{row.mountpoint}"] = row.free / GB
+        self.evaluate_alerts(metrics)
+        self.partitions_table.set_rows(rows)
+
+    def apply_disk_io(self, rows):
+        self.evaluate_alerts({f"io.util:{row.device}": row.util for row in rows})
+        self.disk_io_table.set_rows(rows)
+
+    def run_commands(self, text_edit, commands):
+        if self.commands is None:
+            self.commands = CommandBridge(ttl=COMMAND_CACHE_TTL, parent=self)
+            self.commands.finished.connect(self.on_command_finished)
+        # Команды выполняются параллельно, результаты выводятся по мере готовности
+        self.commands.start_group(text_edit)
+        for argv, timeout, title, error_title in commands:
+            self.commands.submit(text_edit, argv, timeout, tag=(text_edit, title, error_title))
+
+    def on_command_finished(self, tag, result):
+        # Результат из кэша не порождал процесса
+        self.overhead.record("команда: " + " ".join(result.argv),
+                             0.0 if result.cached else result.duration,
+                             subprocesses=0 if result.cached else 1)
+        text_edit, title, error_title = tag
+        if result.error is None:
+            text_edit.append(f"\n{title}:\n" + result.output)
+        else:
+            self.append_colored_text(text_edit, f"\n{error_title}: {result.error}", "#ff0000")
+
     def save_report(self):
         try:
-            filename, _ = QFileDialog.getSaveFileName(self, "Сохранить отчет", "", "Текстовые файлы (*.txt)")
-            if filename:
-                with open(filename, 'w') as f:
-                    f.write(self.report_info.toPlainText())
-                QMessageBox.information(self, "Успешно", "Отчет сохранен")
+            from report import SECTION_TITLES, write_report
+            filename, selected = QFileDialog.getSaveFileName(
+                self, "Сохранить отчет", "",
+                "JSON Lines (*.jsonl);;JSON Lines, gzip (*.jsonl.gz);;JSON Lines, zstd (*.jsonl.zst);;"
+                "CSV (*.csv);;CSV, gzip (*.csv.gz);;CSV, zstd (*.csv.zst)")
+            if not filename:
+                return
+            suffix = selected[selected.index("*") + 1:-1]
+            if not filename.endswith(suffix):
+                filename += suffix
+            sections = [name for name, checkbox in self.report_sections.items() if checkbox.isChecked()]
+            if not sections:
+                QMessageBox.warning(self, "Отчет", "Не выбран ни один раздел")
+                return
+
+            # Записи пишутся в файл по мере выполнения проверок, в фоне
+            self.btn_save_report.setEnabled(False)
+            self.report_info.setPlainText(f"Формирование отчета {filename}:\n" +
+                                          "\n".join(SECTION_TITLES[name] for name in sections))
+            self.tasks.submit(filename, write_report, filename, sections)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
+    def on_report_finished(self, filename, counts, error):
+        from report import SECTION_TITLES
+        self.btn_save_report.setEnabled(True)
+        if error is not None:
+            self.append_colored_text(self.report_info, f"\nОшибка формирования отчета: {error}", "#ff0000")
+            return
+        lines = [f"{SECTION_TITLES.get(section, section)}: {count}" for section, count in counts.items()
+                 if section != "report"]
+        self.report_info.setPlainText(f"Отчет сохранен: {filename}\n\nЗаписей по разделам:\n" + "\n".join(lines))
+        QMessageBox.information(self, "Успешно", "Отчет сохранен")
+
     def append_colored_text(self, text_edit, text, color):
         text_edit.moveCursor(QTextCursor.End)
         text_edit.setTextColor(QColor(color))
@@ -0,0 +1,194 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QTableView, QHeaderView
+
+# Роль с исходным значением ячейки для корректной числовой сортировки
+SORT_ROLE = Qt.UserRole + 1
+
+
+class Column:
+    """Описание колонки: заголовок, поле строки и формат отображения"""
+
+    def __init__(self, title, field, fmt=None):
+        self.title = title
+        self.field = field
+        self.fmt = fmt
+
+    def value(self, row):
+        return getattr(row, self.field)
+
+    def text(self, row):
+        value = self.value(row)
+        if value is None:
+            return ""
+        return self.fmt(value) if self.fmt else str(value)
+
+
+class SnapshotTableModel(QAbstractTableModel):
+    """Табличная модель, обновляемая по разнице снимков
+
+    Строки — неизменяемые кортежи; key(row) определяет идентичность строки.
+    set_rows удаляет исчезнувшие строки, обновляет изменившиеся через
+    dataChanged и добавляет новые в конец, не сбрасывая модель целиком.
+    """
+
+    def __init__(self, columns, key=None, color=None, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.key = key or (lambda row: row[0])
+        self.color = color
+        self._rows = []
+        self._positions = {}
+        self._colors = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section].title
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = self.columns[index.column()]
+        if role == Qt.DisplayRole:
+            return column.text(row)
+        if role == SORT_ROLE:
+            return column.value(row)
+        if role == Qt.ForegroundRole and self.color is not None:
+            color = self.color(row)
+            if color:
+                if color not in self._colors:
+                    self._colors[color] = QColor(color)
+                return self._colors[color]
+        return None
+
+    def rows(self):
+        return list(self._rows)
+
+    def set_rows(self, rows):
+        rows = list(rows)
+        incoming = {self.key(row): row for row in rows}
+
+        # Удаление исчезнувших строк непрерывными диапазонами с конца
+        gone = sorted((pos for key, pos in self._positions.items() if key not in incoming), reverse=True)
+        for first, last in _ranges(gone):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        if gone:
+            self._positions = {self.key(row): pos for pos, row in enumerate(self._rows)}
+
+        # Обновление изменившихся строк
+        changed = []
+        for pos, row in enumerate(self._rows):
+            new_row = incoming[self.key(row)]
+            if new_row != row:
+                self._rows[pos] = new_row
+                changed.append(pos)
+        if changed:
+            last_column = len(self.columns) - 1
+            for first, last in _ranges(sorted(changed, reverse=True)):
+                self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+
+        # Добавление новых строк в конец
+        added = [row for key, row in incoming.items() if key not in self._positions]
+        if added:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            self._rows.extend(added)
+            for pos, row in enumerate(added, start):
+                self._positions[self.key(row)] = pos
+            self.endInsertRows()
+
+    def update_rows(self, rows, removed=()):
+        """Точечное обновление по списку изменений: новые и изменившиеся строки, ключи удаленных
+
+        Полный снимок не нужен, поэтому стоимость зависит от числа изменений,
+        а не от размера таблицы.
+        """
+        gone = sorted((self._positions[key] for key in removed if key in self._positions), reverse=True)
+        for first, last in _ranges(gone):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        if gone:
+            self._positions = {self.key(row): pos for pos, row in enumerate(self._rows)}
+
+        changed = []
+        added = {}
+        for row in rows:
+            key = self.key(row)
+            pos = self._positions.get(key)
+            if pos is None:
+                added[key] = row
+            elif self._rows[pos] != row:
+                self._rows[pos] = row
+                changed.append(pos)
+        if changed:
+            last_column = len(self.columns) - 1
+            for first, last in _ranges(sorted(changed, reverse=True)):
+                self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+        if added:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            self._rows.extend(added.values())
+            for pos, key in enumerate(added, start):
+                self._positions[key] = pos
+            self.endInsertRows()
+
+
+def _ranges(positions):
+    """Группировка убывающих позиций в непрерывные диапазоны (first, last)"""
+    ranges = []
+    for pos in positions:
+        if ranges and ranges[-1][0] == pos + 1:
+            ranges[-1][0] = pos
+        else:
+            ranges.append([pos, pos])
+    return [(first, last) for first, last in ranges]
+
+
+class TableView(QWidget):
+    """Таблица с сортировкой по колонкам и строкой фильтра"""
+
+    def __init__(self, model, sort_column=None, sort_order=Qt.DescendingOrder, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(model)
+        self.proxy.setSortRole(SORT_ROLE)
+        self.proxy.setFilterKeyColumn(-1)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText("Фильтр...")
+        self.filter.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.view = QTableView()
+        self.view.setModel(self.proxy)
+        self.view.setSortingEnabled(True)
+        self.view.setAlternatingRowColors(True)
+        self.view.setSelectionBehavior(QTableView.SelectRows)
+        self.view.setWordWrap(False)
+        # Фиксированная высота строк: отрисовываются только видимые строки без пересчета размеров
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(22)
+        self.view.verticalHeader().hide()
+        self.view.horizontalHeader().setStretchLastSection(True)
+        if sort_column is not None:
+            self.view.sortByColumn(sort_column, sort_order)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter)
+        layout.addWidget(self.view)
+
+    def set_rows(self, rows):
+        self.model.set_rows(rows)
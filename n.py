@@ -1,52 +1,223 @@
 #!/usr/bin/env python3
-import os
-import subprocess
+"""Проверки системы: интерактивное меню или пакетный запуск для cron
+
+Пакетный режим (--checks или --config) выполняет проверки параллельно
+и завершается с кодом:
+    0 — все проверки успешны
+    1 — хотя бы одна проверка не прошла
+    3 — проверка не уложилась в таймаут или общий срок (при отсутствии неудач)
+"""
+import argparse
+import json
 import socket
+import sys
+import threading
+import time
+from collections import namedtuple
 
-class SystemChecker:
-    def check_internet(self, host="8.8.8.8", port=53):
-        """Проверка доступности интернета"""
-        try:
-            socket.create_connection((host, int(port)), timeout=3)
-            return True, f"Соединение с {host}:{port} установлено"
-        except Exception as e:
-            return False, f"Ошибка: {str(e)}"
+from checks import SystemChecker
 
-    def check_ping(self, host="google.com"):
-        """Проверка доступности хоста через ping"""
-        try:
-            result = subprocess.run(
-                ["ping", "-c", "1", host],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            if result.returncode == 0:
-                return True, f"Успешный ping до {host}"
-            return False, f"Не удалось выполнить ping до {host}"
-        except Exception as e:
-            return False, f"Ошибка: {str(e)}"
+CheckResult = namedtuple("CheckResult", ["name", "status", "message", "duration", "details"])
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
 
-    def check_disk(self, path="/", min_gb=5):
-        """Проверка свободного места на диске"""
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_TIMEOUT = 3
+
+CHECK_TYPES = ("internet", "ping", "disk", "resources", "hosts")
+
+class _CheckJob:
+    """Проверка в отдельном потоке: зависшая проверка не задерживает остальные и выход"""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.result = None
+        self.error = None
+        self.started = time.monotonic()
+        self.finished = None
+        self.done = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
         try:
-            stat = os.statvfs(path)
-            free_gb = (stat.f_bavail * stat.f_frsize) / (1024**3)
-            total_gb = (stat.f_blocks * stat.f_frsize) / (1024**3)
-            status = free_gb >= min_gb
-            msg = f"Свободно {free_gb:.1f}ГБ из {total_gb:.1f}ГБ"
-            return status, msg
+            self.result = self.fn()
         except Exception as e:
-            return False, f"Ошибка: {str(e)}"
+            self.error = e
+        finally:
+            self.finished = time.monotonic()
+            self.done.set()
+
+
+def _param(spec, key, default, convert, valid, description):
+    """Параметр проверки, приведенный и проверенный до запуска; ValueError с понятным текстом"""
+    value = spec.get(key)
+    if value is None or value == "":
+        value = default
+    try:
+        value = convert(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not valid(value):
+        raise ValueError(f"{spec.get('name', spec.get('type'))}: {key} — нужно {description}, "
+                         f"получено {spec.get(key)!r}")
+    return value
+
+
+def build_check(checker, spec):
+    """(имя, функция, таймаут) по описанию {"type": ..., параметры проверки}
+
+    Параметры приводятся и проверяются здесь, до запуска проверок:
+    ошибка описания — ValueError, а не неудачная проверка.
+    """
+    kind = spec.get("type")
+    if kind == "internet":
+        host = _param(spec, "host", "8.8.8.8", str, bool, "имя хоста")
+        port = _param(spec, "port", 53, int, lambda v: 0 < v < 65536, "порт 1-65535")
+        fn = lambda: checker.check_internet(host, port)
+    elif kind == "ping":
+        host = _param(spec, "host", "google.com", str, bool, "имя хоста")
+        fn = lambda: checker.check_ping(host)
+    elif kind == "disk":
+        path = _param(spec, "path", "/", str, bool, "путь")
+        min_gb = _param(spec, "min_gb", 5, float, lambda v: v >= 0, "неотрицательное число")
+        fn = lambda: checker.check_disk(path, min_gb)
+    elif kind == "resources":
+        fn = checker.check_resources
+    elif kind == "hosts":
+        targets = _param(spec, "targets", [], lambda v: list(v) if isinstance(v, (list, tuple)) else None,
+                         lambda v: all(isinstance(t, str) for t in v),
+                         "список host:port")
+        ping = bool(spec.get("ping", False))
+        fn = lambda: checker.check_hosts(targets, ping)
+    else:
+        raise ValueError(f"Неизвестная проверка: {kind}")
+    timeout = spec.get("timeout")
+    if timeout is not None:
+        timeout = _param(spec, "timeout", None, float, lambda v: v > 0, "положительное число секунд")
+    return spec.get("name", kind), fn, timeout
+
+
+def run_checks(checks, timeout=10.0, deadline=None):
+    """Параллельный запуск проверок (имя, функция, таймаут или None)
+
+    Каждая проверка ограничена своим таймаутом и общим сроком deadline,
+    поэтому полный прогон длится не дольше самой медленной проверки.
+    """
+    start = time.monotonic()
+    jobs = [(name, _CheckJob(fn), check_timeout or timeout) for name, fn, check_timeout in checks]
+    results = []
+    for name, job, check_timeout in jobs:
+        limit = job.started + check_timeout
+        if deadline is not None:
+            limit = min(limit, start + deadline)
+        if not job.done.wait(max(limit - time.monotonic(), 0)):
+            results.append(CheckResult(name, STATUS_TIMEOUT, f"Нет результата за {limit - job.started:.1f} с",
+                                       round(time.monotonic() - job.started, 3), None))
+            continue
+        duration = round(job.finished - job.started, 3)
+        if job.error is not None:
+            results.append(CheckResult(name, STATUS_FAILED, f"Ошибка: {job.error}", duration, None))
+            continue
+        success, message = job.result
+        details = None
+        if not isinstance(message, str):
+            # check_hosts возвращает результаты по каждому хосту
+            details = [item._asdict() for item in message]
+            failed = sum(1 for item in message if not item.ok)
+            message = f"Доступно {len(message) - failed} из {len(message)}"
+        results.append(CheckResult(name, STATUS_OK if success else STATUS_FAILED, message, duration, details))
+    return results
+
+
+def exit_code(results):
+    statuses = {result.status for result in results}
+    if STATUS_FAILED in statuses:
+        return EXIT_FAILED
+    if STATUS_TIMEOUT in statuses:
+        return EXIT_TIMEOUT
+    return EXIT_OK
+
+
+def print_results(results, fmt="text", elapsed=None):
+    if fmt == "json":
+        print(json.dumps({
+            "host": socket.gethostname(),
+            "timestamp": time.time(),
+            "ok": exit_code(results) == EXIT_OK,
+            "duration": elapsed,
+            "checks": [result._asdict() for result in results],
+        }, ensure_ascii=False))
+    elif fmt == "jsonl":
+        for result in results:
+            print(json.dumps(result._asdict(), ensure_ascii=False))
+    else:
+        marks = {STATUS_OK: "✓", STATUS_FAILED: "✗", STATUS_TIMEOUT: "⌛"}
+        for result in results:
+            print(f"{result.name}: {marks[result.status]} {result.message} ({result.duration:.2f} с)")
 
-    def check_resources(self):
-        """Проверка загрузки системы"""
+
+def load_config(path):
+    """Описание пакетного запуска: {"timeout", "deadline", "checks": [{"type", ...}]}"""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: описание должно быть объектом")
+    if not isinstance(config.get("checks"), list):
+        raise ValueError(f"{path}: нет списка checks")
+    if not all(isinstance(spec, dict) for spec in config["checks"]):
+        raise ValueError(f"{path}: элементы checks должны быть объектами")
+    # Сроки приводятся здесь: строка вместо числа не доходит до run_checks
+    for key in ("timeout", "deadline"):
+        if config.get(key) is None:
+            continue
         try:
-            load = os.getloadavg()
-            mem = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024**3)
-            return True, f"Загрузка CPU: {load[0]:.2f}, Всего памяти: {mem:.1f}ГБ"
-        except Exception as e:
-            return False, f"Ошибка: {str(e)}"
+            value = float(config[key])
+        except (TypeError, ValueError):
+            value = None
+        if value is None or not value > 0:
+            raise ValueError(f"{path}: {key} — нужно положительное число секунд, получено {config[key]!r}")
+        config[key] = value
+    return config
+
+
+def checks_from_args(args):
+    specs = []
+    for kind in args.checks.split(","):
+        kind = kind.strip()
+        if kind == "internet":
+            specs.append({"type": kind, "host": args.host, "port": args.port})
+        elif kind == "ping":
+            specs.append({"type": kind, "host": args.ping_host})
+        elif kind == "disk":
+            for path in args.disk_path or ["/"]:
+                specs.append({"type": kind, "name": f"disk:{path}", "path": path, "min_gb": args.min_gb})
+        elif kind == "hosts":
+            specs.append({"type": kind, "targets": args.targets.split(",") if args.targets else [],
+                          "ping": args.ping})
+        else:
+            specs.append({"type": kind})
+    return specs
+
+
+def run_batch(args):
+    """Пакетный запуск; возвращает код завершения"""
+    config = load_config(args.config) if args.config else {"checks": []}
+    specs = list(config["checks"])
+    if args.checks:
+        specs += checks_from_args(args)
+    timeout = args.timeout if args.timeout is not None else config.get("timeout") or 10.0
+    deadline = args.deadline if args.deadline is not None else config.get("deadline")
+
+    checker = SystemChecker()
+    checks = [build_check(checker, spec) for spec in specs]
+    start = time.monotonic()
+    results = run_checks(checks, timeout, deadline)
+    print_results(results, args.output, round(time.monotonic() - start, 3))
+    return exit_code(results)
+
 
 def show_menu():
     """Отображение меню"""
@@ -75,8 +246,60 @@ def get_parameters(selected_checks):
 
     return params
 
+def run_report(args):
+    """Потоковый отчет по выбранным разделам в файл"""
+    from report import SECTIONS, write_report
+    sections = args.sections.split(",") if args.sections else SECTIONS
+    counts = write_report(
+        args.report, sections, fmt=args.format, compression=args.compress,
+        progress=lambda section: print(f"... {section}", flush=True),
+        interval=args.interval,
+    )
+    total = sum(counts.values())
+    print(f"Отчет {args.report}: {total} записей")
+    for section, count in counts.items():
+        print(f"  {section}: {count}")
+
+
 def main():
     """Основная функция программы"""
+    parser = argparse.ArgumentParser(description="Проверки системы",
+                                     epilog="Коды завершения пакетного режима: 0 — успех, 1 — неудача, "
+                                            "3 — таймаут")
+    parser.add_argument("--report", metavar="ФАЙЛ",
+                        help="записать отчет (.jsonl или .csv, сжатие по расширению .gz/.zst)")
+    parser.add_argument("--sections", help="разделы отчета через запятую [все]")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="формат отчета [по расширению]")
+    parser.add_argument("--compress", choices=("gz", "zst"), help="сжатие отчета [по расширению]")
+    parser.add_argument("--interval", type=float, default=1.0, help="интервал замера скоростей, с [1]")
+    batch = parser.add_argument_group("пакетный режим")
+    batch.add_argument("--checks", help=f"проверки через запятую: {', '.join(CHECK_TYPES)}")
+    batch.add_argument("--config", metavar="ФАЙЛ", help="JSON с описанием проверок")
+    batch.add_argument("--host", default="8.8.8.8", help="хост проверки интернета [8.8.8.8]")
+    batch.add_argument("--port", type=int, default=53, help="порт проверки интернета [53]")
+    batch.add_argument("--ping-host", default="google.com", help="хост для ping [google.com]")
+    batch.add_argument("--disk-path", action="append", help="путь для проверки диска, можно несколько [/]")
+    batch.add_argument("--min-gb", type=float, default=5, help="минимальный свободный объем, ГБ [5]")
+    batch.add_argument("--targets", help="хосты host:port через запятую для проверки hosts")
+    batch.add_argument("--ping", action="store_true", help="проверка hosts с ping")
+    batch.add_argument("--timeout", type=float, default=None, help="таймаут одной проверки, с [10]")
+    batch.add_argument("--deadline", type=float, default=None, help="общий срок всех проверок, с")
+    batch.add_argument("--output", choices=("json", "jsonl", "text"), default="json",
+                       help="формат результатов [json]")
+    args = parser.parse_args()
+    if args.report:
+        try:
+            run_report(args)
+        except (ValueError, RuntimeError, OSError) as e:
+            parser.error(str(e))
+        return
+    if args.checks or args.config:
+        try:
+            code = run_batch(args)
+        except (ValueError, OSError) as e:
+            parser.error(str(e))
+        sys.exit(code)
+
     checker = SystemChecker()
     
     while True:
@@ -97,22 +320,24 @@ def main():
 
         params = get_parameters(selected_checks)
         
-        print("\nРезультаты проверки:")
+        specs = []
         if 1 in selected_checks:
-            success, msg = checker.check_internet(params.get('host'), params.get('port'))
-            print(f"Интернет: {'✓' if success else '✗'} {msg}")
-            
+            specs.append({"type": "internet", "name": "Интернет", "host": params.get('host'), "port": params.get('port')})
         if 2 in selected_checks:
-            success, msg = checker.check_ping(params.get('ping_host'))
-            print(f"Ping: {'✓' if success else '✗'} {msg}")
-            
+            specs.append({"type": "ping", "name": "Ping", "host": params.get('ping_host')})
         if 3 in selected_checks:
-            success, msg = checker.check_disk(params.get('disk_path')), float(params.get('min_gb'))
-            print(f"Диск: {'✓' if success else '✗'} {msg}")
-            
+            specs.append({"type": "disk", "name": "Диск", "path": params.get('disk_path'),
+                          "min_gb": params.get('min_gb')})
         if 4 in selected_checks:
-            success, msg = checker.check_resources()
-            print(f"Ресурсы: {'✓' if success else '✗'} {msg}")
+            specs.append({"type": "resources", "name": "Ресурсы"})
+
+        try:
+            checks = [build_check(checker, spec) for spec in specs]
+        except ValueError as e:
+            print(f"Ошибка параметров: {e}")
+            continue
+        print("\nРезультаты проверки:")
+        print_results(run_checks(checks))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
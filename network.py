@@ -0,0 +1,185 @@
+import os
+import socket
+import sys
+import time
+from collections import namedtuple
+
+import psutil
+
+InterfaceRow = namedtuple("InterfaceRow", [
+    "name", "addresses", "isup",
+    "sent_rate", "recv_rate", "packets_sent_rate", "packets_recv_rate", "error_rate", "drop_rate",
+    "bytes_sent", "bytes_recv",
+])
+ConnectionRow = namedtuple("ConnectionRow", ["laddr", "raddr", "pid", "inode"])
+
+TCP_TABLES = ("/proc/net/tcp", "/proc/net/tcp6")
+TCP_ESTABLISHED = "01"
+
+_COUNTERS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv", "errors", "drops")
+
+
+class NetworkCollector:
+    """Скорости по интерфейсам и таблица установленных TCP-соединений"""
+
+    def __init__(self, alpha=0.3, rescan_interval=10.0, tcp_tables=TCP_TABLES, proc_root="/proc"):
+        self.alpha = alpha
+        self.rescan_interval = rescan_interval
+        self.tcp_tables = tcp_tables
+        self.proc_root = proc_root
+        self._prev = {}
+        self._rates = {}
+        self._last = None
+        self._addresses = {}
+        self._rows = {}
+        self._inode_pid = {}
+        self._socket_pids = set()
+        self._scanned_pids = set()
+        # Сокеты без найденного владельца (чужие процессы без прав на /proc/<pid>/fd)
+        self._unresolved = set()
+        self._full_scan = 0.0
+
+    @property
+    def primed(self):
+        return bool(self._rates)
+
+    def interfaces(self):
+        """Скорости приема/передачи, пакетов, ошибок и потерь со сглаживанием EWMA"""
+        now = time.monotonic()
+        elapsed = now - self._last if self._last is not None else None
+        self._last = now
+        counters = psutil.net_io_counters(pernic=True)
+        stats = psutil.net_if_stats()
+        addrs = psutil.net_if_addrs()
+
+        rows = []
+        for name, io in counters.items():
+            current = (io.bytes_sent, io.bytes_recv, io.packets_sent, io.packets_recv,
+                       io.errin + io.errout, io.dropin + io.dropout)
+            prev = self._prev.get(name)
+            self._prev[name] = current
+            rates = self._rates.get(name)
+            if prev is not None and elapsed:
+                # Сброс счетчиков (перезапуск интерфейса) дает нулевую разницу
+                instant = [max(c - p, 0) / elapsed for c, p in zip(current, prev)]
+                if rates is None:
+                    rates = instant
+                else:
+                    rates = [self.alpha * i + (1 - self.alpha) * r for i, r in zip(instant, rates)]
+                self._rates[name] = rates
+            rates = rates or [0.0] * len(_COUNTERS)
+            stat = stats.get(name)
+            rows.append(InterfaceRow(
+                name=name,
+                addresses=self._format_addresses(name, addrs.get(name, [])),
+                isup=bool(stat and stat.isup),
+                sent_rate=rates[0],
+                recv_rate=rates[1],
+                packets_sent_rate=rates[2],
+                packets_recv_rate=rates[3],
+                error_rate=rates[4],
+                drop_rate=rates[5],
+                bytes_sent=io.bytes_sent,
+                bytes_recv=io.bytes_recv,
+            ))
+        return rows
+
+    def connections(self):
+        """Установленные TCP-соединения из /proc/net/tcp{,6}"""
+        rows = {}
+        for path in self.tcp_tables:
+            try:
+                with open(path) as f:
+                    lines = f.read().splitlines()[1:]
+            except OSError:
+                continue
+            for line in lines:
+                fields = line.split()
+                if fields[3] != TCP_ESTABLISHED:
+                    continue
+                key = (fields[1], fields[2], fields[9])
+                row = self._rows.get(key)
+                if row is None:
+                    row = ConnectionRow(_decode(fields[1]), _decode(fields[2]), None, int(fields[9]))
+                rows[key] = row
+
+        self._resolve({row.inode for row in rows.values()})
+        # Строки переиспользуются, пока соединение и его владелец не изменились
+        for key, row in rows.items():
+            pid = self._inode_pid.get(row.inode)
+            if row.pid != pid:
+                rows[key] = row._replace(pid=pid)
+        self._rows = rows
+        return list(rows.values())
+
+    def _resolve(self, inodes):
+        """Поиск владельцев сокетов с обходом /proc/<pid>/fd только при необходимости
+
+        Сокеты, владелец которых не нашелся, повторно ищутся только при
+        следующем полном обходе, а не при каждом обновлении.
+        """
+        self._inode_pid = {inode: pid for inode, pid in self._inode_pid.items() if inode in inodes}
+        now = time.monotonic()
+        full = now - self._full_scan >= self.rescan_interval
+        if full:
+            self._unresolved = set()
+        else:
+            self._unresolved &= inodes
+        missing = inodes - self._inode_pid.keys() - self._unresolved
+        if not missing:
+            return
+        pids = {int(name) for name in os.listdir(self.proc_root) if name.isdigit()}
+        self._scanned_pids &= pids
+        self._socket_pids &= pids
+        # Сначала новые процессы и процессы, уже владевшие сокетами
+        order = [pids - self._scanned_pids, set(self._socket_pids)]
+        if full:
+            order.append(pids)
+        for group in order:
+            for pid in group:
+                self._scan_pid(pid, missing)
+                if not missing:
+                    return
+            if group is pids:
+                self._full_scan = now
+        self._unresolved |= missing
+
+    def _scan_pid(self, pid, missing):
+        fd_dir = f"{self.proc_root}/{pid}/fd"
+        self._scanned_pids.add(pid)
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            return
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if target.startswith("socket:["):
+                inode = int(target[8:-1])
+                self._socket_pids.add(pid)
+                if inode in missing:
+                    self._inode_pid[inode] = pid
+                    missing.discard(inode)
+
+    def _format_addresses(self, name, addrs):
+        key = tuple(addr.address for addr in addrs)
+        text = self._addresses.get(name)
+        if text is None or text[0] != key:
+            text = self._addresses[name] = (key, ", ".join(key))
+        return text[1]
+
+
+def _decode(hex_addr):
+    """Адрес из /proc/net/tcp: шестнадцатеричный IP в порядке хоста и порт"""
+    ip_hex, port_hex = hex_addr.split(":")
+    raw = bytes.fromhex(ip_hex)
+    # Каждое 32-битное слово записано в порядке байт хоста
+    if sys.byteorder == "little":
+        raw = b"".join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    if len(raw) == 4:
+        return f"{socket.inet_ntop(socket.AF_INET, raw)}:{int(port_hex, 16)}"
+    if raw[:12] == b"\0" * 10 + b"\xff\xff":
+        return f"{socket.inet_ntop(socket.AF_INET, raw[12:])}:{int(port_hex, 16)}"
+    return f"[{socket.inet_ntop(socket.AF_INET6, raw)}]:{int(port_hex, 16)}"
@@ -0,0 +1,276 @@
+import contextvars
+import functools
+import io
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# Сводка затрат проверки: перцентили в секундах, байтах и штуках
+OverheadRow = namedtuple("OverheadRow", [
+    "name", "count",
+    "wall_p50", "wall_p95", "wall_p99", "cpu_p50", "cpu_p95", "cpu_p99",
+    "subprocesses", "io_syscalls", "peak_alloc",
+])
+
+# Результат профилирования одного цикла обновления
+Capture = namedtuple("Capture", ["profile", "allocations"])
+
+PERCENTILES = (50, 95, 99)
+
+# События аудита, порождающие процессы; os.posix_spawn не учитывается,
+# так как subprocess вызывает его уже после события subprocess.Popen
+_SPAWN_EVENTS = frozenset({"subprocess.Popen", "os.system", "os.fork", "os.forkpty", "os.spawn"})
+_THREAD_IO = "/proc/thread-self/io"
+
+_counter = contextvars.ContextVar("overhead_counter", default=None)
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def _audit(event, args):
+    if event in _SPAWN_EVENTS:
+        counter = _counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def _install_hook():
+    # Хук аудита нельзя снять, поэтому он ставится один раз на процесс
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed:
+            sys.addaudithook(_audit)
+            _hook_installed = True
+
+
+def _io_syscalls():
+    """Число системных вызовов чтения и записи текущего потока"""
+    try:
+        with open(_THREAD_IO, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    total = 0
+    for line in data.splitlines():
+        if line.startswith((b"syscr:", b"syscw:")):
+            total += int(line.split()[1])
+    return total
+
+
+class Histogram:
+    """Последние size значений с перцентилями по запросу"""
+
+    def __init__(self, size=1024):
+        self.values = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value):
+        self.values.append(value)
+        self.count += 1
+
+    def percentile(self, q, ordered=None):
+        ordered = ordered if ordered is not None else sorted(self.values)
+        if not ordered:
+            return None
+        return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+    def summary(self):
+        ordered = sorted(self.values)
+        if not ordered:
+            return {"count": self.count}
+        data = {f"p{q}": self.percentile(q, ordered) for q in PERCENTILES}
+        data.update(count=self.count, mean=sum(ordered) / len(ordered), max=ordered[-1])
+        return data
+
+
+class Measurement:
+    """Затраты одного запуска; заполняется при выходе из Overhead.measure"""
+
+    __slots__ = ("wall", "cpu", "subprocesses", "io_syscalls", "peak_alloc")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.subprocesses = 0
+        self.io_syscalls = None
+        self.peak_alloc = None
+
+
+class _Stats:
+    __slots__ = ("wall", "cpu", "subprocesses", "io_syscalls", "peak_alloc")
+
+    def __init__(self, size):
+        for name in self.__slots__:
+            setattr(self, name, Histogram(size))
+
+
+class Overhead:
+    """Учет собственных затрат монитора по проверкам
+
+    Для каждой проверки копятся гистограммы времени выполнения, времени
+    CPU потока, числа порожденных процессов, системных вызовов ввода-вывода
+    и пика выделенной памяти. Пик памяти известен, только когда включен
+    tracemalloc (режим профилирования или python -X tracemalloc), и
+    считается по всему процессу.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._capture = None
+        _install_hook()
+
+    @contextmanager
+    def measure(self, name):
+        sample = Measurement()
+        counter = [0]
+        token = _counter.set(counter)
+        profile = self._profile()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            alloc_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        io_start = _io_syscalls()
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Начиная с Python 3.12 одновременно активен только один профиль
+                profile = None
+        try:
+            yield sample
+        finally:
+            if profile is not None:
+                profile.disable()
+            sample.wall = time.perf_counter() - wall_start
+            sample.cpu = time.thread_time() - cpu_start
+            if io_start is not None:
+                sample.io_syscalls = _io_syscalls() - io_start
+            if tracing and tracemalloc.is_tracing():
+                sample.peak_alloc = max(tracemalloc.get_traced_memory()[1] - alloc_start, 0)
+            _counter.reset(token)
+            sample.subprocesses = counter[0]
+            if profile is not None:
+                self._merge_profile(profile)
+            self.add(name, sample)
+
+    def record(self, name, wall, cpu=None, subprocesses=0):
+        """Учет затрат, измеренных снаружи (например, внешней команды)"""
+        sample = Measurement()
+        sample.wall = wall
+        sample.cpu = cpu
+        sample.subprocesses = subprocesses
+        self.add(name, sample)
+
+    def add(self, name, sample):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _Stats(self.size)
+            for field in _Stats.__slots__:
+                value = getattr(sample, field)
+                if value is not None:
+                    getattr(stats, field).add(value)
+
+    def names(self):
+        with self._lock:
+            return sorted(self._stats)
+
+    def summary(self):
+        """{проверка: {показатель: {count, mean, max, p50, p95, p99}}}"""
+        with self._lock:
+            return {
+                name: {field: getattr(stats, field).summary() for field in _Stats.__slots__}
+                for name, stats in sorted(self._stats.items())
+            }
+
+    def rows(self):
+        rows = []
+        for name, data in self.summary().items():
+            wall, cpu = data["wall"], data["cpu"]
+            rows.append(OverheadRow(
+                name=name,
+                count=wall["count"],
+                wall_p50=wall.get("p50"),
+                wall_p95=wall.get("p95"),
+                wall_p99=wall.get("p99"),
+                cpu_p50=cpu.get("p50"),
+                cpu_p95=cpu.get("p95"),
+                cpu_p99=cpu.get("p99"),
+                subprocesses=data["subprocesses"].get("mean"),
+                io_syscalls=data["io_syscalls"].get("mean"),
+                peak_alloc=data["peak_alloc"].get("max"),
+            ))
+        return rows
+
+    def to_json(self):
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    def start_capture(self):
+        """Профилирование cProfile и tracemalloc всех замеров до stop_capture"""
+        # pstats и cProfile нужны только для профилирования и не грузятся при запуске
+        import pstats
+        with self._lock:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            self._capture = (pstats.Stats(), started_tracing)
+
+    def stop_capture(self, limit=30):
+        with self._lock:
+            if self._capture is None:
+                return None
+            stats, started_tracing = self._capture
+            self._capture = None
+        allocations = ""
+        if tracemalloc.is_tracing():
+            top = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+            allocations = "\n".join(str(stat) for stat in top)
+            if started_tracing:
+                tracemalloc.stop()
+        out = io.StringIO()
+        if stats.stats:
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(limit)
+        return Capture(out.getvalue(), allocations)
+
+    @property
+    def capturing(self):
+        return self._capture is not None
+
+    def _profile(self):
+        # cProfile работает в пределах потока, поэтому у каждого замера свой профиль
+        if self._capture is None:
+            return None
+        import cProfile
+        return cProfile.Profile()
+
+    def _merge_profile(self, profile):
+        with self._lock:
+            if self._capture is not None:
+                self._capture[0].add(profile)
+
+
+def measured(method):
+    """Замер метода проверки, если у объекта задан атрибут overhead"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        overhead = getattr(self, "overhead", None)
+        if overhead is None:
+            return method(self, *args, **kwargs)
+        with overhead.measure(method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,108 @@
+import asyncio
+import re
+import time
+from collections import namedtuple
+
+# Результат проверки одной цели; задержки в миллисекундах
+ProbeResult = namedtuple("ProbeResult", [
+    "host", "port", "kind", "ok",
+    "connect_ms", "rtt_min", "rtt_avg", "rtt_max", "loss", "error",
+])
+
+_RTT_RE = re.compile(r"= ([\d.]+)/([\d.]+)/([\d.]+)")
+_LOSS_RE = re.compile(r"([\d.]+)% packet loss")
+
+
+def parse_target(text, default_port=None):
+    """Разбор цели вида host, host:port или [ipv6]:port"""
+    text = text.strip()
+    if text.startswith("["):
+        host, _, rest = text[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else None
+    elif text.count(":") == 1:
+        host, port = text.split(":")
+    else:
+        host, port = text, None
+    return host, int(port) if port else default_port
+
+
+class ProbeEngine:
+    """Параллельная проверка доступности множества хостов"""
+
+    def __init__(self, concurrency=100, timeout=3.0, ping_count=1):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ping_count = ping_count
+
+    def run(self, targets, ping=False):
+        """Синхронный запуск: targets — список строк host:port или пар (host, port)"""
+        return asyncio.run(self.probe_all(targets, ping))
+
+    async def probe_all(self, targets, ping=False):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(coro):
+            async with semaphore:
+                return await coro
+
+        jobs = []
+        for target in targets:
+            host, port = parse_target(target) if isinstance(target, str) else target
+            if port is not None:
+                jobs.append(limited(self.tcp(host, port)))
+            if ping or port is None:
+                jobs.append(limited(self.ping(host)))
+        return await asyncio.gather(*jobs)
+
+    async def tcp(self, host, port):
+        """Время установки TCP-соединения"""
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        except asyncio.TimeoutError:
+            return _failed(host, port, "tcp", f"Превышено время ожидания ({self.timeout} с)")
+        except OSError as e:
+            return _failed(host, port, "tcp", str(e))
+        connect_ms = (time.perf_counter() - start) * 1000
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return ProbeResult(host, port, "tcp", True, round(connect_ms, 3), None, None, None, None, None)
+
+    async def ping(self, host):
+        """RTT и потери пакетов по данным ping"""
+        argv = ["ping", "-n", "-q", "-c", str(self.ping_count), "-W", str(max(1, int(self.timeout)))]
+        if self.ping_count > 1:
+            argv += ["-i", "0.2"]
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, host,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            return _failed(host, None, "ping", str(e))
+
+        limit = self.timeout * self.ping_count + 1
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), limit)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return _failed(host, None, "ping", f"Превышено время ожидания ({limit} с)")
+
+        output = stdout.decode(errors="replace")
+        loss = _LOSS_RE.search(output)
+        loss = float(loss.group(1)) if loss else 100.0
+        rtt = _RTT_RE.search(output)
+        if proc.returncode != 0 or rtt is None:
+            error = stderr.decode(errors="replace").strip() or f"Не удалось выполнить ping до {host}"
+            return ProbeResult(host, None, "ping", False, None, None, None, None, loss, error)
+        rtt_min, rtt_avg, rtt_max = map(float, rtt.groups())
+        return ProbeResult(host, None, "ping", True, None, rtt_min, rtt_avg, rtt_max, loss, None)
+
+
+def _failed(host, port, kind, error):
+    return ProbeResult(host, port, kind, False, None, None, None, None, None, error)
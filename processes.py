@@ -0,0 +1,118 @@
+import heapq
+import time
+from collections import namedtuple
+
+import psutil
+
+ProcessRow = namedtuple("ProcessRow", ["pid", "name", "cpu_percent", "mem_percent", "rss"])
+
+# Результат одного прохода; primed = False, пока нет предыдущего замера для расчета CPU
+ProcessSample = namedtuple("ProcessSample", ["timestamp", "count", "primed", "top_cpu", "top_mem"])
+
+
+class _Entry:
+    __slots__ = ("proc", "start", "name", "cpu_time")
+
+    def __init__(self, proc, start, name):
+        self.proc = proc
+        self.start = start
+        self.name = name
+        self.cpu_time = None
+
+
+class ProcessSampler:
+    """Однопроходный сбор процессов с расчетом CPU по разнице замеров
+
+    Объекты Process сохраняются между проходами по pid. Переиспользование
+    pid определяется по времени запуска из /proc/<pid>/stat, который oneshot
+    уже прочитал для cpu_times; процесс с другим временем запуска считается
+    новым, и его CPU не сравнивается с чужим замером. Где stat недоступен,
+    pid проверяется через is_running, только если время CPU уменьшилось.
+    """
+
+    def __init__(self, top=15, exclude_pids=()):
+        self.top = top
+        self.exclude_pids = frozenset(exclude_pids)
+        self._entries = {}
+        self._last = None
+
+    def sample(self, top=None):
+        top = top or self.top
+        primed = self._last is not None
+        rows = list(self.iter_rows())
+        return ProcessSample(
+            timestamp=time.time(),
+            count=len(rows),
+            primed=primed,
+            top_cpu=heapq.nlargest(top, rows, key=lambda r: r.cpu_percent),
+            top_mem=heapq.nlargest(top, rows, key=lambda r: r.rss),
+        )
+
+    def iter_rows(self):
+        """Строки всех процессов по одной, без построения полного списка"""
+        now = time.monotonic()
+        wall = now - self._last if self._last is not None else None
+        self._last = now
+        total_mem = psutil.virtual_memory().total
+
+        entries = {}
+        for pid in psutil.pids():
+            if pid in self.exclude_pids:
+                continue
+            entry = self._entries.get(pid)
+            try:
+                sample = self._read(entry) if entry is not None else None
+                if sample is None:
+                    entry = self._new_entry(pid)
+                    sample = self._read(entry)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+                continue
+            if sample is None:
+                continue
+            cpu_time, rss = sample
+
+            cpu = 0.0
+            if wall and entry.cpu_time is not None:
+                cpu = round(max(cpu_time - entry.cpu_time, 0.0) / wall * 100, 1)
+            entry.cpu_time = cpu_time
+            entries[pid] = entry
+            yield ProcessRow(pid, entry.name, cpu, round(rss / total_mem * 100, 2), rss)
+
+        # Завершившиеся процессы выпадают из кэша
+        self._entries = entries
+
+    def _read(self, entry):
+        """(время CPU, rss) процесса записи; None, если процесса нет или pid занят другим"""
+        proc = entry.proc
+        try:
+            with proc.oneshot():
+                times = proc.cpu_times()
+                rss = proc.memory_info().rss
+                start = _start_time(proc)
+        except psutil.ZombieProcess:
+            raise
+        except psutil.NoSuchProcess:
+            return None
+        cpu_time = times.user + times.system
+        if start != entry.start:
+            return None
+        if start is None and entry.cpu_time is not None and cpu_time < entry.cpu_time and not proc.is_running():
+            return None
+        return cpu_time, rss
+
+    def _new_entry(self, pid):
+        proc = psutil.Process(pid)
+        with proc.oneshot():
+            return _Entry(proc, _start_time(proc), proc.name())
+
+
+def _start_time(proc):
+    """Время запуска из /proc/<pid>/stat; внутри oneshot файл не перечитывается
+
+    Process.create_time кэшируется в объекте и переиспользование pid не
+    показывает. None, если платформа не Linux.
+    """
+    parse = getattr(proc._proc, "_parse_stat_file", None)
+    if parse is None:
+        return None
+    return parse()["create_time"]
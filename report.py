@@ -0,0 +1,254 @@
+"""Потоковый структурированный отчет по проверкам
+
+Каждая проверка отдает записи по одной, и они сразу пишутся в файл:
+полные списки процессов и соединений не накапливаются в памяти.
+
+Формат определяется по расширению файла:
+    .jsonl — JSON Lines, одна запись на строку с полем section
+    .csv   — длинный формат: section, index, field, value
+и необязательное сжатие: .gz (gzip) или .zst (zstd, нужен пакет zstandard).
+"""
+import csv
+import gzip
+import io
+import json
+import socket
+import time
+from collections import namedtuple
+from concurrent.futures import as_completed
+from datetime import datetime
+
+REPORT_VERSION = 1
+
+CheckRecord = namedtuple("CheckRecord", ["name", "success", "message", "duration"])
+CommandRecord = namedtuple("CommandRecord", ["title", "argv", "returncode", "error", "duration", "output"])
+
+# Внешние команды отчета: (раздел, заголовок, argv, таймаут)
+REPORT_COMMANDS = (
+    ("disks", "SMART-устройства", ["smartctl", "--scan"], 10),
+    ("security", "Статус брандмауэра", ["ufw", "status"], 10),
+)
+
+# Разделы в порядке записи
+SECTIONS = ("system", "dashboard", "checks", "interfaces", "connections", "disks", "disk_io",
+            "processes", "services", "security")
+
+SECTION_TITLES = {
+    "system": "Сведения о системе",
+    "dashboard": "Основные показатели",
+    "checks": "Базовые проверки",
+    "interfaces": "Сетевые интерфейсы",
+    "connections": "TCP-соединения",
+    "disks": "Точки монтирования",
+    "disk_io": "Ввод-вывод дисков",
+    "processes": "Все процессы",
+    "services": "Сервисы",
+    "security": "Безопасность",
+}
+
+FORMATS = ("jsonl", "csv")
+COMPRESSIONS = ("gz", "zst")
+
+
+def detect_format(path):
+    """(формат, сжатие) по расширению файла"""
+    parts = path.lower().rsplit(".", 2)[1:]
+    compression = parts[-1] if parts and parts[-1] in COMPRESSIONS else None
+    if compression:
+        parts = parts[:-1]
+    fmt = "csv" if parts and parts[-1] == "csv" else "jsonl"
+    return fmt, compression
+
+
+def _open_text(path, compression):
+    if compression == "gz":
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    if compression == "zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Для сжатия zstd нужен пакет zstandard (pip install zstandard)")
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _fields(record):
+    return record._asdict() if hasattr(record, "_asdict") else dict(record)
+
+
+class ReportWriter:
+    """Запись разделов отчета по мере поступления записей"""
+
+    def __init__(self, path, fmt=None, compression=None):
+        detected_fmt, detected_compression = detect_format(path)
+        self.fmt = fmt or detected_fmt
+        self.compression = compression if compression is not None else detected_compression
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Неизвестный формат отчета: {self.fmt}")
+        if self.compression not in (None, "", *COMPRESSIONS):
+            raise ValueError(f"Неизвестное сжатие: {self.compression}")
+        self.path = path
+        self.counts = {}
+        self._file = _open_text(path, self.compression or None)
+        self._csv = None
+        if self.fmt == "csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(["section", "index", "field", "value"])
+
+    def write(self, section, record):
+        index = self.counts.get(section, 0)
+        self.counts[section] = index + 1
+        fields = _fields(record)
+        if self._csv is None:
+            self._file.write(json.dumps({"section": section, **fields}, ensure_ascii=False, default=str) + "\n")
+            return
+        for field, value in fields.items():
+            if isinstance(value, (list, tuple, dict)):
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            self._csv.writerow([section, index, field, value])
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReportBuilder:
+    """Запуск выбранных проверок с потоковой записью результатов
+
+    Разделы со скоростями (CPU, интерфейсы, диски) требуют двух замеров:
+    все такие сборщики делают первый замер сразу, затем один общий
+    интервал ожидания.
+    """
+
+    def __init__(self, sections=SECTIONS, interval=1.0, checker=None, commands=REPORT_COMMANDS,
+                 disk_path="/", min_gb=5, internet=("8.8.8.8", 53)):
+        unknown = set(sections) - set(SECTIONS)
+        if unknown:
+            raise ValueError(f"Неизвестные разделы отчета: {', '.join(sorted(unknown))}")
+        self.sections = [name for name in SECTIONS if name in sections]
+        self.interval = interval
+        self.checker = checker
+        self.commands = commands
+        self.disk_path = disk_path
+        self.min_gb = min_gb
+        self.internet = internet
+
+    def run(self, writer, progress=None):
+        """Запись отчета; progress(раздел) вызывается перед каждым разделом"""
+        writer.write("report", {
+            "version": REPORT_VERSION,
+            "host": socket.gethostname(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "sections": self.sections,
+        })
+        runner = None
+        futures = {}
+        commands = [command for command in self.commands if command[0] in self.sections]
+        if commands:
+            from runner import CommandRunner
+            runner = CommandRunner(ttl=0)
+            # Внешние команды выполняются параллельно со сбором остальных разделов
+            for section, title, argv, timeout in commands:
+                futures[runner.submit(argv, timeout)] = (section, title)
+        try:
+            collectors = self._prime()
+            for section in self.sections:
+                if progress:
+                    progress(section)
+                produce = getattr(self, f"_{section}", None)
+                if produce is not None:
+                    for record in produce(collectors):
+                        writer.write(section, record)
+            if futures and progress:
+                progress("commands")
+            for future in as_completed(futures):
+                section, title = futures[future]
+                result = future.result()
+                writer.write(section, CommandRecord(title, " ".join(result.argv), result.returncode,
+                                                    result.error, round(result.duration, 3), result.output))
+        finally:
+            if runner is not None:
+                runner.shutdown()
+        return writer.counts
+
+    def _prime(self):
+        collectors = {}
+        if "dashboard" in self.sections:
+            from collectors import DashboardCollector
+            collectors["dashboard"] = DashboardCollector(self.disk_path)
+        if "interfaces" in self.sections or "connections" in self.sections:
+            from network import NetworkCollector
+            collectors["network"] = NetworkCollector()
+            if "interfaces" in self.sections:
+                collectors["network"].interfaces()
+        if "disks" in self.sections or "disk_io" in self.sections:
+            from disks import DiskScanner
+            collectors["disks"] = DiskScanner()
+            if "disk_io" in self.sections:
+                collectors["disks"].io()
+        if "processes" in self.sections:
+            from processes import ProcessSampler
+            collectors["processes"] = ProcessSampler()
+            # Первый проход только заполняет кэш для расчета CPU
+            for _ in collectors["processes"].iter_rows():
+                pass
+        if {"dashboard", "interfaces", "disk_io", "processes"} & set(self.sections):
+            time.sleep(self.interval)
+        return collectors
+
+    def _system(self, collectors):
+        from collectors import system_info
+        yield system_info()
+
+    def _dashboard(self, collectors):
+        yield collectors["dashboard"].sample()
+
+    def _checks(self, collectors):
+        checker = self.checker
+        if checker is None:
+            from checks import SystemChecker
+            checker = SystemChecker()
+        checks = [("disk", lambda: checker.check_disk(self.disk_path, self.min_gb)),
+                  ("resources", checker.check_resources)]
+        if self.internet:
+            checks.append(("internet", lambda: checker.check_internet(*self.internet)))
+        for name, check in checks:
+            start = time.perf_counter()
+            success, message = check()
+            yield CheckRecord(name, success, message, round(time.perf_counter() - start, 6))
+
+    def _interfaces(self, collectors):
+        yield from collectors["network"].interfaces()
+
+    def _connections(self, collectors):
+        yield from collectors["network"].connections()
+
+    def _disks(self, collectors):
+        yield from collectors["disks"].scan()
+
+    def _disk_io(self, collectors):
+        yield from collectors["disks"].io()
+
+    def _processes(self, collectors):
+        yield from collectors["processes"].iter_rows()
+
+    def _services(self, collectors):
+        from services import query_all
+        yield from query_all()
+
+    def _security(self, collectors):
+        from aptindex import default_index
+        yield from default_index().upgradable()
+
+
+def write_report(path, sections=SECTIONS, fmt=None, compression=None, progress=None, **options):
+    """Отчет в файл; возвращает число записей по разделам"""
+    builder = ReportBuilder(sections, **options)
+    with ReportWriter(path, fmt, compression) as writer:
+        return builder.run(writer, progress)
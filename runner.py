@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, InvalidStateError
+
+# Результат внешней команды; error = None при успешном завершении
+CommandResult = namedtuple("CommandResult", [
+    "argv", "returncode", "output", "stderr", "error", "duration", "cached",
+])
+
+
+class CommandRunner:
+    """Параллельный запуск внешних команд с таймаутами и кэшем результатов"""
+
+    def __init__(self, ttl=60.0, max_parallel=8):
+        self.ttl = ttl
+        self._cache = {}
+        self._pending = {}
+        # Число живых Future вызывающих на каждый общий запуск
+        self._followers = {}
+        self._lock = threading.Lock()
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="command-runner", daemon=True)
+        self._thread.start()
+
+    def submit(self, argv, timeout=10.0, ttl=None):
+        """Запуск команды; возвращает concurrent.futures.Future с CommandResult
+
+        У каждого вызова свой Future: его отмена отсоединяет только этого
+        вызывающего, а общий запуск одинаковой команды продолжается для
+        остальных. Когда отменены все, общий запуск отменяется и процесс
+        завершается.
+        """
+        key = tuple(argv)
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                future = Future()
+                future.set_result(cached[1]._replace(cached=True))
+                return future
+            # Одинаковые команды, запущенные одновременно, выполняются один раз
+            shared = self._pending.get(key)
+            if shared is None or shared.done():
+                # Команда выполняется в чистом контексте: ее затраты не приписываются
+                # вызывающему коду, а учитываются по CommandResult
+                shared = contextvars.Context().run(
+                    asyncio.run_coroutine_threadsafe, self._execute(key, timeout, ttl), self._loop)
+                self._pending[key] = shared
+            self._followers[shared] = self._followers.get(shared, 0) + 1
+        return self._follow(key, shared)
+
+    def run(self, argv, timeout=10.0, ttl=None):
+        """Синхронный вариант submit"""
+        return self.submit(argv, timeout, ttl).result()
+
+    def invalidate(self, argv=None):
+        """Сброс кэша для команды или целиком"""
+        with self._lock:
+            if argv is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(tuple(argv), None)
+
+    def shutdown(self):
+        with self._lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            future.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1)
+
+    def _follow(self, key, shared):
+        """Future вызывающего, повторяющий результат общего запуска"""
+        future = Future()
+
+        def copy(source):
+            try:
+                if source.cancelled():
+                    future.cancel()
+                elif source.exception() is not None:
+                    future.set_exception(source.exception())
+                else:
+                    future.set_result(source.result())
+            except InvalidStateError:
+                # Вызывающий уже отменил свой Future
+                pass
+
+        def release(_):
+            with self._lock:
+                left = self._followers[shared] - 1
+                if left:
+                    self._followers[shared] = left
+                    return
+                del self._followers[shared]
+                # Новые вызовы той же команды уже не присоединяются к отменяемому запуску
+                if self._pending.get(key) is shared:
+                    del self._pending[key]
+            if not shared.done():
+                shared.cancel()
+
+        future.add_done_callback(release)
+        shared.add_done_callback(copy)
+        return future
+
+    async def _execute(self, key, timeout, ttl):
+        try:
+            async with self._semaphore:
+                result = await self._spawn(key, timeout)
+            if result.error is None and ttl > 0:
+                with self._lock:
+                    self._cache[key] = (time.monotonic() + ttl, result)
+            return result
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    async def _spawn(self, key, timeout):
+        start = time.monotonic()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *key,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            return CommandResult(key, None, "", "", str(e), time.monotonic() - start, False)
+
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await _kill(proc)
+            error = f"Превышено время ожидания ({timeout} с)"
+            return CommandResult(key, None, "", "", error, time.monotonic() - start, False)
+        except asyncio.CancelledError:
+            await _kill(proc)
+            raise
+
+        output = stdout.decode(errors="replace")
+        stderr = stderr.decode(errors="replace")
+        error = None
+        if proc.returncode != 0:
+            error = stderr.strip() or f"Команда завершилась с кодом {proc.returncode}"
+        return CommandResult(key, proc.returncode, output, stderr, error, time.monotonic() - start, False)
+
+
+async def _kill(proc):
+    """Завершение зависшего или отмененного процесса"""
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
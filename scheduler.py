@@ -0,0 +1,152 @@
+import threading
+import time
+
+import psutil
+
+from overhead import Overhead
+
+
+class Job:
+    """Сборщик с собственным периодом и оценкой стоимости запуска (секунды CPU)"""
+
+    def __init__(self, name, fn, interval, cost=0.0, static=False, keep_alive=False, active=True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.cost = cost
+        self.static = static
+        self.keep_alive = keep_alive
+        self.active = active
+        self.next_due = 0.0
+        self.done = False
+        self.running = False
+        self.runs = 0
+        self.last_duration = 0.0
+
+
+class Scheduler:
+    """Планировщик сборщиков с паузой невидимых и откатом при превышении бюджета CPU
+
+    Если собственная загрузка CPU монитора выше cpu_budget (% одного ядра),
+    периоды заметных по стоимости сборщиков увеличиваются вдвое, вплоть
+    до max_backoff; при загрузке ниже половины бюджета — уменьшаются.
+    """
+
+    def __init__(self, cpu_budget=5.0, max_backoff=8.0, cheap_cost=0.005, clock=time.monotonic, overhead=None):
+        self.cpu_budget = cpu_budget
+        self.max_backoff = max_backoff
+        self.cheap_cost = cheap_cost
+        self.clock = clock
+        self.overhead = overhead or Overhead()
+        self.backoff = 1.0
+        self.paused = False
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._cpu_checked = clock()
+        self._self_process = psutil.Process()
+        self._self_process.cpu_percent(None)
+
+    def add(self, name, fn, interval, cost=0.0, static=False, keep_alive=False, active=True):
+        with self._lock:
+            job = self.jobs[name] = Job(name, fn, interval, cost, static, keep_alive, active)
+        return job
+
+    def set_active(self, name, active):
+        """Включение сборщика; при включении он запускается без ожидания периода"""
+        with self._lock:
+            job = self.jobs[name]
+            if active and not job.active:
+                job.next_due = 0.0
+            job.active = active
+
+    def set_paused(self, paused):
+        """Пауза всех сборщиков, кроме keep_alive (окно скрыто)"""
+        with self._lock:
+            self.paused = paused
+
+    def trigger(self, name):
+        """Внеочередной запуск при следующей проверке"""
+        with self._lock:
+            job = self.jobs[name]
+            job.next_due = 0.0
+            job.done = False
+
+    def trigger_enabled(self):
+        """Внеочередной запуск всех включенных сборщиков, кроме статических; возвращает их имена"""
+        with self._lock:
+            jobs = [job for job in self.jobs.values() if not job.static and self._enabled(job)]
+            for job in jobs:
+                job.next_due = 0.0
+        return [job.name for job in jobs]
+
+    def run_due(self, on_result, executor=None):
+        """Запуск наступивших сборщиков; on_result(имя, результат, ошибка)
+
+        С executor сборщики выполняются в его потоках, и медленный сборщик
+        не задерживает остальные. Один сборщик никогда не выполняется дважды
+        одновременно.
+        """
+        for job in self._take_due(self.clock()):
+            if executor is None:
+                self._run(job, on_result)
+            else:
+                executor.submit(self._run, job, on_result)
+        self._update_backoff()
+
+    def _run(self, job, on_result):
+        with self.overhead.measure(job.name) as sample:
+            try:
+                result, error = job.fn(), None
+            except Exception as e:
+                result, error = None, e
+        duration = sample.cpu
+        with self._lock:
+            # Оценка стоимости уточняется по фактическим замерам
+            job.cost = duration if job.runs == 0 else 0.7 * job.cost + 0.3 * duration
+            job.runs += 1
+            job.last_duration = duration
+            job.done = job.static and error is None
+            job.next_due = self.clock() + self._interval(job)
+            job.running = False
+        on_result(job.name, result, error)
+
+    def next_wakeup(self):
+        """Секунды до ближайшего запуска"""
+        now = self.clock()
+        with self._lock:
+            dues = [job.next_due for job in self.jobs.values() if self._runnable(job)]
+        return max(min(dues) - now, 0.0) if dues else 1.0
+
+    def _take_due(self, now):
+        with self._lock:
+            jobs = [job for job in self.jobs.values() if self._runnable(job) and job.next_due <= now]
+            for job in jobs:
+                job.running = True
+        return sorted(jobs, key=lambda job: job.next_due)
+
+    def _runnable(self, job):
+        if job.done or job.running:
+            return False
+        return self._enabled(job)
+
+    def _enabled(self, job):
+        if self.paused and not job.keep_alive:
+            return False
+        return job.active or job.keep_alive
+
+    def _interval(self, job):
+        if job.cost < self.cheap_cost:
+            return job.interval
+        return job.interval * self.backoff
+
+    def _update_backoff(self):
+        # Собственная загрузка оценивается не чаще раза в секунду
+        now = self.clock()
+        if now - self._cpu_checked < 1.0:
+            return
+        self._cpu_checked = now
+        usage = self._self_process.cpu_percent(None)
+        if usage > self.cpu_budget:
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+        elif usage < self.cpu_budget / 2:
+            self.backoff = max(self.backoff / 2, 1.0)
@@ -0,0 +1,187 @@
+"""Состояние юнитов systemd одним структурированным запросом с выдачей изменений
+
+Все загруженные юниты запрашиваются одним вызовом systemctl show со
+списком нужных свойств. systemctl show не видит юниты, которые включены,
+но сейчас не загружены; они добавляются из systemctl list-unit-files,
+который коллектор вызывает реже (список файлов меняется редко).
+Коллектор хранит предыдущий снимок и отдает только изменившиеся юниты и
+события (запуск, остановка, сбой, включение и отключение автозагрузки).
+
+Команда systemctl задается переменной окружения MOSMASTER_SYSTEMCTL,
+например "ssh host systemctl" или путь к заглушке для проверки.
+"""
+import os
+import shlex
+import subprocess
+import time
+from collections import namedtuple
+
+SYSTEMCTL = tuple(shlex.split(os.environ.get("MOSMASTER_SYSTEMCTL", "systemctl")))
+
+PROPERTIES = ("Id", "LoadState", "ActiveState", "SubState", "UnitFileState", "Description")
+
+UnitState = namedtuple("UnitState", ["unit", "load", "active", "sub", "enabled", "description"])
+ServiceEvent = namedtuple("ServiceEvent", ["timestamp", "unit", "event", "old", "new"])
+# Результат обновления: изменившиеся и исчезнувшие юниты, события и итоги по всем юнитам
+ServiceChanges = namedtuple("ServiceChanges", ["timestamp", "changed", "removed", "events", "total", "failed"])
+
+EVENT_TITLES = {
+    "added": "появился",
+    "removed": "исчез",
+    "started": "запущен",
+    "stopped": "остановлен",
+    "failed": "сбой",
+    "state": "состояние",
+    "enabled": "автозагрузка включена",
+    "disabled": "автозагрузка отключена",
+}
+
+# Состояния UnitFileState включенной автозагрузки; static, indirect и прочие
+# не включаются и не отключаются и показываются как есть
+ENABLED_STATES = ("enabled", "enabled-runtime")
+
+
+def parse_show(text):
+    """Вывод systemctl show: блоки Key=Value, разделенные пустой строкой"""
+    units = []
+    fields = {}
+    for line in text.splitlines():
+        if not line:
+            if fields:
+                units.append(_unit(fields))
+                fields = {}
+            continue
+        key, sep, value = line.partition("=")
+        if sep:
+            fields[key] = value
+    if fields:
+        units.append(_unit(fields))
+    return [unit for unit in units if unit.unit]
+
+
+def _unit(fields):
+    return UnitState(
+        unit=fields.get("Id", ""),
+        load=fields.get("LoadState", ""),
+        active=fields.get("ActiveState", ""),
+        sub=fields.get("SubState", ""),
+        enabled=fields.get("UnitFileState", ""),
+        description=fields.get("Description", ""),
+    )
+
+
+def parse_unit_files(text):
+    """Вывод systemctl list-unit-files --no-legend: {юнит: состояние}"""
+    files = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) >= 2:
+            files[fields[0]] = fields[1]
+    return files
+
+
+def merge_unit_files(units, files):
+    """Юниты с добавлением включенных, но не загруженных; шаблоны name@.service пропускаются"""
+    loaded = {unit.unit for unit in units}
+    return units + [UnitState(name, "", "inactive", "dead", state, "")
+                    for name, state in sorted(files.items()) if name not in loaded and "@." not in name]
+
+
+def _systemctl(command, args, timeout):
+    result = subprocess.run(
+        [*command, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        timeout=timeout
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"systemctl завершился с кодом {result.returncode}")
+    return result.stdout
+
+
+def query_units(command=SYSTEMCTL, pattern="*", timeout=10):
+    """Все загруженные юниты, подходящие под шаблон, одним вызовом systemctl"""
+    return parse_show(_systemctl(
+        command, ["show", "--no-pager", "--property=" + ",".join(PROPERTIES), pattern], timeout))
+
+
+def query_unit_files(command=SYSTEMCTL, pattern="*", timeout=10):
+    """Файлы юнитов с включенной автозагрузкой, в том числе не загруженных"""
+    return parse_unit_files(_systemctl(
+        command, ["list-unit-files", "--no-pager", "--no-legend",
+                  "--state=" + ",".join(ENABLED_STATES), pattern], timeout))
+
+
+def query_all(command=SYSTEMCTL, pattern="*", timeout=10):
+    """Загруженные юниты и включенные, но не загруженные"""
+    return merge_unit_files(query_units(command, pattern, timeout), query_unit_files(command, pattern, timeout))
+
+
+def unit_events(timestamp, old, new):
+    """События перехода юнита из состояния old в new (None — юнита нет)"""
+    if old is None:
+        return [ServiceEvent(timestamp, new.unit, "added", "", new.active)]
+    if new is None:
+        return [ServiceEvent(timestamp, old.unit, "removed", old.active, "")]
+    events = []
+    if old.active != new.active:
+        if new.active == "active":
+            event = "started"
+        elif new.active == "failed":
+            event = "failed"
+        elif old.active == "active" and new.active == "inactive":
+            event = "stopped"
+        else:
+            event = "state"
+        events.append(ServiceEvent(timestamp, new.unit, event, old.active, new.active))
+    was_enabled, is_enabled = old.enabled in ENABLED_STATES, new.enabled in ENABLED_STATES
+    if was_enabled != is_enabled:
+        events.append(ServiceEvent(timestamp, new.unit, "enabled" if is_enabled else "disabled",
+                                   old.enabled, new.enabled))
+    return events
+
+
+class ServiceCollector:
+    """Снимки состояния юнитов с расчетом разницы между обновлениями"""
+
+    def __init__(self, command=SYSTEMCTL, pattern="*", timeout=10, files_interval=60.0, clock=time.time):
+        self.command = command
+        self.pattern = pattern
+        self.timeout = timeout
+        # Период запроса списка файлов юнитов, секунды
+        self.files_interval = files_interval
+        self.clock = clock
+        self.units = {}
+        self.primed = False
+        self._files = {}
+        self._files_due = None
+
+    def unit_files(self, now):
+        """Включенные файлы юнитов; список перезапрашивается раз в files_interval"""
+        if self._files_due is None or now >= self._files_due:
+            self._files = query_unit_files(self.command, self.pattern, self.timeout)
+            self._files_due = now + self.files_interval
+        return self._files
+
+    def refresh(self):
+        """Новый снимок; при первом вызове все юниты считаются изменившимися, но без событий"""
+        timestamp = self.clock()
+        units = merge_unit_files(query_units(self.command, self.pattern, self.timeout), self.unit_files(timestamp))
+        current = {unit.unit: unit for unit in units}
+        previous = self.units
+        changed = [unit for name, unit in current.items() if previous.get(name) != unit]
+        removed = [name for name in previous if name not in current]
+        events = []
+        if self.primed:
+            for unit in changed:
+                events.extend(unit_events(timestamp, previous.get(unit.unit), unit))
+            for name in removed:
+                events.extend(unit_events(timestamp, previous[name], None))
+        self.units = current
+        self.primed = True
+        failed = sum(1 for unit in current.values() if unit.active == "failed")
+        return ServiceChanges(timestamp, changed, removed, events, len(current), failed)
+
+    def failed(self):
+        return [unit for unit in self.units.values() if unit.active == "failed"]
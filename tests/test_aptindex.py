@@ -0,0 +1,194 @@
+import gzip
+import os
+
+import pytest
+
+from aptindex import AptIndex, Upgrade, compare_versions, list_origin, read_packages, read_status
+
+# Пары (a, b, результат dpkg --compare-versions)
+VERSIONS = [
+    ("1.0", "1.0", 0),
+    ("1.0", "1.0-0", 0),
+    ("1.0", "1.1", -1),
+    ("1.10", "1.9", 1),
+    ("1.0~rc1", "1.0", -1),
+    ("1.0~rc1", "1.0~rc2", -1),
+    ("1.0~~", "1.0~", -1),
+    ("1.0", "1.0+b1", -1),
+    ("1.0a", "1.0+", -1),
+    ("1.0.0", "1.0", 1),
+    ("1:0.9", "2.0", 1),
+    ("0:2.0", "2.0", 0),
+    ("2.0-1", "2.0-1ubuntu1", -1),
+    ("2.0-1ubuntu1", "2.0-2", -1),
+    ("2.0-1.1", "2.0-1", 1),
+    ("7.4p1-10", "7.4p1-10+deb9u7", -1),
+    ("1.2.3-4", "1.2.3-4~bpo1", 1),
+    ("2:1.0-1-1", "2:1.0-1", 1),
+    ("1.0a", "1.0b", -1),
+    ("001", "1", 0),
+]
+
+STATUS = """Package: curl
+Status: install ok installed
+Architecture: amd64
+Version: 7.88.1-10
+Description: command line tool
+ with a continuation line
+ Version: 99 (не поле, а продолжение)
+
+Package: removed
+Status: deinstall ok config-files
+Architecture: amd64
+Version: 1.0-1
+
+Package: tzdata
+Status: install ok installed
+Architecture: all
+Version: 2024a-0+deb12u1
+"""
+
+PACKAGES = """Package: curl
+Architecture: amd64
+Version: 7.88.1-10+deb12u5
+
+Package: curl
+Architecture: amd64
+Version: 7.88.1-10+deb12u1
+
+Package: tzdata
+Architecture: all
+Version: 2024a-0+deb12u1
+"""
+
+SECURITY = """Package: curl
+Architecture: amd64
+Version: 7.88.1-10+deb12u4
+"""
+
+
+@pytest.mark.parametrize("a, b, expected", VERSIONS)
+def test_compare_versions(a, b, expected):
+    assert compare_versions(a, b) == expected
+    assert compare_versions(b, a) == -expected
+
+
+def _write(path, text):
+    if path.endswith(".gz"):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return path
+
+
+def test_read_status_skips_not_installed_and_continuations(tmp_path):
+    installed = read_status(_write(str(tmp_path / "status"), STATUS))
+    assert installed == {("curl", "amd64"): "7.88.1-10", ("tzdata", "all"): "2024a-0+deb12u1"}
+
+
+def test_read_packages_keeps_highest_version_from_gz(tmp_path):
+    available = read_packages(_write(str(tmp_path / "x_Packages.gz"), PACKAGES))
+    assert available[("curl", "amd64")] == "7.88.1-10+deb12u5"
+
+
+def test_list_origin():
+    assert list_origin("/var/lib/apt/lists/deb.debian.org_debian_dists_bookworm-security_main_binary-amd64_Packages") \
+        == "bookworm-security"
+    assert list_origin("/lists/local_Packages.gz") == "local"
+
+
+@pytest.fixture
+def index(tmp_path):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    _write(str(tmp_path / "status"), STATUS)
+    _write(str(lists / "deb.debian.org_debian_dists_bookworm_main_binary-amd64_Packages.gz"), PACKAGES)
+    _write(str(lists / "deb.debian.org_debian_dists_bookworm-security_main_binary-amd64_Packages"), SECURITY)
+    return AptIndex(str(tmp_path / "status"), str(lists))
+
+
+def test_upgradable_picks_best_candidate(index):
+    assert index.upgradable() == [Upgrade("curl", "amd64", "7.88.1-10", "7.88.1-10+deb12u5", "bookworm")]
+
+
+def test_upgradable_rereads_only_changed_files(index):
+    index.upgradable()
+    assert index.parsed == 3
+    index.upgradable()
+    assert index.parsed == 0
+
+    security = os.path.join(index.lists, "deb.debian.org_debian_dists_bookworm-security_main_binary-amd64_Packages")
+    _write(security, SECURITY.replace("deb12u4", "deb12u9"))
+    os.utime(security, ns=(1, 1))
+    assert index.upgradable()[0].origin == "bookworm-security"
+    assert index.parsed == 1
+
+
+RELEASE = """-----BEGIN PGP SIGNED MESSAGE-----
+Hash: SHA512
+
+Origin: Debian Backports
+Suite: bookworm-backports
+{fields}SHA256:
+ 0123 100 main/binary-amd64/Packages
+-----BEGIN PGP SIGNATURE-----
+
+iQIzBAEBCgAdFiEE
+-----END PGP SIGNATURE-----
+"""
+
+BACKPORTS = """Package: curl
+Architecture: amd64
+Version: 8.8.0-4~bpo12+1
+
+Package: tzdata
+Architecture: all
+Version: 2025a-1~bpo12+1
+
+Package: tzdata
+Architecture: all
+Version: 2024a-0+deb12u1~bpo12+1
+"""
+
+EXPERIMENTAL = """Package: curl
+Architecture: amd64
+Version: 9.0.0-1
+
+Package: tzdata
+Architecture: all
+Version: 2099a-1
+"""
+
+
+def _suite(lists, suite, packages, fields):
+    _write(str(lists / f"deb.debian.org_debian_dists_{suite}_main_binary-amd64_Packages"), packages)
+    _write(str(lists / f"deb.debian.org_debian_dists_{suite}_InRelease"), RELEASE.format(fields=fields))
+
+
+def test_upgradable_not_automatic(tmp_path):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    status = STATUS.replace("Version: 2024a-0+deb12u1", "Version: 2024a-0+deb12u1~bpo12+1")
+    _write(str(tmp_path / "status"), status)
+    _write(str(lists / "deb.debian.org_debian_dists_bookworm_main_binary-amd64_Packages"),
+           "Package: curl\nArchitecture: amd64\nVersion: 7.88.1-10\n\n"
+           "Package: tzdata\nArchitecture: all\nVersion: 2024a-0\n")
+    _suite(lists, "bookworm-backports", BACKPORTS, "NotAutomatic: yes\nButAutomaticUpgrades: yes\n")
+    _suite(lists, "experimental", EXPERIMENTAL, "NotAutomatic: yes\n")
+    index = AptIndex(str(tmp_path / "status"), str(lists))
+
+    # curl установлен из bookworm: backports и experimental не предлагаются;
+    # tzdata установлен из backports: обновления из backports предлагаются
+    assert index.upgradable() == [Upgrade("tzdata", "all", "2024a-0+deb12u1~bpo12+1", "2025a-1~bpo12+1",
+                                          "bookworm-backports")]
+    assert index.parsed == 6
+
+    # Без NotAutomatic источник обычный: выигрывает наибольшая версия
+    release = lists / "deb.debian.org_debian_dists_experimental_InRelease"
+    _write(str(release), RELEASE.format(fields=""))
+    os.utime(release, ns=(1, 1))
+    assert [(row.name, row.candidate, row.origin) for row in index.upgradable()] == [
+        ("curl", "9.0.0-1", "experimental"), ("tzdata", "2099a-1", "experimental")]
+    assert index.parsed == 1
@@ -0,0 +1,42 @@
+import math
+import os
+import random
+
+import pytest
+
+from batch import process_chunk
+from main import evaluate
+
+TASK3 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "task3.json")
+
+
+def _lines(count, seed=1):
+    rng = random.Random(seed)
+    return [" ".join(f"{rng.uniform(-1, 8):.3f}" for _ in range(5)) + "\n" for _ in range(count)]
+
+
+def _expected(lines):
+    results = []
+    errors = 0
+    for line in lines:
+        try:
+            results.append(evaluate(*map(float, line.split())))
+        except (ValueError, TypeError, OverflowError, ZeroDivisionError):
+            results.append(math.nan)
+            errors += 1
+    return "".join(f"{value:.2f}\n" for value in results), errors
+
+
+@pytest.mark.parametrize("formula", [None, TASK3])
+def test_matches_main(formula):
+    lines = _lines(5000)
+    text, errors = process_chunk(lines, formula=formula)
+    assert (text, errors) == _expected(lines)
+    assert errors > 0
+
+
+@pytest.mark.parametrize("formula", [None, TASK3])
+def test_malformed_rows_counted_once(formula):
+    text, errors = process_chunk(["1 2 3 4 5\n", "foo 1 2 3 4\n", "1 2\n"], formula=formula)
+    assert text == "4.95\nnan\nnan\n"
+    assert errors == 2
@@ -0,0 +1,60 @@
+import json
+import math
+import os
+import random
+
+import numpy as np
+import pytest
+
+from formula import ROUNDING, SCALAR_ERRORS, Formula, load_formula
+from main import evaluate
+
+TASK3 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "task3.json")
+
+STEPS = {
+    "B1": "exp(A1) * A2 if log(A2 + 3) < 1.2 else A1 / A2",
+    "B2": "B1 ^ 3 - sqrt(A1 * A1 + 1)",
+    "result": "cos(B2) * 1000 + B1",
+}
+
+
+def _scalar(formula, a):
+    results = []
+    for row in a.tolist():
+        try:
+            results.append(formula(*row))
+        except SCALAR_ERRORS:
+            results.append(math.nan)
+    return np.array(results)
+
+
+def _rows(count, width, seed=1):
+    rng = random.Random(seed)
+    return np.array([[round(rng.uniform(-2, 8), 3) for _ in range(width)] for _ in range(count)])
+
+
+def test_task3_matches_main():
+    formula = load_formula(TASK3)
+    a = _rows(5000, 5)
+    res, errors = formula.evaluate_array(a)
+    expected = _scalar(evaluate, a)
+    np.testing.assert_array_equal(res, expected)
+    assert errors == int(np.isnan(expected).sum()) > 0
+
+
+@pytest.mark.parametrize("rounding", ROUNDING)
+def test_array_matches_scalar(rounding):
+    formula = Formula(["A1", "A2"], STEPS, digits=5, rounding=rounding)
+    a = _rows(5000, 2)
+    res, errors = formula.evaluate_array(a)
+    expected = _scalar(formula, a)
+    np.testing.assert_array_equal(res, expected)
+    assert errors == int(np.isnan(expected).sum())
+
+
+@pytest.mark.parametrize("name", ["round", "sqrt", "pi", "if", "lambda", "_x", "1a"])
+def test_rejects_reserved_names(name, tmp_path):
+    path = tmp_path / "formula.json"
+    path.write_text(json.dumps({"inputs": [name], "steps": {"result": "1"}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_formula(str(path))
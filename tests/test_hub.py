@@ -0,0 +1,132 @@
+import socket
+import struct
+import time
+
+import pytest
+
+import hub
+from collectors import DashboardSnapshot
+
+SNAPSHOT = DashboardSnapshot(
+    timestamp=1700000000.25,
+    cpu_percent=12.3,
+    per_cpu=(0.0, 45.6, 100.0),
+    mem_percent=67.8,
+    mem_used=3 * 2 ** 30,
+    mem_total=8 * 2 ** 30,
+    disk_path="/",
+    disk_percent=42.1,
+    disk_used=40 * 10 ** 9,
+    disk_total=100 * 10 ** 9,
+    net_sent=123456789,
+    net_recv=987654321,
+    os_name="Linux",
+    os_release="6.1.0",
+    os_version="#1 SMP Debian",
+    processor="x86_64",
+    boot_time=1699990000.5,
+)
+
+
+def _split(data):
+    """(тип, содержимое) единственного кадра"""
+    size, kind = hub._HEADER.unpack_from(data)
+    assert len(data) == hub._HEADER.size + size
+    return kind, data[hub._HEADER.size:]
+
+
+def test_hello_roundtrip():
+    kind, payload = _split(hub.encode_hello(hub.ROLE_AGENT, "узел-1"))
+    assert kind == hub.HELLO
+    assert hub.decode_hello(payload) == (hub.ROLE_AGENT, "узел-1")
+
+
+def test_hello_bad_version():
+    payload = hub._HELLO.pack(hub.PROTOCOL_VERSION + 1, hub.ROLE_AGENT) + hub._pack_string("x")
+    with pytest.raises(hub.ProtocolError):
+        hub.decode_hello(payload)
+
+
+def test_define_and_batch_roundtrip():
+    kind, payload = _split(hub.encode_define(7, "host-a", hub.static_info(SNAPSHOT)))
+    assert kind == hub.DEFINE
+    host_id, host, info = hub.decode_define(payload)
+    assert (host_id, host, info) == (7, "host-a", hub.static_info(SNAPSHOT))
+
+    kind, payload = _split(hub.encode_batch([(7, SNAPSHOT), (7, SNAPSHOT._replace(per_cpu=()))]))
+    assert kind == hub.BATCH
+    decoded = hub.decode_batch(payload, {host_id: (host, info)})
+    assert [name for name, _ in decoded] == ["host-a", "host-a"]
+    # Проценты передаются с точностью 0.1, остальные поля без потерь
+    assert decoded[0][1] == SNAPSHOT
+    assert decoded[1][1].per_cpu == ()
+
+
+def test_batch_percent_clamped():
+    snapshot = SNAPSHOT._replace(cpu_percent=-5.0, per_cpu=(12.34, 7000.0))
+    _, payload = _split(hub.encode_batch([(1, snapshot)]))
+    (_, decoded), = hub.decode_batch(payload, {1: ("h", hub.static_info(snapshot))})
+    assert decoded.cpu_percent == 0.0
+    assert decoded.per_cpu == (12.3, 6553.5)
+
+
+def test_batch_undefined_host():
+    _, payload = _split(hub.encode_batch([(3, SNAPSHOT)]))
+    with pytest.raises(hub.ProtocolError):
+        hub.decode_batch(payload, {})
+
+
+def test_hosts_roundtrip():
+    hosts = [("a", 0.5), ("b", 3600.0)]
+    kind, payload = _split(hub.encode_hosts(hosts))
+    assert kind == hub.HOSTS
+    assert hub.decode_hosts(payload) == hosts
+    assert hub.decode_hosts(_split(hub.encode_hosts([]))[1]) == []
+
+
+@pytest.mark.parametrize("data, decode", [
+    (hub.encode_hello(hub.ROLE_VIEWER, "viewer"), hub.decode_hello),
+    (hub.encode_define(1, "host-a", hub.static_info(SNAPSHOT)), hub.decode_define),
+    (hub.encode_batch([(1, SNAPSHOT)]), lambda payload: hub.decode_batch(payload, {})),
+    (hub.encode_hosts([("a", 1.0), ("b", 2.0)]), hub.decode_hosts),
+])
+def test_truncated_payload(data, decode):
+    _, payload = _split(data)
+    for size in range(len(payload)):
+        with pytest.raises((struct.error, hub.ProtocolError)):
+            decode(payload[:size])
+
+
+@pytest.fixture
+def running_hub():
+    server = hub.Hub("127.0.0.1", 0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_hub_truncated_frame(running_hub):
+    good = (hub.encode_hello(hub.ROLE_AGENT, "agent") + hub.encode_define(1, "host-a", hub.static_info(SNAPSHOT))
+            + hub.encode_batch([(1, SNAPSHOT)]))
+    with socket.create_connection(("127.0.0.1", running_hub.port)) as sock:
+        # Кадр обрывается на середине содержимого: хаб закрывает соединение, принятое остается
+        sock.sendall(good + hub.encode_batch([(1, SNAPSHOT)])[:-5])
+        sock.shutdown(socket.SHUT_WR)
+        assert sock.recv(1) == b""
+    _wait(lambda: running_hub.connections == 0)
+    assert running_hub.stats().records == 1
+    assert running_hub.index.get("host-a").snapshot == SNAPSHOT
+
+    # Хаб продолжает принимать соединения
+    with socket.create_connection(("127.0.0.1", running_hub.port)) as sock:
+        sock.sendall(hub.encode_query())
+        kind, payload = hub._recv_frame(sock)
+    assert kind == hub.HOSTS
+    assert [host for host, _ in hub.decode_hosts(payload)] == ["host-a"]
@@ -0,0 +1,78 @@
+import os
+import socket
+
+import pytest
+
+from probe import ProbeEngine, parse_target
+
+PING_OUTPUT = """PING 10.0.0.1 (10.0.0.1) 56(84) bytes of data.
+
+--- 10.0.0.1 ping statistics ---
+3 packets transmitted, 2 received, 33.3333% packet loss, time 402ms
+rtt min/avg/max/mdev = 0.041/0.052/0.064/0.009 ms
+"""
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("example.org", ("example.org", None)),
+    ("example.org:443", ("example.org", 443)),
+    (" 10.0.0.1:22 ", ("10.0.0.1", 22)),
+    ("[::1]:8080", ("::1", 8080)),
+    ("[fe80::1]", ("fe80::1", None)),
+    ("fe80::1", ("fe80::1", None)),
+])
+def test_parse_target(text, expected):
+    assert parse_target(text) == expected
+
+
+def test_parse_target_default_port():
+    assert parse_target("example.org", default_port=80) == ("example.org", 80)
+
+
+@pytest.fixture
+def fake_ping(tmp_path, monkeypatch):
+    """ping из PATH заменяется скриптом, печатающим заданный вывод"""
+
+    def install(output, code=0):
+        script = tmp_path / "ping"
+        script.write_text(f"#!/bin/sh\ncat <<'END'\n{output}END\nexit {code}\n")
+        script.chmod(0o755)
+        monkeypatch.setenv("PATH", str(tmp_path), prepend=os.pathsep)
+
+    return install
+
+
+def test_tcp_open_and_closed_ports():
+    with socket.socket() as listener, socket.socket() as unused:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        unused.bind(("127.0.0.1", 0))
+        open_port, closed_port = listener.getsockname()[1], unused.getsockname()[1]
+        results = ProbeEngine(timeout=2).run([f"127.0.0.1:{open_port}", ("127.0.0.1", closed_port)])
+    assert [(r.port, r.kind, r.ok) for r in results] == [(open_port, "tcp", True), (closed_port, "tcp", False)]
+    assert results[0].connect_ms >= 0 and results[0].error is None
+    assert results[1].error
+
+
+def test_ping_statistics(fake_ping):
+    fake_ping(PING_OUTPUT)
+    (result,) = ProbeEngine(ping_count=3).run(["10.0.0.1"])
+    assert result.kind == "ping" and result.ok
+    assert (result.rtt_min, result.rtt_avg, result.rtt_max) == (0.041, 0.052, 0.064)
+    assert result.loss == pytest.approx(33.3333)
+
+
+def test_ping_failure_counts_full_loss(fake_ping):
+    fake_ping("", code=1)
+    (result,) = ProbeEngine().run(["10.0.0.1"])
+    assert not result.ok and result.loss == 100.0 and result.error
+
+
+def test_port_and_ping_jobs(fake_ping):
+    fake_ping(PING_OUTPUT)
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        results = ProbeEngine().run([f"127.0.0.1:{port}", "10.0.0.1"], ping=True)
+    assert [(r.host, r.kind) for r in results] == [("127.0.0.1", "tcp"), ("127.0.0.1", "ping"), ("10.0.0.1", "ping")]
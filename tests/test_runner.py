@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from runner import CommandRunner
+
+
+@pytest.fixture
+def runner():
+    runner = CommandRunner(ttl=0)
+    yield runner
+    runner.shutdown()
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_shared_run(runner):
+    argv = ["sh", "-c", "sleep 0.2; echo ok"]
+    first, second = runner.submit(argv), runner.submit(argv)
+    assert first is not second
+    assert first.result(5).output == second.result(5).output == "ok\n"
+
+
+def test_last_follower_cancel_kills_process(runner, tmp_path):
+    pid_file = tmp_path / "pid"
+    argv = ["sh", "-c", f"echo $$ > {pid_file}; exec sleep 30"]
+    first, second = runner.submit(argv, timeout=60), runner.submit(argv, timeout=60)
+    _wait(lambda: pid_file.exists() and pid_file.read_text().strip())
+    pid = int(pid_file.read_text())
+
+    assert first.cancel()
+    time.sleep(0.2)
+    # Второй вызывающий еще ждет: процесс продолжается
+    assert _alive(pid) and not second.done()
+
+    assert second.cancel()
+    _wait(lambda: not _alive(pid))
+    with pytest.raises(CancelledError):
+        second.result()
+    assert runner._followers == {}
+
+
+def test_cancelled_follower_other_gets_result(runner):
+    argv = ["sh", "-c", "sleep 0.3; echo ok"]
+    first, second = runner.submit(argv), runner.submit(argv)
+    first.cancel()
+    assert second.result(5).output == "ok\n"
+    assert first.cancelled()
+
+    # После отмены всех новый вызов той же команды запускает ее заново
+    third = runner.submit(argv)
+    third.cancel()
+    assert runner.run(argv).output == "ok\n"
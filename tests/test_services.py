@@ -0,0 +1,94 @@
+import services
+from services import ServiceCollector, UnitState, merge_unit_files, parse_show, parse_unit_files, unit_events
+
+SHOW = """Id=ssh.service
+LoadState=loaded
+ActiveState=active
+SubState=running
+UnitFileState=enabled
+Description=OpenBSD Secure Shell server
+
+Id=systemd-journald.service
+LoadState=loaded
+ActiveState=active
+SubState=running
+UnitFileState=static
+Description=Journal Service=with equals
+
+
+Id=
+LoadState=not-found
+
+Id=broken.service
+ActiveState=failed
+"""
+
+
+def test_parse_show_blocks():
+    units = parse_show(SHOW)
+    assert [unit.unit for unit in units] == ["ssh.service", "systemd-journald.service", "broken.service"]
+    assert units[0] == UnitState("ssh.service", "loaded", "active", "running", "enabled",
+                                 "OpenBSD Secure Shell server")
+    # Значение может содержать '=', последний блок без пустой строки в конце
+    assert units[1].description == "Journal Service=with equals"
+    assert units[2] == UnitState("broken.service", "", "failed", "", "", "")
+
+
+def test_parse_show_empty():
+    assert parse_show("") == []
+
+
+def test_parse_unit_files_and_merge():
+    files = parse_unit_files("ssh.service enabled enabled\ncron.service enabled enabled\n"
+                             "getty@.service enabled enabled\n\n")
+    assert files == {"ssh.service": "enabled", "cron.service": "enabled", "getty@.service": "enabled"}
+    units = merge_unit_files(parse_show(SHOW), files)
+    assert [unit.unit for unit in units][-1] == "cron.service"
+    assert units[-1] == UnitState("cron.service", "", "inactive", "dead", "enabled", "")
+    assert "getty@.service" not in {unit.unit for unit in units}
+
+
+def _unit(active="active", enabled="enabled"):
+    return UnitState("ssh.service", "loaded", active, "", enabled, "")
+
+
+def test_unit_events():
+    assert [e.event for e in unit_events(1, None, _unit())] == ["added"]
+    assert [e.event for e in unit_events(1, _unit(), None)] == ["removed"]
+    assert [e.event for e in unit_events(1, _unit("inactive"), _unit())] == ["started"]
+    assert [e.event for e in unit_events(1, _unit(), _unit("inactive"))] == ["stopped"]
+    assert [e.event for e in unit_events(1, _unit(), _unit("failed", "disabled"))] == ["failed", "disabled"]
+    assert [e.event for e in unit_events(1, _unit("activating"), _unit("deactivating"))] == ["state"]
+    # static, indirect и т. п. не считаются ни включенными, ни отключенными переходами
+    assert unit_events(1, _unit(enabled="disabled"), _unit(enabled="static")) == []
+    assert [e.event for e in unit_events(1, _unit(enabled="indirect"), _unit())] == ["enabled"]
+
+
+def test_collector_diffs(monkeypatch):
+    second = SHOW.replace("ActiveState=active\nSubState=running\nUnitFileState=enabled",
+                          "ActiveState=failed\nSubState=failed\nUnitFileState=enabled")
+    outputs = [SHOW, SHOW, second.split("\n\nId=broken")[0]]
+    files_calls = []
+    monkeypatch.setattr(services, "query_units", lambda *args: parse_show(outputs.pop(0)))
+    monkeypatch.setattr(services, "query_unit_files",
+                        lambda *args: files_calls.append(args) or parse_unit_files("cron.service enabled enabled"))
+    now = [100.0]
+    collector = ServiceCollector(files_interval=60.0, clock=lambda: now[0])
+
+    first = collector.refresh()
+    assert len(first.changed) == 4 and first.events == [] and first.failed == 1
+    assert "cron.service" in collector.units
+
+    now[0] += 10
+    same = collector.refresh()
+    assert same.changed == [] and same.removed == [] and same.events == []
+    # Список файлов юнитов перезапрашивается не чаще files_interval
+    assert len(files_calls) == 1
+
+    now[0] += 60
+    changed = collector.refresh()
+    assert len(files_calls) == 2
+    assert [unit.unit for unit in changed.changed] == ["ssh.service"]
+    assert changed.removed == ["broken.service"]
+    assert [(e.unit, e.event) for e in changed.events] == [("ssh.service", "failed"), ("broken.service", "removed")]
+    assert changed.total == 3 and changed.failed == 1
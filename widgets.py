@@ -0,0 +1,52 @@
+from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import QWidget
+
+
+class Sparkline(QWidget):
+    """Компактный график истории метрики"""
+
+    def __init__(self, title, max_value=None, fmt=None, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.max_value = max_value
+        self.fmt = fmt or (lambda v: f"{v:.1f}%")
+        self.color = QColor("#4CAF50")
+        self._times = []
+        self._values = []
+        self.setMinimumHeight(60)
+
+    def set_series(self, times, values, color=None):
+        self._times = times
+        self._values = values
+        if color:
+            self.color = QColor(color)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.rect().adjusted(1, 1, -1, -1)
+        painter.fillRect(rect, QColor("white"))
+        painter.setPen(QColor("#cccccc"))
+        painter.drawRect(rect)
+
+        times, values = self._times, self._values
+        label = self.title
+        if len(values) >= 2:
+            t0, t1 = times[0], times[-1]
+            span = (t1 - t0) or 1.0
+            top = self.max_value or max(max(values), 1e-9)
+            width, height = rect.width() - 2, rect.height() - 2
+            points = QPolygonF([
+                QPointF(rect.left() + 1 + (t - t0) / span * width,
+                        rect.bottom() - 1 - min(v / top, 1.0) * height)
+                for t, v in zip(times, values)
+            ])
+            painter.setPen(QPen(self.color, 1.5))
+            painter.drawPolyline(points)
+        if values:
+            label = f"{self.title}: {self.fmt(values[-1])}"
+
+        painter.setPen(QColor("black"))
+        painter.drawText(rect.adjusted(4, 2, -4, -2), Qt.AlignLeft | Qt.AlignTop, label)
@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+
+class CollectorThread(QThread):
+    """Запуск сборщиков планировщика вне потока GUI"""
+    result_ready = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, scheduler, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.max_workers = max_workers
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector") as executor:
+            while not self._stopped.is_set():
+                self._wakeup.clear()
+                self.scheduler.run_due(self._deliver, executor)
+                self._wakeup.wait(min(self.scheduler.next_wakeup(), 1.0))
+
+    def _deliver(self, name, result, error):
+        if error is not None:
+            self.failed.emit(name, str(error))
+        else:
+            self.result_ready.emit(name, result)
+        # Завершение сборщика может приблизить следующий запуск
+        self._wakeup.set()
+
+    def wake(self):
+        """Проверка планировщика без ожидания"""
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self.wait()
+
+
+class CommandBridge(QObject):
+    """Доставка результатов CommandRunner в поток GUI через сигнал"""
+    finished = pyqtSignal(object, object)
+
+    def __init__(self, ttl=60.0, parent=None):
+        super().__init__(parent)
+        # asyncio загружается только при первом запуске внешних команд
+        from runner import CommandRunner
+        self.runner = CommandRunner(ttl=ttl)
+        self._generations = {}
+        self._futures = {}
+
+    def start_group(self, group):
+        """Новый запуск группы команд; результаты прошлых запусков игнорируются"""
+        self._generations[group] = self._generations.get(group, 0) + 1
+        self._futures[group] = []
+
+    def submit(self, group, argv, timeout=10.0, ttl=None, tag=None):
+        generation = self._generations.get(group, 0)
+        future = self.runner.submit(argv, timeout, ttl)
+        self._futures.setdefault(group, []).append(future)
+
+        def done(f):
+            if f.cancelled() or self._generations.get(group, 0) != generation:
+                return
+            self.finished.emit(tag, f.result())
+
+        future.add_done_callback(done)
+        return future
+
+    def cancel(self, group):
+        """Отмена незавершенных команд группы"""
+        for future in self._futures.pop(group, []):
+            future.cancel()
+        self._generations[group] = self._generations.get(group, 0) + 1
+
+    def shutdown(self):
+        for group in list(self._futures):
+            self.cancel(group)
+        self.runner.shutdown()
+
+
+class TaskRunner(QObject):
+    """Выполнение функций сбора в пуле потоков с доставкой результата в GUI"""
+    finished = pyqtSignal(object, object, object)
+
+    def __init__(self, max_workers=4, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="collector")
+
+    def submit(self, tag, fn, *args):
+        def done(future):
+            error = future.exception()
+            self.finished.emit(tag, None if error else future.result(), error)
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(done)
+        return future
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)